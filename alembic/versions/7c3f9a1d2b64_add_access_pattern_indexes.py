@@ -0,0 +1,38 @@
+"""Add composite and partial indexes for booking/availability access patterns
+
+Revision ID: 7c3f9a1d2b64
+Revises: e59ee5e86b40
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f9a1d2b64'
+down_revision: Union[str, None] = 'e59ee5e86b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_properties_owner_id', 'properties', ['owner_id'], unique=False, schema='public')
+    op.create_index('ix_properties_active_district_price', 'properties', ['district', 'price_per_night'], unique=False, schema='public', postgresql_where=sa.text('is_active'))
+    op.create_index('ix_property_media_property_id', 'property_media', ['property_id'], unique=False, schema='public')
+    op.create_index('ix_bookings_property_status_dates', 'bookings', ['property_id', 'status', 'start_date', 'end_date'], unique=False, schema='public')
+    op.create_index('ix_bookings_property_pending', 'bookings', ['property_id'], unique=False, schema='public', postgresql_where=sa.text("status = 'pending'"))
+    op.create_index('ix_reviews_property_created', 'reviews', ['property_id', 'created_at'], unique=False, schema='public')
+    op.create_index('ix_price_rules_property_start', 'price_rules', ['property_id', 'start_date', 'end_date'], unique=False, schema='public')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_price_rules_property_start', table_name='price_rules', schema='public')
+    op.drop_index('ix_reviews_property_created', table_name='reviews', schema='public')
+    op.drop_index('ix_bookings_property_pending', table_name='bookings', schema='public')
+    op.drop_index('ix_bookings_property_status_dates', table_name='bookings', schema='public')
+    op.drop_index('ix_property_media_property_id', table_name='property_media', schema='public')
+    op.drop_index('ix_properties_active_district_price', table_name='properties', schema='public')
+    op.drop_index('ix_properties_owner_id', table_name='properties', schema='public')
@@ -0,0 +1,39 @@
+"""Add denormalized rating_sum/rating_count to properties
+
+Revision ID: c58e2f7a9b13
+Revises: a41d6e8c5f20
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e2f7a9b13'
+down_revision: Union[str, None] = 'a41d6e8c5f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('properties', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False), schema='public')
+    op.add_column('properties', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False), schema='public')
+    # Заполняем сводку по уже существующим отзывам
+    op.execute("""
+        UPDATE public.properties AS p
+        SET rating_sum = r.rating_sum, rating_count = r.rating_count
+        FROM (
+            SELECT property_id, SUM(rating) AS rating_sum, COUNT(id) AS rating_count
+            FROM public.reviews
+            GROUP BY property_id
+        ) AS r
+        WHERE r.property_id = p.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('properties', 'rating_count', schema='public')
+    op.drop_column('properties', 'rating_sum', schema='public')
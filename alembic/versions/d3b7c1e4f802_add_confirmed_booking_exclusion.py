@@ -0,0 +1,34 @@
+"""Forbid overlapping confirmed bookings with an exclusion constraint
+
+Revision ID: d3b7c1e4f802
+Revises: c58e2f7a9b13
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b7c1e4f802'
+down_revision: Union[str, None] = 'c58e2f7a9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Если в базе уже есть пересекающиеся подтвержденные брони, миграция упадет:
+    # их нужно разобрать вручную (перевести лишние в rejected) и повторить.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute("""
+        ALTER TABLE public.bookings
+        ADD CONSTRAINT excl_bookings_confirmed_overlap
+        EXCLUDE USING gist (property_id WITH =, tsrange(start_date, end_date) WITH &&)
+        WHERE (status = 'confirmed')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint('excl_bookings_confirmed_overlap', 'bookings', schema='public')
@@ -0,0 +1,38 @@
+"""Add property_availability table with precomputed day bitmaps
+
+Revision ID: e7a4d9b2c615
+Revises: d3b7c1e4f802
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a4d9b2c615'
+down_revision: Union[str, None] = 'd3b7c1e4f802'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Таблица заполняется командой /rebuild_availability; пока строки нет,
+    # календарь считает занятость по броням и блокировкам, как раньше.
+    op.create_table('property_availability',
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('origin', sa.Date(), nullable=False),
+    sa.Column('days', sa.Integer(), nullable=False),
+    sa.Column('booked', sa.LargeBinary(), nullable=False),
+    sa.Column('blocked', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['property_id'], ['public.properties.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('property_id'),
+    schema='public'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('property_availability', schema='public')
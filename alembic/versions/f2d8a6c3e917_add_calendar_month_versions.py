@@ -0,0 +1,34 @@
+"""Add calendar_month_versions table for calendar ETags
+
+Revision ID: f2d8a6c3e917
+Revises: e7a4d9b2c615
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d8a6c3e917'
+down_revision: Union[str, None] = 'e7a4d9b2c615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Отсутствие строки означает версию 0: заполнять таблицу для существующих объектов не нужно
+    op.create_table('calendar_month_versions',
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.ForeignKeyConstraint(['property_id'], ['public.properties.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('property_id', 'month'),
+    schema='public'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('calendar_month_versions', schema='public')
@@ -0,0 +1,133 @@
+"""
+Сравнивает проверки занятости по строкам броней/блокировок и по битовым картам
+(src/services/availability_bitmap.py) на синтетических данных в памяти.
+
+Запуск (БД не нужна):
+    python benchmarks/availability_bitmap.py --properties 10000 --days 365
+
+Для каждого объекта генерируются подтвержденные брони и ручные блокировки на
+--days дней вперед. Сравниваются три операции:
+  * проверка одного периода (как при бронировании);
+  * занятые дни месяца (как в календаре);
+  * поиск всех свободных объектов на период (как в поиске по датам).
+Строковый вариант работает с теми же кортежами, что возвращают запросы к bookings
+и unavailable_dates, поэтому в сравнение не входит только время самих запросов.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from os.path import abspath, dirname
+
+# Чтобы скрипт находил пакет src при запуске из любой папки
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from src.services.availability_bitmap import DayBitmap, PropertyAvailabilityMap, booking_nights
+
+
+def generate_rows(properties: int, days: int, origin: date, seed: int) -> dict[int, tuple[list, list]]:
+    """Брони идут подряд с промежутками, часть свободных дней закрыта владельцем."""
+    rng = random.Random(seed)
+    rows = {}
+    for property_id in range(properties):
+        bookings, blocks = [], []
+        day = rng.randint(0, 5)
+        while day < days:
+            nights = rng.randint(1, 7)
+            start = datetime.combine(origin + timedelta(days=day), datetime.min.time())
+            bookings.append((start, start + timedelta(days=nights)))
+            day += nights + rng.randint(0, 10)
+            if rng.random() < 0.1 and day < days:
+                blocks.append(origin + timedelta(days=day))
+                day += 1
+        rows[property_id] = (bookings, blocks)
+    return rows
+
+
+def build_maps(rows: dict, days: int, origin: date) -> dict[int, PropertyAvailabilityMap]:
+    maps = {}
+    for property_id, (bookings, blocks) in rows.items():
+        booked = [
+            booking_start.date().toordinal() + offset
+            for booking_start, booking_end in bookings
+            for offset in range(booking_nights(booking_start, booking_end))
+        ]
+        maps[property_id] = PropertyAvailabilityMap(
+            DayBitmap.from_ordinals(origin, days, booked),
+            DayBitmap.from_ordinals(origin, days, (block.toordinal() for block in blocks))
+        )
+    return maps
+
+
+def rows_is_free(bookings: list, blocks: list, start: date, end: date) -> bool:
+    start_dt, end_dt = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    if any(booking_start < end_dt and booking_end > start_dt for booking_start, booking_end in bookings):
+        return False
+    return not any(start <= block < end for block in blocks)
+
+
+def rows_booked_days(bookings: list, start: date, end: date) -> set[int]:
+    start_ordinal, end_ordinal = start.toordinal(), end.toordinal()
+    booked = set()
+    for booking_start, booking_end in bookings:
+        first = booking_start.date().toordinal()
+        booked.update(range(max(first, start_ordinal), min(first + booking_nights(booking_start, booking_end), end_ordinal)))
+    return booked
+
+
+def measure(name: str, rows_fn, bitmap_fn):
+    started = time.perf_counter()
+    rows_result = rows_fn()
+    rows_time = time.perf_counter() - started
+    started = time.perf_counter()
+    bitmap_result = bitmap_fn()
+    bitmap_time = time.perf_counter() - started
+    assert rows_result == bitmap_result, f"{name}: результаты расходятся"
+    print(f"{name:<32} строки {rows_time * 1000:9.1f} мс   карты {bitmap_time * 1000:9.1f} мс   x{rows_time / bitmap_time:6.1f}")
+
+
+def main(properties: int, days: int, checks: int, seed: int):
+    origin = date.today().replace(day=1)
+    rows = generate_rows(properties, days, origin, seed)
+    maps = build_maps(rows, days, origin)
+    rng = random.Random(seed)
+
+    periods = []
+    for _ in range(checks):
+        start = origin + timedelta(days=rng.randint(0, days - 15))
+        periods.append((rng.randrange(properties), start, start + timedelta(days=rng.randint(1, 14))))
+
+    month_start = origin + timedelta(days=32)
+    month_start = month_start.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+    search_start = origin + timedelta(days=days // 2)
+    search_end = search_start + timedelta(days=3)
+
+    print(f"Объектов: {properties}, дней: {days}, броней: {sum(len(b) for b, _ in rows.values())}")
+    print(f"Размер карт: {sum(len(m.booked.to_bytes()) + len(m.blocked.to_bytes()) for m in maps.values()) / 1024:.0f} КБ")
+    measure(
+        f"проверка периода x{checks}",
+        lambda: [rows_is_free(*rows[property_id], start, end) for property_id, start, end in periods],
+        lambda: [maps[property_id].is_free(start, end) for property_id, start, end in periods]
+    )
+    measure(
+        f"занятые дни месяца x{properties}",
+        lambda: [rows_booked_days(rows[property_id][0], month_start, month_end) for property_id in rows],
+        lambda: [set(maps[property_id].booked.days_in(month_start, month_end)) for property_id in maps]
+    )
+    measure(
+        "поиск свободных на 3 ночи",
+        lambda: [property_id for property_id, (bookings, blocks) in rows.items() if rows_is_free(bookings, blocks, search_start, search_end)],
+        lambda: [property_id for property_id, availability in maps.items() if availability.is_free(search_start, search_end)]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=10000, help="сколько объектов сгенерировать")
+    parser.add_argument("--days", type=int, default=365, help="на сколько дней вперед генерировать занятость")
+    parser.add_argument("--checks", type=int, default=100000, help="сколько проверок периода выполнить")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора случайных чисел")
+    args = parser.parse_args()
+    main(args.properties, args.days, args.checks, args.seed)
@@ -0,0 +1,175 @@
+"""
+Сравнивает планы горячих запросов (EXPLAIN ANALYZE) без индексов ревизии
+7c3f9a1d2b64 и с ними на синтетических данных в локальной PostgreSQL.
+
+Запуск (БД берется из .env, используйте локальную или тестовую базу):
+    python benchmarks/explain_indexes.py --properties 5000 --bookings 40
+
+Тестовые данные, удаление и создание индексов выполняются в одной транзакции,
+которая в конце откатывается, поэтому база остается в исходном состоянии.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime
+from os.path import abspath, dirname
+
+from sqlalchemy import select, func, and_, text
+from sqlalchemy.schema import CreateIndex
+
+# Чтобы скрипт находил пакет src при запуске из любой папки
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from src.models.models import Booking, PriceRule, Property, PropertyMedia, Review, UnavailableDate
+from src.services.db import engine
+
+# Индексы, добавленные ревизией 7c3f9a1d2b64
+INDEXES = [
+    index
+    for model in (Property, PropertyMedia, Booking, Review, PriceRule)
+    for index in model.__table__.indexes
+    if index.name in {
+        'ix_properties_owner_id',
+        'ix_properties_active_district_price',
+        'ix_property_media_property_id',
+        'ix_bookings_property_status_dates',
+        'ix_bookings_property_pending',
+        'ix_reviews_property_created',
+        'ix_price_rules_property_start',
+    }
+]
+
+OWNER_ID = 9_000_000_001
+CLIENT_ID = 9_000_000_002
+
+SEED_SQL = [
+    f"""INSERT INTO public.users (telegram_id, first_name, role)
+        VALUES ({OWNER_ID}, 'bench owner', 'owner'), ({CLIENT_ID}, 'bench client', 'user')""",
+    # Несколько крупных владельцев и "длинный хвост" остальных
+    f"""INSERT INTO public.properties (owner_id, title, address, district, price_per_night,
+                                       rooms, max_guests, property_type, is_verified, is_active)
+        SELECT {OWNER_ID}, 'bench ' || n, 'addr', (ARRAY['Зеленоградск','Светлогорск','мкр. Сельма','Янтарный'])[n % 4 + 1],
+               1000 + (n * 37) % 9000, n % 4, 1 + n % 8, 'Квартира', n % 2 = 0, n % 5 <> 0
+        FROM generate_series(1, :properties) AS n""",
+    """INSERT INTO public.bookings (property_id, user_id, start_date, end_date, status)
+       SELECT p.id, :client_id,
+              timestamp '2022-01-01' + (b * 14) * interval '1 day',
+              timestamp '2022-01-01' + (b * 14 + 3) * interval '1 day',
+              (ARRAY['confirmed','confirmed','rejected','pending'])[b % 4 + 1]
+       FROM public.properties p CROSS JOIN generate_series(1, :bookings) AS b
+       WHERE p.owner_id = :owner_id""",
+    """INSERT INTO public.reviews (property_id, user_id, booking_id, rating)
+       SELECT b.property_id, b.user_id, b.id, 1 + b.id % 5
+       FROM public.bookings b JOIN public.properties p ON p.id = b.property_id
+       WHERE p.owner_id = :owner_id AND b.status = 'confirmed'""",
+    """INSERT INTO public.property_media (property_id, file_id, media_type)
+       SELECT p.id, 'file_' || p.id || '_' || m, 'photo'
+       FROM public.properties p CROSS JOIN generate_series(1, 5) AS m
+       WHERE p.owner_id = :owner_id""",
+    """INSERT INTO public.price_rules (property_id, start_date, end_date, price)
+       SELECT p.id, date '2022-01-01' + r * 30, date '2022-01-01' + r * 30 + 10, 5000
+       FROM public.properties p CROSS JOIN generate_series(1, 20) AS r
+       WHERE p.owner_id = :owner_id""",
+    """INSERT INTO public.unavailable_dates (property_id, date)
+       SELECT p.id, date '2022-01-01' + d * 7
+       FROM public.properties p CROSS JOIN generate_series(1, 100) AS d
+       WHERE p.owner_id = :owner_id""",
+]
+
+
+def build_queries(property_id: int, property_ids: list[int]) -> dict:
+    """Запросы в том виде, в каком их выполняют сервисы."""
+    month_start, month_end = date(2024, 6, 1), date(2024, 7, 1)
+    return {
+        "calendar: брони месяца": select(Booking.start_date, Booking.end_date).where(and_(
+            Booking.property_id == property_id,
+            Booking.status == 'confirmed',
+            Booking.start_date < datetime.combine(month_end, datetime.min.time()),
+            Booking.end_date > datetime.combine(month_start, datetime.min.time())
+        )),
+        "calendar: ценовые правила месяца": select(PriceRule).where(and_(
+            PriceRule.property_id == property_id,
+            PriceRule.start_date < month_end,
+            PriceRule.end_date >= month_start
+        )),
+        "calendar: ручные блокировки месяца": select(UnavailableDate.date, UnavailableDate.comment).where(and_(
+            UnavailableDate.property_id == property_id,
+            UnavailableDate.date >= month_start,
+            UnavailableDate.date < month_end
+        )),
+        "dashboard: новые заявки владельца": select(func.count(Booking.id))
+            .join(Property, Booking.property_id == Property.id)
+            .where(and_(Property.owner_id == OWNER_ID, Booking.status == 'pending')),
+        "dashboard: объекты владельца": select(Property).where(Property.owner_id == OWNER_ID).order_by(Property.id),
+        "search: активные объекты по фильтрам": select(Property).where(and_(
+            Property.is_active == True,
+            Property.district.in_(['Зеленоградск', 'Светлогорск']),
+            Property.price_per_night <= 3000
+        )),
+        "search: рейтинги карточек": select(Review.property_id, func.avg(Review.rating), func.count(Review.id))
+            .where(Review.property_id.in_(property_ids))
+            .group_by(Review.property_id),
+        "search: медиа карточек": select(PropertyMedia).where(PropertyMedia.property_id.in_(property_ids)),
+        "reviews: последние отзывы": select(Review)
+            .where(Review.property_id == property_id)
+            .order_by(Review.created_at.desc())
+            .limit(5),
+    }
+
+
+async def explain_all(conn, queries: dict) -> dict[str, list[str]]:
+    plans = {}
+    for name, query in queries.items():
+        sql = query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+        plans[name] = [row[0] for row in result]
+    return plans
+
+
+def print_plans(title: str, plans: dict[str, list[str]]):
+    print("=" * 80)
+    print(title)
+    print("=" * 80)
+    for name, lines in plans.items():
+        print(f"--- {name}")
+        for line in lines:
+            print(f"    {line}")
+
+
+async def main(properties: int, bookings: int):
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            params = {"properties": properties, "bookings": bookings, "owner_id": OWNER_ID, "client_id": CLIENT_ID}
+            for statement in SEED_SQL:
+                await conn.execute(text(statement), params)
+
+            property_ids = (await conn.execute(
+                select(Property.id).where(Property.owner_id == OWNER_ID).order_by(Property.id).limit(50)
+            )).scalars().all()
+            queries = build_queries(property_ids[len(property_ids) // 2], property_ids)
+
+            # До: убираем индексы (DROP INDEX в PostgreSQL транзакционный)
+            savepoint = await conn.begin_nested()
+            for index in INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS public.{index.name}"))
+            await conn.execute(text("ANALYZE"))
+            print_plans("БЕЗ ИНДЕКСОВ", await explain_all(conn, queries))
+            await savepoint.rollback()
+
+            # После: индексы из моделей (если миграция еще не применена — создаем)
+            for index in INDEXES:
+                await conn.execute(CreateIndex(index, if_not_exists=True))
+            await conn.execute(text("ANALYZE"))
+            print_plans("С ИНДЕКСАМИ", await explain_all(conn, queries))
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=2000, help="сколько объектов создать")
+    parser.add_argument("--bookings", type=int, default=40, help="сколько броней на объект")
+    args = parser.parse_args()
+    asyncio.run(main(args.properties, args.bookings))
@@ -0,0 +1,64 @@
+"""
+Измеряет время импорта при запуске (как `python -X importtime`) и показывает самые дорогие модули.
+
+Запуск (БД и Redis не нужны — импорт не должен открывать соединения):
+    python benchmarks/startup_importtime.py --module main --runs 5 --top 15
+    python benchmarks/startup_importtime.py --module src.services.property_service
+
+Каждый прогон — отдельный процесс, поэтому учитывается полный холодный импорт
+(кроме компиляции .pyc, которая выполняется один раз до замеров).
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from os.path import abspath, dirname
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+
+
+def run_import(module: str) -> tuple[float, list[tuple[int, int, str]]]:
+    """Импортирует модуль в новом процессе; возвращает время процесса и строки importtime (self, cumulative, имя)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - started
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return elapsed, rows
+
+
+def main(module: str, runs: int, top: int):
+    run_import(module)  # прогрев: компиляция .pyc
+
+    timings, last_rows = [], []
+    for _ in range(runs):
+        elapsed, last_rows = run_import(module)
+        timings.append(elapsed)
+
+    total_us = next((cumulative for _, cumulative, name in last_rows if name.strip() == module), 0)
+    print(f"Модуль: {module}, прогонов: {runs}")
+    print(f"Процесс: медиана {statistics.median(timings) * 1000:.0f} мс, мин {min(timings) * 1000:.0f} мс")
+    print(f"Импорт {module}: {total_us / 1000:.0f} мс")
+    print(f"--- {top} самых дорогих модулей верхнего уровня (cumulative, мс)")
+    # Модули верхнего уровня вложенности: их время уже включает все зависимости
+    top_level = [row for row in last_rows if len(row[2]) - len(row[2].lstrip()) <= 3]
+    for _, cumulative, name in sorted(top_level, key=lambda row: row[1], reverse=True)[:top]:
+        print(f"{cumulative / 1000:10.1f}  {name.strip()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="какой модуль импортировать")
+    parser.add_argument("--runs", type=int, default=5, help="сколько замеров выполнить")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых дорогих модулей показать")
+    args = parser.parse_args()
+    main(args.module, args.runs, args.top)
@@ -4,23 +4,29 @@ import sys
 from pathlib import Path # <--- ИМПОРТИРУЕМ PATHLIB
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
 from aiogram.types import Message
 from aiohttp import web
 import aiohttp_cors
 
 from src.core.settings import settings
+from src.core.bot import get_bot, close_bot
 from src.core.commands import set_commands
-from src.core.scheduler import scheduler
-from src.handlers import main_router
+from src.core.fsm_storage import create_fsm_storage
+from src.core.redis_client import close_redis
+from src.core.scheduler import start_scheduler, stop_scheduler
+from src.middlewares.db_session import DbSessionMiddleware
+from src.middlewares.metrics import HandlerMetricsMiddleware
+from src.services.db import dispose_engine
+from src.web.update_queue import UpdateQueue
 from src.web.routes import (
     webhook_handler, 
     client_webapp_handler, 
     owner_webapp_handler,
     get_calendar_data,
+    get_quote,
     set_availability,
-    add_price_rule
+    add_price_rule,
+    metrics_handler
 )
 
 # ---> НАЧАЛО КЛЮЧЕВОГО ИЗМЕНЕНИЯ <---
@@ -35,12 +41,30 @@ async def on_startup(app: web.Application):
     bot: Bot = app["bot"]
     base_url = app["base_url"]
     webhook_secret = app["webhook_secret"]
-    
-    await set_commands(bot)
-    await bot.set_webhook(
-        f"{base_url}/webhook",
-        secret_token=webhook_secret,
-        allowed_updates=["message", "callback_query", "my_chat_member", "chat_member"]
+
+    # Роутеры (и вместе с ними все обработчики и сервисы) импортируются только при запуске сервера
+    from src.handlers import main_router
+    app["dp"].include_router(main_router)
+
+    if settings.WEBHOOK_MODE == 'queue':
+        update_queue = UpdateQueue(
+            app["dp"], bot,
+            workers=settings.UPDATE_WORKERS,
+            maxsize=settings.UPDATE_QUEUE_SIZE,
+            put_timeout=settings.UPDATE_QUEUE_PUT_TIMEOUT
+        )
+        update_queue.start()
+        app["update_queue"] = update_queue
+
+    start_scheduler()
+    # Команды и вебхук регистрируются параллельно, команды — только если изменились
+    await asyncio.gather(
+        set_commands(bot),
+        bot.set_webhook(
+            f"{base_url}/webhook",
+            secret_token=webhook_secret,
+            allowed_updates=["message", "callback_query", "my_chat_member", "chat_member"]
+        )
     )
     logging.info("Webhook has been set.")
 
@@ -50,17 +74,27 @@ async def on_shutdown(app: web.Application):
     bot: Bot = app["bot"]
     await bot.delete_webhook()
     logging.info("Webhook has been deleted.")
+    if "update_queue" in app:
+        await app["update_queue"].stop()
+    stop_scheduler()
+    await app["dp"].storage.close()
+    await close_redis()
+    await close_bot()
+    await dispose_engine()
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 
-    bot = Bot(
-        token=settings.BOT_TOKEN.get_secret_value(),
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
-    dp = Dispatcher()
-    dp.include_router(main_router)
+    bot = get_bot()
+    dp = Dispatcher(storage=create_fsm_storage())
+    # Одна ленивая сессия БД на каждое обновление
+    dp.update.outer_middleware(DbSessionMiddleware())
+    # Время и ошибки каждого обработчика; внутренние мидлвари наследуются всеми вложенными роутерами
+    handler_metrics_middleware = HandlerMetricsMiddleware()
+    for event_name, observer in dp.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(handler_metrics_middleware)
 
     app = web.Application()
     
@@ -82,6 +116,8 @@ if __name__ == "__main__":
     app.router.add_get("/webapp/client", client_webapp_handler)
     app.router.add_get("/webapp/owner", owner_webapp_handler)
     app.router.add_post("/webhook", webhook_handler)
+    if settings.METRICS_TOKEN is not None:
+        app.router.add_get("/metrics", metrics_handler)
     
     cors = aiohttp_cors.setup(app, defaults={
         "*": aiohttp_cors.ResourceOptions(
@@ -92,6 +128,9 @@ if __name__ == "__main__":
     
     calendar_resource = cors.add(app.router.add_resource('/api/calendar_data/{property_id}'))
     cors.add(calendar_resource.add_route("GET", get_calendar_data))
+
+    quote_resource = cors.add(app.router.add_resource('/api/quote/{property_id}'))
+    cors.add(quote_resource.add_route("GET", get_quote))
     
     set_availability_resource = cors.add(app.router.add_resource('/api/owner/set_availability'))
     cors.add(set_availability_resource.add_route("POST", set_availability))
@@ -102,8 +141,6 @@ if __name__ == "__main__":
     app.on_startup.append(on_startup)
     app.on_shutdown.append(on_shutdown)
 
-    scheduler.start()
-
     try:
         web.run_app(app, host="0.0.0.0", port=8080)
     except (KeyboardInterrupt, SystemExit):
@@ -0,0 +1,30 @@
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+
+from src.core.outbound import OutboundSession
+from src.core.settings import settings
+
+# Общий для процесса экземпляр бота: один aiohttp-сеанс и пул keep-alive соединений с Bot API.
+# Все вызовы идут через OutboundSession, которая соблюдает лимиты Telegram на отправку
+_bot: Bot | None = None
+
+
+def get_bot() -> Bot:
+    """Возвращает общий экземпляр бота, создавая его при первом обращении."""
+    global _bot
+    if _bot is None:
+        _bot = Bot(
+            token=settings.BOT_TOKEN.get_secret_value(),
+            session=OutboundSession(),
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+    return _bot
+
+
+async def close_bot():
+    """Закрывает HTTP-сеанс общего бота."""
+    global _bot
+    if _bot is not None:
+        await _bot.session.close()
+        _bot = None
@@ -1,6 +1,13 @@
+import asyncio
+import hashlib
+import json
+import logging
+
 from aiogram import Bot
 from aiogram.types import BotCommand, BotCommandScopeChat, BotCommandScopeDefault
+from redis.exceptions import RedisError
 
+from src.core.redis_client import get_redis
 from src.core.settings import settings
 
 # Добавляем /help в список для всех пользователей
@@ -16,13 +23,55 @@ admin_commands = user_commands + [
     BotCommand(command="addproperty", description="🏠 Добавить новый объект"),
     BotCommand(command="verify", description="✅ Верифицировать объект"),
     BotCommand(command="unverify", description="❌ Снять верификацию"),
-    BotCommand(command="setrole", description="👤 Назначить роль")
+    BotCommand(command="setrole", description="👤 Назначить роль"),
+    BotCommand(command="reconcile_ratings", description="🔄 Пересчитать рейтинги"),
+    BotCommand(command="rebuild_availability", description="🗓 Пересобрать карты занятости")
 ]
 
 
-async def set_commands(bot: Bot):
-    await bot.set_my_commands(commands=user_commands, scope=BotCommandScopeDefault())
-    
-    # Убедимся, что у админов будет полный список
-    for admin_id in settings.ADMIN_IDS:
-        await bot.set_my_commands(commands=admin_commands, scope=BotCommandScopeChat(chat_id=admin_id))
\ No newline at end of file
+# Ключ Redis с отпечатком последнего зарегистрированного набора команд
+COMMANDS_FINGERPRINT_KEY = "bot_commands:fingerprint"
+
+
+def commands_fingerprint() -> str:
+    """Отпечаток списков команд и админов: меняется, только если регистрацию нужно повторить."""
+    payload = json.dumps(
+        {
+            'user': [command.model_dump() for command in user_commands],
+            'admin': [command.model_dump() for command in admin_commands],
+            'admin_ids': sorted(settings.ADMIN_IDS),
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def set_commands(bot: Bot, force: bool = False):
+    """
+    Регистрирует команды для всех пользователей и для каждого админа параллельно.
+    Если отпечаток совпадает с сохраненным в Redis при прошлом запуске, регистрация пропускается.
+    """
+    fingerprint = f"{bot.id}:{commands_fingerprint()}"
+    redis = get_redis()
+    if not force:
+        try:
+            if (await redis.get(COMMANDS_FINGERPRINT_KEY)) == fingerprint.encode():
+                logging.info("Команды бота не менялись, регистрация пропущена.")
+                return
+        except RedisError as e:
+            logging.warning("Не удалось проверить отпечаток команд в Redis: %s", e)
+
+    await asyncio.gather(
+        bot.set_my_commands(commands=user_commands, scope=BotCommandScopeDefault()),
+        # Убедимся, что у админов будет полный список
+        *(
+            bot.set_my_commands(commands=admin_commands, scope=BotCommandScopeChat(chat_id=admin_id))
+            for admin_id in settings.ADMIN_IDS
+        )
+    )
+
+    try:
+        await redis.set(COMMANDS_FINGERPRINT_KEY, fingerprint)
+    except RedisError as e:
+        logging.warning("Не удалось сохранить отпечаток команд в Redis: %s", e)
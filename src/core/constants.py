@@ -15,4 +15,24 @@ DISTRICTS = {
 
 PROPERTY_TYPES = ['Квартира', 'Апартаменты', 'Дом', 'Кемпинг']
 ROOM_OPTIONS = ['Студия', '1', '2', '3', '4', '5+']
-GUEST_OPTIONS = ['1', '2', '3', '4', '5', '6', '7', '8+']
\ No newline at end of file
+GUEST_OPTIONS = ['1', '2', '3', '4', '5', '6', '7', '8+']
+
+# Сколько карточек показывать за один раз в результатах поиска
+SEARCH_PAGE_SIZE = 5
+# Максимальная длительность проживания в поиске по датам (ночей)
+SEARCH_MAX_NIGHTS = 60
+# Максимальная длительность одной брони и расчета стоимости через /api/quote (ночей)
+BOOKING_MAX_NIGHTS = 60
+
+# На сколько дней вперед (от начала текущего месяца) хранится битовая карта занятости объекта
+AVAILABILITY_WINDOW_DAYS = 2 * 366
+# Сколько операций (диапазонов) можно передать в одном запросе /api/owner/set_availability
+AVAILABILITY_MAX_OPERATIONS = 50
+
+# Сколько фото можно загрузить за один раз (при создании объекта или добавлении в редакторе)
+PROPERTY_PHOTOS_LIMIT = 10
+
+# Сколько объектов показывать на одной странице /myproperties
+OWNER_DASHBOARD_PAGE_SIZE = 10
+# За сколько дней вперед считать ближайшие заезды в /myproperties
+OWNER_UPCOMING_DAYS = 7
@@ -0,0 +1,113 @@
+from typing import Any, Dict, Literal, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DEFAULT_DESTINY, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+
+from src.core.redis_client import get_redis
+from src.core.settings import settings
+from src.utils.states import AddProperty, BookingFlow, EditProperty, LeaveReview, SearchProperties
+
+# Время жизни (сек) брошенных диалогов по группам состояний.
+# Для групп, которых здесь нет, используется settings.FSM_DEFAULT_TTL.
+STATE_TTLS = {
+    SearchProperties.__full_group_name__: 30 * 60,
+    BookingFlow.__full_group_name__: 60 * 60,
+    EditProperty.__full_group_name__: 2 * 60 * 60,
+    AddProperty.__full_group_name__: 24 * 60 * 60,
+    LeaveReview.__full_group_name__: 7 * 24 * 60 * 60,
+}
+
+# Данные диалога живут ровно столько же, сколько его состояние:
+# берем оставшийся TTL ключа состояния, а если состояния нет — TTL по умолчанию.
+# Скрипт выполняется в Redis атомарно и за один сетевой запрос.
+SET_DATA_SCRIPT = """
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl <= 0 then
+    ttl = tonumber(ARGV[2])
+end
+redis.call('SET', KEYS[2], ARGV[1], 'PX', ttl)
+"""
+
+
+class CompactKeyBuilder(KeyBuilder):
+    """
+    Строит короткие ключи FSM: f:<chat_id>[:<user_id>]:<s|d|l>.
+    В личных чатах chat_id совпадает с user_id, поэтому он не дублируется.
+    """
+
+    PARTS = {"state": "s", "data": "d", "lock": "l"}
+
+    def __init__(self, prefix: str = "f", separator: str = ":"):
+        self.prefix = prefix
+        self.separator = separator
+
+    def build(self, key: StorageKey, part: Optional[Literal["data", "state", "lock"]] = None) -> str:
+        parts = [self.prefix, str(key.chat_id)]
+        if key.thread_id:
+            parts.append(str(key.thread_id))
+        if key.user_id != key.chat_id:
+            parts.append(str(key.user_id))
+        if key.destiny != DEFAULT_DESTINY:
+            parts.append(key.destiny)
+        if part:
+            parts.append(self.PARTS[part])
+        return self.separator.join(parts)
+
+
+class TTLRedisStorage(RedisStorage):
+    """
+    Redis-хранилище FSM с временем жизни, зависящим от группы состояний.
+    Брошенные диалоги (поиск, добавление и редактирование объекта) истекают сами.
+    """
+
+    def __init__(self, redis: Redis, state_ttls: Dict[str, int], default_ttl: int, **kwargs: Any):
+        super().__init__(redis=redis, key_builder=kwargs.pop("key_builder", CompactKeyBuilder()), **kwargs)
+        self.state_ttls = state_ttls
+        self.default_ttl = default_ttl
+        self._set_data_script = redis.register_script(SET_DATA_SCRIPT)
+
+    def ttl_for_state(self, state: str) -> int:
+        group_name = state.rsplit(":", 1)[0]
+        return self.state_ttls.get(group_name, self.default_ttl)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key = self.key_builder.build(key, "state")
+        if state is None:
+            await self.redis.delete(state_key)
+            return
+        state_name = state.state if isinstance(state, State) else state
+        ttl = self.ttl_for_state(state_name)
+        # Вместе с состоянием продлеваем и данные диалога до того же срока
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(state_key, state_name, ex=ttl)
+            pipe.expire(self.key_builder.build(key, "data"), ttl)
+            await pipe.execute()
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        data_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(data_key)
+            return
+        await self._set_data_script(
+            keys=[self.key_builder.build(key, "state"), data_key],
+            args=[self.json_dumps(data), self.default_ttl * 1000]
+        )
+
+    async def close(self) -> None:
+        # Клиент Redis общий для процесса, его закрывает close_redis()
+        pass
+
+
+def create_fsm_storage(redis: Redis | None = None) -> BaseStorage:
+    """
+    Создает хранилище FSM согласно settings.FSM_STORAGE.
+    Тесты могут передать свой клиент (например, fakeredis) или выбрать "memory".
+    """
+    if redis is None:
+        if settings.FSM_STORAGE == 'memory':
+            return MemoryStorage()
+        redis = get_redis()
+    return TTLRedisStorage(redis=redis, state_ttls=STATE_TTLS, default_ttl=settings.FSM_DEFAULT_TTL)
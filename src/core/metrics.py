@@ -0,0 +1,104 @@
+from bisect import bisect_left
+
+# Границы корзин гистограммы времени обработки (сек), как у клиента Prometheus по умолчанию
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class HandlerStats:
+    """Гистограмма времени и счетчики одного обработчика."""
+    __slots__ = ('buckets', 'count', 'total', 'errors')
+
+    def __init__(self):
+        # Последняя корзина — значения больше последней границы (+Inf)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+
+class HandlerMetrics:
+    """
+    Метрики обработчиков по ключу (router, handler, update_type). Запись — поиск корзины
+    и несколько инкрементов без блокировок: весь код бота выполняется в одном цикле событий.
+    """
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str, str], HandlerStats] = {}
+
+    def record(self, router: str, handler: str, update_type: str, elapsed: float, failed: bool = False):
+        key = (router, handler, update_type)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = HandlerStats()
+        stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        stats.count += 1
+        stats.total += elapsed
+        if failed:
+            stats.errors += 1
+
+    def items(self):
+        return self._stats.items()
+
+
+handler_metrics = HandlerMetrics()
+
+# Поля снимков подсистем, которые только растут: выводятся как counter с суффиксом _total, остальные — как gauge
+SNAPSHOT_COUNTERS = {
+    'db_pool': {'checkouts', 'overflow_events', 'timeouts'},
+    'update_queue': {'enqueued', 'processed', 'failed', 'rejected'},
+    'outbound': {'sent', 'throttled', 'retried', 'dropped'},
+    'property_cache': {'hits', 'redis_hits', 'misses', 'invalidations'},
+    'calendar_cache': {'hits', 'misses'},
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: str) -> str:
+    return ','.join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+def render_prometheus(
+    metrics: HandlerMetrics,
+    snapshots: dict[str, dict],
+    counters: dict[str, set[str]] = SNAPSHOT_COUNTERS
+) -> str:
+    """
+    Текст метрик в формате Prometheus. snapshots — снимки подсистем вида {"db_pool": pool_snapshot(), ...};
+    числовое поле снимка выводится как gauge bot_<подсистема>_<поле> или, если оно перечислено
+    в counters, как counter bot_<подсистема>_<поле>_total.
+    """
+    lines = [
+        '# HELP bot_handler_duration_seconds Время выполнения обработчика обновления.',
+        '# TYPE bot_handler_duration_seconds histogram',
+    ]
+    errors = []
+    for (router, handler, update_type), stats in metrics.items():
+        labels = _labels(router=router, handler=handler, update_type=update_type)
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, stats.buckets):
+            cumulative += bucket_count
+            lines.append(f'bot_handler_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'bot_handler_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+        lines.append(f'bot_handler_duration_seconds_sum{{{labels}}} {stats.total}')
+        lines.append(f'bot_handler_duration_seconds_count{{{labels}}} {stats.count}')
+        errors.append(f'bot_handler_errors_total{{{labels}}} {stats.errors}')
+
+    lines.append('# HELP bot_handler_errors_total Сколько раз обработчик завершился исключением.')
+    lines.append('# TYPE bot_handler_errors_total counter')
+    lines.extend(errors)
+
+    for subsystem, snapshot in snapshots.items():
+        subsystem_counters = counters.get(subsystem, ())
+        for field, value in snapshot.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if field in subsystem_counters:
+                name, metric_type = f'bot_{subsystem}_{field}_total', 'counter'
+            else:
+                name, metric_type = f'bot_{subsystem}_{field}', 'gauge'
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from src.core.settings import settings
+
+# Методы Bot API, на которые распространяются лимиты Telegram на отправку сообщений
+PACED_METHOD_PREFIXES = ('send', 'copy', 'forward', 'edit')
+
+
+class TokenBucket:
+    """
+    Ведро токенов с резервированием: reserve() сразу списывает токен и возвращает,
+    сколько секунд подождать до своей очереди. Баланс может уходить в минус —
+    так параллельные вызовы выстраиваются друг за другом без повторных проверок.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        self._refill(time.monotonic())
+        self.tokens -= tokens
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Не выдавать токены ближайшие seconds секунд (после 429 от Telegram)."""
+        self._refill(time.monotonic())
+        # Оставляем один токен на сам повтор, чтобы он ушел ровно через seconds
+        self.tokens = min(self.tokens, 1.0) - seconds * self.rate
+
+    def is_idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class OutboundStats:
+    """Счетчики исходящих вызовов Bot API."""
+
+    def __init__(self):
+        self.queued = 0       # сейчас ждут своей очереди
+        self.sent = 0         # успешно отправлены
+        self.throttled = 0    # ждали токен или получили 429
+        self.retried = 0      # повторены после TelegramRetryAfter
+        self.dropped = 0      # не отправлены: кончились попытки или пауза слишком длинная
+
+    def snapshot(self) -> dict:
+        return {
+            'queued': self.queued,
+            'sent': self.sent,
+            'throttled': self.throttled,
+            'retried': self.retried,
+            'dropped': self.dropped,
+        }
+
+
+class OutboundSession(AiohttpSession):
+    """
+    HTTP-сеанс бота, через который проходят все вызовы Bot API, в том числе
+    message.answer() и bot.send_* из обработчиков. Для отправляющих методов соблюдает
+    общий лимит бота и лимит чата (в группах он строже), отправки в один чат выполняет
+    по очереди в порядке вызова, а на TelegramRetryAfter ждет указанное время и повторяет.
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.global_bucket = TokenBucket(settings.OUTBOUND_GLOBAL_RATE, settings.OUTBOUND_GLOBAL_RATE)
+        self.chat_buckets: dict[int | str, TokenBucket] = {}
+        self.chat_locks: dict[int | str, asyncio.Lock] = {}
+        self.stats = OutboundStats()
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= settings.OUTBOUND_MAX_TRACKED_CHATS:
+                self._prune()
+            # Отрицательный id (или @username канала) — группа или канал
+            is_group = not isinstance(chat_id, int) or chat_id < 0
+            if is_group:
+                bucket = TokenBucket(settings.OUTBOUND_GROUP_RATE, settings.OUTBOUND_GROUP_BURST)
+            else:
+                bucket = TokenBucket(settings.OUTBOUND_CHAT_RATE, settings.OUTBOUND_CHAT_BURST)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune(self):
+        """Забывает чаты, у которых ведро полное и нет отправок в очереди."""
+        for chat_id in [chat_id for chat_id, bucket in self.chat_buckets.items() if bucket.is_idle()]:
+            lock = self.chat_locks.get(chat_id)
+            if lock is None or not lock.locked():
+                self.chat_buckets.pop(chat_id, None)
+                self.chat_locks.pop(chat_id, None)
+
+    async def _wait_for_tokens(self, chat_id: int | str, tokens: int):
+        delay = max(self._chat_bucket(chat_id).reserve(tokens), self.global_bucket.reserve(tokens))
+        if delay > 0:
+            self.stats.throttled += 1
+            await asyncio.sleep(delay)
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None
+    ) -> TelegramType:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None or not method.__api_method__.startswith(PACED_METHOD_PREFIXES):
+            return await super().make_request(bot, method, timeout=timeout)
+
+        # Альбом — это до 10 сообщений, и лимиты Telegram считают каждое из них
+        media = getattr(method, 'media', None)
+        tokens = len(media) if isinstance(media, list) else 1
+
+        lock = self.chat_locks.setdefault(chat_id, asyncio.Lock())
+        self.stats.queued += 1
+        try:
+            async with lock:
+                # Паузы по 429 выдерживаются под блокировкой чата, а вызывающий обработчик занимает
+                # воркер очереди обновлений, поэтому их суммарная длительность ограничена
+                retry_wait = 0
+                for attempt in range(settings.OUTBOUND_MAX_RETRIES + 1):
+                    await self._wait_for_tokens(chat_id, tokens)
+                    try:
+                        result = await super().make_request(bot, method, timeout=timeout)
+                    except TelegramRetryAfter as e:
+                        self.stats.throttled += 1
+                        retry_wait += e.retry_after
+                        if attempt == settings.OUTBOUND_MAX_RETRIES or retry_wait > settings.OUTBOUND_MAX_RETRY_AFTER:
+                            self.stats.dropped += 1
+                            raise
+                        logging.warning(
+                            "Flood control Telegram для чата %s (%s): повтор через %s с",
+                            chat_id, method.__api_method__, e.retry_after
+                        )
+                        self._chat_bucket(chat_id).pause(e.retry_after)
+                        self.stats.retried += 1
+                        continue
+                    self.stats.sent += 1
+                    return result
+        finally:
+            self.stats.queued -= 1
@@ -0,0 +1,22 @@
+from redis.asyncio import Redis
+
+from src.core.settings import settings
+
+# Общий для процесса клиент Redis со своим пулом соединений
+_redis: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """Возвращает общий клиент Redis, создавая его при первом обращении."""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+async def close_redis():
+    """Закрывает общий клиент Redis вместе с пулом соединений."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose(close_connection_pool=True)
+        _redis = None
@@ -1,32 +1,109 @@
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
 
+from src.core.bot import get_bot
 from src.core.settings import settings
 # --- ИСПРАВЛЕНИЕ ЗДЕСЬ: Указываем новый, правильный путь к файлу ---
 from src.keyboards.inline_keyboards import get_rating_keyboard
+from src.services import job_service
+from src.services.availability_bitmap import rebuild_all_availability
 
-jobstores = {
-    'default': SQLAlchemyJobStore(url=settings.DATABASE_URL_psycopg)
-}
-scheduler = AsyncIOScheduler(jobstores=jobstores, timezone="Europe/Kaliningrad")
+# Планировщик только опрашивает очередь scheduled_jobs в БД (через asyncpg),
+# сами задачи в нем не хранятся. Создается в start_scheduler, внутри работающего цикла событий.
+_scheduler = None
 
 
-async def request_review(bot_token: str, chat_id: int, booking_id: int, property_title: str):
+async def request_review(chat_id: int, booking_id: int, property_title: str):
     """
     Запрашивает у пользователя отзыв о проживании.
+    Бот берется общий для процесса, поэтому задачи используют одни keep-alive соединения.
     """
-    temp_bot = Bot(token=bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    try:
-        await temp_bot.send_message(
-            chat_id=chat_id,
-            text=(
-                f"Надеемся, вам понравилось проживание в «{property_title}»!\n\n"
-                f"Пожалуйста, оцените ваш опыт по пятизвездочной шкале. Это поможет другим путешественникам сделать правильный выбор."
-            ),
-            reply_markup=get_rating_keyboard(booking_id)
-        )
-    finally:
-        await temp_bot.session.close()
\ No newline at end of file
+    await get_bot().send_message(
+        chat_id=chat_id,
+        text=(
+            f"Надеемся, вам понравилось проживание в «{property_title}»!\n\n"
+            f"Пожалуйста, оцените ваш опыт по пятизвездочной шкале. Это поможет другим путешественникам сделать правильный выбор."
+        ),
+        reply_markup=get_rating_keyboard(booking_id)
+    )
+
+
+# Виды задач, которые можно ставить в очередь через job_service.schedule_job
+JOB_HANDLERS = {
+    'request_review': request_review,
+}
+
+
+async def _run_job(job):
+    handler = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        raise LookupError(f"Неизвестный вид задачи: {job.kind}")
+    await handler(**job.payload)
+
+
+async def run_due_jobs():
+    """Забирает из очереди пачку наступивших задач и выполняет их параллельно."""
+    jobs = await job_service.claim_due_jobs(
+        limit=settings.JOBS_BATCH_SIZE,
+        lease=timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+        max_attempts=settings.JOBS_MAX_ATTEMPTS
+    )
+    if not jobs:
+        return
+
+    results = await asyncio.gather(
+        *(_run_job(job) for job in jobs),
+        return_exceptions=True
+    )
+
+    done_ids = []
+    for job, result in zip(jobs, results):
+        if not isinstance(result, BaseException):
+            done_ids.append(job.id)
+            continue
+        logging.error(f"Ошибка при выполнении задачи {job.id} ({job.kind}): {result}")
+        retry_at = None
+        if job.attempts < settings.JOBS_MAX_ATTEMPTS:
+            # Экспоненциальная пауза перед повтором: 1, 2, 4... минуты
+            retry_at = datetime.now(timezone.utc) + timedelta(minutes=2 ** (job.attempts - 1))
+        await job_service.fail_job(job.id, repr(result), retry_at)
+    await job_service.complete_jobs(done_ids)
+
+
+def start_scheduler():
+    """Запускает опрос очереди задач. Вызывается из on_startup, внутри работающего цикла событий."""
+    global _scheduler
+    # APScheduler импортируется только при запуске бота, а не при импорте модуля
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    scheduler = _scheduler = AsyncIOScheduler(timezone="Europe/Kaliningrad")
+    scheduler.add_job(
+        run_due_jobs,
+        'interval',
+        seconds=settings.JOBS_POLL_INTERVAL,
+        id='run_due_jobs',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    # С началом месяца окно карт занятости сдвигается: пересобираем устаревшие карты
+    scheduler.add_job(
+        rebuild_all_availability,
+        'cron',
+        hour=3,
+        kwargs={'stale_only': True},
+        id='rebuild_stale_availability',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.start()
+
+
+def stop_scheduler():
+    """Останавливает планировщик, если он был запущен."""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
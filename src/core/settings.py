@@ -26,27 +26,86 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: int
 
+    # Пул соединений asyncpg. Размер подбирается под UPDATE_WORKERS:
+    # каждый обработчик обновлений держит не больше одного соединения
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    # Сколько секунд ждать свободного соединения, прежде чем выдать ошибку
+    DB_POOL_TIMEOUT: float = 10.0
+    # Через сколько секунд пересоздавать соединение (защита от обрывов на стороне сервера/балансировщика)
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Размер кэша подготовленных выражений asyncpg на соединение (0 — отключить, нужно для pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_DB: int = 0
+
+    # Хранилище FSM: "redis" для продакшена, "memory" для локальной отладки и тестов
+    FSM_STORAGE: str = 'redis'
+    # Время жизни (сек) состояния и данных FSM, если для группы состояний не задано свое
+    FSM_DEFAULT_TTL: int = 24 * 60 * 60
 
     WEB_APP_BASE_URL: str
     WEBHOOK_SECRET: SecretStr
 
+    # Кэш карточек объектов: размер и время жизни (сек) в памяти процесса.
+    # Короткий TTL ограничивает устаревание, если объект изменили в другом экземпляре бота
+    PROPERTY_CACHE_SIZE: int = 1000
+    PROPERTY_CACHE_TTL: int = 60
+    # Второй уровень кэша в Redis, общий для всех экземпляров
+    PROPERTY_CACHE_REDIS: bool = False
+    PROPERTY_CACHE_REDIS_TTL: int = 60 * 60
+
+    # Сколько рассчитанных месяцев календаря хранить в памяти процесса (ключ — версия месяца)
+    CALENDAR_CACHE_SIZE: int = 2000
+
+    # Режим вебхука: "queue" — сразу отвечаем Telegram и обрабатываем обновление в фоне,
+    # "sync" — обрабатываем обновление до ответа, как раньше
+    WEBHOOK_MODE: str = 'queue'
+    UPDATE_WORKERS: int = 8
+    UPDATE_QUEUE_SIZE: int = 1000
+    # Сколько секунд ждать места в переполненной очереди, прежде чем отказать Telegram
+    UPDATE_QUEUE_PUT_TIMEOUT: float = 2.0
+
+    # Лимиты исходящих вызовов Bot API (сообщений в секунду): на весь бот, на личный чат и на группу.
+    # BURST — сколько сообщений подряд можно отправить в чат без паузы
+    OUTBOUND_GLOBAL_RATE: float = 30.0
+    OUTBOUND_CHAT_RATE: float = 1.0
+    OUTBOUND_CHAT_BURST: float = 3.0
+    OUTBOUND_GROUP_RATE: float = 20 / 60
+    OUTBOUND_GROUP_BURST: float = 3.0
+    # Сколько раз повторять вызов после TelegramRetryAfter и сколько секунд пауз суммарно ждать.
+    # Пока идет пауза, обработчик занимает воркер очереди обновлений, поэтому ожидание короткое
+    OUTBOUND_MAX_RETRIES: int = 3
+    OUTBOUND_MAX_RETRY_AFTER: int = 5
+    # После скольких отслеживаемых чатов забывать простаивающие
+    OUTBOUND_MAX_TRACKED_CHATS: int = 10000
+
+    # Токен для GET /metrics (заголовок "Authorization: Bearer <токен>"). Маршрут на публичном сервере
+    # вебхука, поэтому без токена он не регистрируется
+    METRICS_TOKEN: SecretStr | None = None
+
+    # Очередь отложенных задач (таблица scheduled_jobs)
+    JOBS_POLL_INTERVAL: int = 10
+    JOBS_BATCH_SIZE: int = 50
+    # Через сколько секунд задача, взятая упавшим экземпляром, снова станет доступна
+    JOBS_LEASE_SECONDS: int = 300
+    JOBS_MAX_ATTEMPTS: int = 3
+
     @property
     def DATABASE_URL_asyncpg(self) -> str:
         return (f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD.get_secret_value()}"
                 f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}")
 
+    @property
+    def REDIS_URL(self) -> str:
+        return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
+
     @property
     def DATABASE_URL_psycopg(self) -> str:
         return (f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD.get_secret_value()}"
                 f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}")
 
 settings = Settings()
-
-# Не забудьте удалить этот блок после отладки!
-print("="*50)
-print(f"DEBUG: Trying to load .env from: {env_path}")
-print("DEBUG: Loaded settings object:")
-print(settings.model_dump())
-print("="*50)
\ No newline at end of file
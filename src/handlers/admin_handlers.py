@@ -8,10 +8,12 @@ from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 
 from src.services.property_service import set_property_verified
-from src.services.booking_service import update_booking_status, get_booking_with_details
+from src.services.booking_service import update_booking_status, get_booking_with_details, BookingConflictError
 from src.services.user_service import set_user_role
+from src.services.review_service import reconcile_rating_stats
+from src.services.availability_bitmap import rebuild_all_availability
+from src.services.job_service import schedule_job
 from src.core.settings import settings
-from src.core.scheduler import scheduler, request_review
 
 router = Router()
 # Фильтр гарантирует, что все обработчики в этом файле будут работать только для админов
@@ -83,13 +85,50 @@ async def unverify_property(message: Message):
         await message.answer(f"Произошла ошибка: {e}")
 
 
+@router.message(Command("reconcile_ratings"))
+async def reconcile_ratings(message: Message):
+    """
+    Пересчитывает сводку рейтингов объектов по таблице отзывов.
+    Формат: /reconcile_ratings
+    """
+    try:
+        fixed_ids = await reconcile_rating_stats()
+    except Exception as e:
+        logging.error(f"Ошибка при пересчете рейтингов: {e}")
+        await message.answer("Произошла ошибка при пересчете рейтингов.")
+        return
+    if fixed_ids:
+        await message.answer(f"Сводка рейтингов исправлена для объектов: {', '.join(map(str, fixed_ids))}.")
+    else:
+        await message.answer("Сводка рейтингов совпадает с отзывами, исправлять нечего.")
+
+
+@router.message(Command("rebuild_availability"))
+async def rebuild_availability_handler(message: Message):
+    """
+    Пересобирает карты занятости всех объектов по броням и блокировкам.
+    Формат: /rebuild_availability
+    """
+    try:
+        rebuilt_count = await rebuild_all_availability()
+    except Exception as e:
+        logging.error(f"Ошибка при пересборке карт занятости: {e}")
+        await message.answer("Произошла ошибка при пересборке карт занятости.")
+        return
+    await message.answer(f"Карты занятости пересобраны для объектов: {rebuilt_count}.")
+
+
 # --- Обработка заявок на бронирование (без изменений) ---
 
 @router.callback_query(F.data.startswith("booking:confirm:"))
 async def confirm_booking(callback: CallbackQuery, bot: Bot):
     booking_id = int(callback.data.split(":")[2])
     
-    await update_booking_status(booking_id, "confirmed")
+    try:
+        await update_booking_status(booking_id, "confirmed")
+    except BookingConflictError:
+        await callback.answer("Нельзя подтвердить: эти даты уже заняты другой подтвержденной бронью.", show_alert=True)
+        return
     booking = await get_booking_with_details(booking_id)
     if not booking:
         await callback.answer("Бронирование не найдено.", show_alert=True)
@@ -99,12 +138,10 @@ async def confirm_booking(callback: CallbackQuery, bot: Bot):
     
     try:
         run_date = datetime.now(ZoneInfo("Europe/Kaliningrad")) + timedelta(minutes=2)
-        scheduler.add_job(
-            request_review,
-            'date',
-            run_date=run_date,
-            kwargs={
-                "bot_token": settings.BOT_TOKEN.get_secret_value(),
+        await schedule_job(
+            'request_review',
+            run_at=run_date,
+            payload={
                 "chat_id": booking.user.telegram_id,
                 "booking_id": booking.id,
                 "property_title": booking.property.title
@@ -1,4 +1,5 @@
 import logging
+from functools import partial
 from aiogram import F, Router
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
@@ -7,13 +8,14 @@ from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from src.utils.states import AddProperty
 from src.services.user_service import get_user
 from src.services.property_service import add_property
-from src.services.media_service import add_photos_to_property, add_video_note_to_property
+from src.services.media_service import add_photos_to_property, add_video_note_to_property, count_property_photos
+from src.utils.album_collector import album_collector
 
 # --- ИСПРАВЛЕНИЕ ЗДЕСЬ: Указываем единственно верный файл с клавиатурами ---
 from src.keyboards.inline_keyboards import (get_region_keyboard, get_district_keyboard, get_rooms_keyboard, 
                                            get_property_types_keyboard, get_guests_keyboard, 
                                            get_finish_upload_keyboard, get_skip_video_keyboard)
-from src.core.constants import DISTRICTS
+from src.core.constants import DISTRICTS, PROPERTY_PHOTOS_LIMIT
 
 router = Router()
 
@@ -138,36 +140,58 @@ async def add_property_type_final(callback: CallbackQuery, state: FSMContext):
     finally:
         await callback.answer()
 
+def format_photos_saved(added: int, received: int, total: int, limit: int) -> str:
+    """Ответ на сохраненный альбом: сколько фото добавлено и сколько еще можно отправить."""
+    if added < received:
+        return (
+            f"Сохранено фото: {added}. Достигнут лимит ({limit}), остальные фотографии не добавлены. "
+            f"Нажмите 'Завершить загрузку'."
+        )
+    return f"Сохранено фото: {added} (всего {total} из {limit}). Отправьте еще или нажмите 'Завершить загрузку'."
+
+async def save_album_photos(album: list[Message], property_id: int):
+    """Сохраняет собранный альбом одним запросом и отвечает один раз на весь альбом."""
+    try:
+        added, total = await add_photos_to_property(
+            property_id,
+            [item.photo[-1].file_id for item in album],
+            max_photos=PROPERTY_PHOTOS_LIMIT
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении фото в БД: {e}")
+        await album[-1].answer("Произошла ошибка при сохранении фотографий. Попробуйте отправить их еще раз.")
+        return
+    await album[-1].answer(format_photos_saved(added, len(album), total, PROPERTY_PHOTOS_LIMIT))
+
 @router.message(AddProperty.photos, F.photo)
 async def handle_photos(message: Message, state: FSMContext):
-    photos = (await state.get_data()).get('photos', [])
-    if len(photos) >= 10:
-        await message.answer("Вы уже загрузили максимальное количество фотографий (10). Нажмите 'Завершить загрузку'.")
-        return
-    photos.append(message.photo[-1].file_id)
-    await state.update_data(photos=photos)
+    # Альбом приходит отдельными сообщениями: сохраняем его целиком один раз, когда придет последнее фото
+    property_id = (await state.get_data()).get('property_id')
+    album_collector.collect(message, partial(save_album_photos, property_id=property_id))
 
 @router.message(AddProperty.photos, F.text == "Завершить загрузку")
 async def finish_photo_upload(message: Message, state: FSMContext):
-    data = await state.get_data()
-    photos = data.get('photos')
-    property_id = data.get('property_id')
-
-    if not photos:
-        await message.answer("Вы не загрузили ни одной фотографии. Пожалуйста, отправьте хотя бы одну или отмените /cancel")
-        return
+    property_id = (await state.get_data()).get('property_id')
+    # Кнопку могли нажать раньше, чем сохранился последний альбом
+    await album_collector.flush(message.chat.id, message.from_user.id)
 
     try:
-        await add_photos_to_property(property_id, photos)
-        await message.answer(
-            "Фотографии сохранены. Теперь, если хотите, запишите и отправьте короткий видео-тур ('кружочек') по объекту. Это сильно повысит доверие. Или пропустите этот шаг.",
-            reply_markup=get_skip_video_keyboard()
-        )
-        await state.set_state(AddProperty.video_note)
+        photos_count = await count_property_photos(property_id)
     except Exception as e:
-        logging.error(f"Ошибка при сохранении фото в БД: {e}")
+        logging.error(f"Ошибка при проверке фото в БД: {e}")
         await message.answer("Произошла ошибка при сохранении фотографий. Пожалуйста, попробуйте позже.", reply_markup=ReplyKeyboardRemove())
         await state.clear()
+        return
+
+    if not photos_count:
+        await message.answer("Вы не загрузили ни одной фотографии. Пожалуйста, отправьте хотя бы одну или отмените /cancel")
+        return
+
+    await message.answer(
+        "Фотографии сохранены. Теперь, если хотите, запишите и отправьте короткий видео-тур ('кружочек') по объекту. Это сильно повысит доверие. Или пропустите этот шаг.",
+        reply_markup=get_skip_video_keyboard()
+    )
+    await state.set_state(AddProperty.video_note)
         
 @router.message(AddProperty.video_note, F.video_note)
 async def handle_video_note(message: Message, state: FSMContext):
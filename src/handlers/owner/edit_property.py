@@ -1,13 +1,16 @@
 import logging
+from functools import partial
 from aiogram import F, Router
 from aiogram.filters import StateFilter, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (Message, CallbackQuery, ReplyKeyboardRemove)
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.utils.states import EditProperty
-from src.services.property_service import get_property_with_media_and_owner, update_property_field
+from src.services.property_service import get_property_card, get_property_with_media_and_owner, update_property_field
 from src.services.media_service import (delete_one_media_item, add_photos_to_property,
-                                        add_video_note_to_property)
+                                        add_video_note_to_property, count_property_photos)
+from src.utils.album_collector import album_collector
 # Импортируем все необходимые клавиатуры
 from src.keyboards.inline_keyboards import (get_edit_property_keyboard, get_region_keyboard,
                                            get_district_keyboard, get_rooms_keyboard,
@@ -15,8 +18,9 @@ from src.keyboards.inline_keyboards import (get_edit_property_keyboard, get_regi
                                            get_media_management_keyboard, get_delete_one_media_keyboard,
                                            get_finish_upload_keyboard)
 # Импортируем обработчик /myproperties, чтобы вернуться к нему после редактирования
-from .manage_property import my_properties_list
-from src.core.constants import DISTRICTS
+from .manage_property import send_owner_dashboard
+from .add_property import format_photos_saved
+from src.core.constants import DISTRICTS, PROPERTY_PHOTOS_LIMIT
 
 router = Router()
 
@@ -41,14 +45,14 @@ async def show_edit_menu(message_or_callback: Message | CallbackQuery, state: FS
         await state.clear()
         return
 
-    prop, _, _ = await get_property_with_media_and_owner(property_id)
-    if not prop:
+    card = await get_property_card(property_id)
+    if not card:
         await message_or_callback.answer("Не удалось найти объект. Возможно, он был удален.")
         await state.clear()
         return
 
     # Формируем текст и клавиатуру для меню
-    text = message_text or f"Редактирование объекта: **{prop.title}**\n\nЧто вы хотите изменить?"
+    text = message_text or f"Редактирование объекта: **{card['title']}**\n\nЧто вы хотите изменить?"
     keyboard = get_edit_property_keyboard(property_id)
 
     # Отправляем или редактируем сообщение
@@ -220,6 +224,9 @@ async def delete_media_item_handler(callback: CallbackQuery):
 @router.callback_query(EditProperty.managing_media, F.data.startswith("edit_media:add:"))
 async def add_more_media_prompt(callback: CallbackQuery, state: FSMContext):
     """Запускает процесс добавления новых медиафайлов."""
+    # Лимит считается от текущего числа фото и фиксируется один раз, до прихода альбомов
+    photos_before = await count_property_photos((await state.get_data())['property_id'])
+    await state.update_data(photos_before=photos_before)
     await callback.message.answer(
         "Отправьте новые фото (до 10) или видео-кружочек. Когда закончите, нажмите кнопку.",
         reply_markup=get_finish_upload_keyboard()
@@ -227,32 +234,43 @@ async def add_more_media_prompt(callback: CallbackQuery, state: FSMContext):
     await state.set_state(EditProperty.adding_photos)
     await callback.answer()
 
+async def save_new_album_photos(album: list[Message], property_id: int, photos_before: int):
+    """Сохраняет собранный альбом одним запросом; лимит считается от числа фото до начала добавления."""
+    try:
+        added, total = await add_photos_to_property(
+            property_id,
+            [item.photo[-1].file_id for item in album],
+            max_photos=photos_before + PROPERTY_PHOTOS_LIMIT
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении фото в БД: {e}")
+        await album[-1].answer("Произошла ошибка при сохранении фотографий. Попробуйте отправить их еще раз.")
+        return
+    await album[-1].answer(format_photos_saved(added, len(album), total - photos_before, PROPERTY_PHOTOS_LIMIT))
+
 @router.message(StateFilter(EditProperty.adding_photos), F.photo)
 async def handle_new_photos_in_edit(message: Message, state: FSMContext):
-    """Ловит новые фотографии в режиме добавления."""
-    photos = (await state.get_data()).get('photos_to_add', [])
-    if len(photos) >= 10:
-        await message.answer("Вы уже добавили 10 фото. Нажмите 'Завершить загрузку'.")
-        return
-    photos.append(message.photo[-1].file_id)
-    await state.update_data(photos_to_add=photos)
+    """Ловит новые фотографии в режиме добавления; каждый альбом сохраняется одним запросом."""
+    data = await state.get_data()
+    album_collector.collect(message, partial(
+        save_new_album_photos,
+        property_id=data.get('property_id'),
+        photos_before=data.get('photos_before', 0)
+    ))
 
 @router.message(StateFilter(EditProperty.adding_photos), F.text == "Завершить загрузку")
 async def finish_adding_photos_in_edit(message: Message, state: FSMContext):
-    """Завершает процесс добавления новых фото, сохраняет их в БД."""
+    """Завершает добавление новых фото (они уже сохранены по мере получения) и возвращает в меню."""
     data = await state.get_data()
-    photos = data.get('photos_to_add')
-    property_id = data.get('property_id')
-    if not photos:
+    # Кнопку могли нажать раньше, чем сохранился последний альбом
+    await album_collector.flush(message.chat.id, message.from_user.id)
+    photos_count = await count_property_photos(data.get('property_id'))
+    if photos_count <= data.get('photos_before', 0):
         await message.answer("Вы не отправили ни одного файла. Нажмите 'Отмена' для выхода.", reply_markup=ReplyKeyboardRemove())
         await show_edit_menu(message, state)
         return
 
-    await add_photos_to_property(property_id, photos)
-    
     await message.answer("Новые фото добавлены!", reply_markup=ReplyKeyboardRemove())
-    # Очищаем временное хранилище фото и возвращаемся в меню
-    await state.update_data(photos_to_add=[])
     await show_edit_menu(message, state)
 
 # --- Выход и Отмена ---
@@ -265,12 +283,12 @@ async def finish_media_management(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(EditProperty.choosing_field, F.data == "back_to_my_properties")
-async def back_to_list_from_edit(callback: CallbackQuery, state: FSMContext):
+async def back_to_list_from_edit(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Выход из режима редактирования в общий список объектов /myproperties."""
     await state.clear()
     await callback.message.delete()
     # Вызываем хендлер команды /myproperties, чтобы показать актуальный список
-    await my_properties_list(callback.message)
+    await send_owner_dashboard(callback.message, callback.from_user, session=session)
     await callback.answer("Вы вышли из режима редактирования.")
 
 @router.message(StateFilter(EditProperty), Command("cancel"))
@@ -1,14 +1,18 @@
+import html
+from math import ceil
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импортируем все необходимые сервисы и клавиатуры
-from src.services.property_service import (get_properties_by_owner, toggle_property_activity, 
-                                         delete_property, get_property_with_media_and_owner,
-                                         get_owner_properties_summary)
-from src.services.booking_service import count_pending_bookings_for_owner
+from src.services.property_service import (toggle_property_activity, delete_property,
+                                         get_property_with_media_and_owner, owner_dashboard)
 from src.keyboards.inline_keyboards import (get_property_management_keyboard, 
-                                           get_delete_confirmation_keyboard)
+                                           get_delete_confirmation_keyboard,
+                                           get_owner_dashboard_keyboard)
+from src.services.db import release_session
+from src.core.constants import OWNER_DASHBOARD_PAGE_SIZE, OWNER_UPCOMING_DAYS
 
 router = Router()
 
@@ -21,41 +25,90 @@ def format_my_property_card(prop) -> str:
         f"Статусы: {status_verified}, {status_active}"
     )
 
+def format_owner_dashboard(first_name: str, dashboard: dict, page_properties: list[dict], page: int, pages: int) -> str:
+    """Форматирует приборную панель владельца и список объектов текущей страницы."""
+    lines = [
+        f"Здравствуйте, {html.escape(first_name)}!\n",
+        "<b>Ваша приборная панель:</b>",
+        f"Всего объектов: {dashboard['total']}",
+        f"Активных в поиске: {dashboard['active']}",
+        f"Новых заявок на бронь: {dashboard['pending']}",
+        f"Заездов в ближайшие {OWNER_UPCOMING_DAYS} дн.: {dashboard['upcoming']}",
+        "",
+        f"<b>Ваши объекты</b> (стр. {page + 1} из {pages}):",
+    ]
+    for prop in page_properties:
+        status_verified = "✅" if prop['is_verified'] else "☑️"
+        status_active = "🟢" if prop['is_active'] else "🔴"
+        details = []
+        if prop['avg_rating'] is not None:
+            details.append(f"⭐️ {prop['avg_rating']:.1f} ({prop['reviews_count']})")
+        if prop['pending']:
+            details.append(f"📩 заявок: {prop['pending']}")
+        if prop['next_checkin']:
+            details.append(f"🗓 заезд {prop['next_checkin']:%d.%m}")
+        lines.append(f"\n{status_active}{status_verified} <code>{prop['id']}</code>: <b>{html.escape(prop['title'])}</b>")
+        if details:
+            lines.append(" · ".join(details))
+    return "\n".join(lines)
+
+async def build_owner_dashboard(owner, page: int, session: AsyncSession | None = None):
+    """
+    Готовит текст и клавиатуру страницы /myproperties для владельца.
+    Возвращает (None, None), если у владельца нет объектов.
+    """
+    dashboard = await owner_dashboard(owner.id, upcoming_days=OWNER_UPCOMING_DAYS, session=session)
+    await release_session(session)
+    if not dashboard['properties']:
+        return None, None
+    pages = ceil(dashboard['total'] / OWNER_DASHBOARD_PAGE_SIZE)
+    page = min(max(page, 0), pages - 1)
+    start = page * OWNER_DASHBOARD_PAGE_SIZE
+    page_properties = dashboard['properties'][start:start + OWNER_DASHBOARD_PAGE_SIZE]
+    text = format_owner_dashboard(owner.first_name, dashboard, page_properties, page, pages)
+    return text, get_owner_dashboard_keyboard(page_properties, page, pages)
+
+async def send_owner_dashboard(message: Message, owner, session: AsyncSession | None = None):
+    """Отправляет приборную панель владельца одним сообщением."""
+    text, keyboard = await build_owner_dashboard(owner, page=0, session=session)
+    if text is None:
+        await message.answer("У вас пока нет добавленных объектов. Используйте /addproperty, чтобы добавить первый.")
+        return
+    await message.answer(text, reply_markup=keyboard)
+
 @router.message(Command("myproperties"))
-async def my_properties_list(message: Message):
+async def my_properties_list(message: Message, session: AsyncSession | None = None):
     """
     Обработчик команды /myproperties.
-    Выводит сводную информацию и список объектов владельца с кнопками управления.
+    Выводит сводную информацию и постраничный список объектов владельца одним сообщением.
     """
-    owner_id = message.from_user.id
-    
-    # Получаем сводную информацию по объектам и заявкам
-    total_props, active_props = await get_owner_properties_summary(owner_id)
-    pending_bookings = await count_pending_bookings_for_owner(owner_id)
-    
-    # Формируем и отправляем сводное сообщение
-    summary_text = (
-        f"Здравствуйте, {message.from_user.first_name}!\n\n"
-        f"<b>Ваша приборная панель:</b>\n"
-        f"Всего объектов: {total_props}\n"
-        f"Активных в поиске: {active_props}\n"
-        f"Новых заявок на бронь: {pending_bookings}"
-    )
-    await message.answer(summary_text)
+    await send_owner_dashboard(message, message.from_user, session=session)
 
-    # Получаем и выводим список объектов
-    properties = await get_properties_by_owner(owner_id=owner_id)
-    if not properties:
-        await message.answer("У вас пока нет добавленных объектов. Используйте /addproperty, чтобы добавить первый.")
+@router.callback_query(F.data.startswith("myprops:page:"))
+async def my_properties_page(callback: CallbackQuery, session: AsyncSession):
+    """Листание страниц списка объектов в /myproperties."""
+    page = int(callback.data.split(":")[2])
+    text, keyboard = await build_owner_dashboard(callback.from_user, page, session=session)
+    if text is None:
+        await callback.message.edit_text("У вас пока нет добавленных объектов. Используйте /addproperty, чтобы добавить первый.")
+    else:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("manage:open:"))
+async def open_property_handler(callback: CallbackQuery, session: AsyncSession):
+    """Открывает карточку объекта с кнопками управления из списка /myproperties."""
+    property_id = int(callback.data.split(":")[2])
+    prop, _, _ = await get_property_with_media_and_owner(property_id, session=session)
+    await release_session(session)
+    if not prop or prop.owner_id != callback.from_user.id:
+        await callback.answer("Объект не найден.", show_alert=True)
         return
-    
-    await message.answer("<b>Ваши объекты:</b>")
-    for prop in properties:
-        # Для каждого объекта отправляем его карточку и клавиатуру управления
-        await message.answer(
-            format_my_property_card(prop),
-            reply_markup=get_property_management_keyboard(prop.id, prop.is_active)
-        )
+    await callback.message.answer(
+        format_my_property_card(prop),
+        reply_markup=get_property_management_keyboard(prop.id, prop.is_active)
+    )
+    await callback.answer()
 
 # --- УПРАВЛЕНИЕ ОБЪЕКТОМ ---
 
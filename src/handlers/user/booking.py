@@ -1,47 +1,47 @@
 from aiogram import F, Router, Bot
-from aiogram.types import CallbackQuery, InputMediaPhoto
+from aiogram.types import CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.services.property_service import get_property_with_media_and_owner
-from src.services.review_service import get_reviews_summary 
+from src.services.db import release_session
+from src.services.property_service import get_property_card
 from src.keyboards.inline_keyboards import get_property_card_keyboard
+from src.utils.media_groups import media_group_cache, send_media_groups
 
 router = Router()
 
 @router.callback_query(F.data.startswith(("view_photos:", "view_media:")))
-async def view_media(callback: CallbackQuery, bot: Bot):
+async def view_media(callback: CallbackQuery, bot: Bot, session: AsyncSession):
     await callback.answer()
     property_id = int(callback.data.split(":")[1])
 
-    prop, photo_files, video_file = await get_property_with_media_and_owner(property_id)
+    card = await get_property_card(property_id, session=session)
+    await release_session(session)
 
-    if not prop:
+    if not card:
         await callback.message.answer("Объект не найден.")
         return
 
-    media_to_show = []
+    photo_files, video_file = card['photo_files'], card['video_file']
+    # Карточка и готовые альбомы берутся из кэша: переход к галерее не обращается к БД
+    groups = ()
     if video_file and callback.data.startswith("view_media:"):
         await bot.send_video_note(chat_id=callback.from_user.id, video_note=video_file)
-        media_to_show = photo_files
+        groups = media_group_cache.get_groups(card)
     elif callback.data.startswith("view_photos:") and len(photo_files) > 1:
-        media_to_show = photo_files[1:]
-
-    if media_to_show:
-        if len(media_to_show) > 1:
-            media_group = [InputMediaPhoto(media=file_id) for file_id in media_to_show]
-            await bot.send_media_group(chat_id=callback.from_user.id, media=media_group)
-        elif len(media_to_show) == 1:
-            await bot.send_photo(chat_id=callback.from_user.id, photo=media_to_show[0])
+        # Первое фото уже показано в карточке
+        groups = media_group_cache.get_groups(card, skip_first=True)
+
+    if groups:
+        await send_media_groups(bot, callback.from_user.id, groups)
     elif not video_file:
          await callback.message.answer("Больше фотографий нет.")
 
-    _, reviews_count = await get_reviews_summary(prop.id)
-
     await callback.message.answer(
         text="Выберите дальнейшее действие:",
         reply_markup=get_property_card_keyboard(
-            property_id=prop.id,
+            property_id=property_id,
             photos_count=len(photo_files),
             has_video=bool(video_file),
-            reviews_count=reviews_count
+            reviews_count=card['rating_count']
         )
     )
\ No newline at end of file
@@ -1,11 +1,13 @@
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.utils.states import LeaveReview
-from src.services.review_service import add_review, get_latest_reviews, get_reviews_summary
+from src.services.review_service import add_review, get_latest_reviews
 # --- ИСПРАВЛЕНИЕ ЗДЕСЬ: Импортируем нужные сервисы и клавиатуры ---
-from src.services.property_service import get_property_with_media_and_owner
+from src.services.property_service import get_property_card
+from src.services.db import release_session
 from src.keyboards.inline_keyboards import get_rating_keyboard, get_property_card_keyboard
 
 router = Router()
@@ -43,7 +45,7 @@ async def process_comment(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("view_reviews:"))
-async def view_reviews_handler(callback: CallbackQuery):
+async def view_reviews_handler(callback: CallbackQuery, session: AsyncSession):
     """
     Обработчик для кнопки 'Читать отзывы'.
     Получает отзывы, форматирует их и ВОЗВРАЩАЕТ МЕНЮ.
@@ -51,8 +53,10 @@ async def view_reviews_handler(callback: CallbackQuery):
     await callback.answer()
     property_id = int(callback.data.split(":")[1])
     
-    reviews = await get_latest_reviews(property_id, limit=5)
-    
+    reviews = await get_latest_reviews(property_id, limit=5, session=session)
+    card = await get_property_card(property_id, session=session)
+    await release_session(session)
+
     if not reviews:
         await callback.message.answer("У этого объекта еще нет отзывов.")
         # --- ИСПРАВЛЕНИЕ ЗДЕСЬ: Даже если отзывов нет, вернем меню ---
@@ -66,15 +70,15 @@ async def view_reviews_handler(callback: CallbackQuery):
         await callback.message.answer(response_text)
 
     # --- ИСПРАВЛЕНИЕ ЗДЕСЬ: Возвращаем меню в любом случае ---
-    prop, photo_files, video_file = await get_property_with_media_and_owner(property_id)
-    _, reviews_count = await get_reviews_summary(prop.id)
+    if not card:
+        return
 
     await callback.message.answer(
         text="Выберите дальнейшее действие:",
         reply_markup=get_property_card_keyboard(
-            property_id=prop.id,
-            photos_count=len(photo_files),
-            has_video=bool(video_file),
-            reviews_count=reviews_count
+            property_id=property_id,
+            photos_count=len(card['photo_files']),
+            has_video=bool(card['video_file']),
+            reviews_count=card['rating_count']
         )
     )
\ No newline at end of file
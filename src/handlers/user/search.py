@@ -1,3 +1,6 @@
+import re
+from datetime import date, datetime
+
 from aiogram import F, Router
 from aiogram.filters import StateFilter, Command
 from aiogram.fsm.context import FSMContext
@@ -5,76 +8,149 @@ from aiogram.types import (Message, CallbackQuery, ReplyKeyboardRemove,
                            KeyboardButton, InputMediaPhoto, InlineKeyboardButton)
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
-from src.services.property_service import get_all_properties
-from src.services.review_service import get_reviews_summary
+from src.services.property_service import build_property_card, get_properties_page, get_search_snapshot
+from src.services.property_cache import property_cache
+from src.services.pricing_service import quote_stays
+from src.services.review_service import rating_summary
 from src.keyboards.inline_keyboards import (get_region_keyboard, get_district_keyboard, 
-                                            get_property_card_keyboard, get_guests_keyboard)
-from src.core.constants import DISTRICTS
+                                            get_property_card_keyboard, get_guests_keyboard,
+                                            get_search_more_keyboard)
+from src.core.constants import DISTRICTS, SEARCH_PAGE_SIZE, SEARCH_MAX_NIGHTS
 from src.utils.states import SearchProperties
 
 router = Router()
 
 # --- Вспомогательные функции ---
 
+DATES_PROMPT = (
+    "Укажите даты заезда и выезда в формате ДД.ММ.ГГГГ-ДД.ММ.ГГГГ "
+    "(например, 10.07.2025-15.07.2025) или пропустите этот шаг."
+)
+
+def parse_stay_dates(text: str) -> tuple[date, date] | None:
+    """Разбирает период вида 'ДД.ММ.ГГГГ-ДД.ММ.ГГГГ'. Возвращает (заезд, выезд) или None."""
+    match = re.fullmatch(r"\s*(\d{1,2}\.\d{1,2}\.\d{4})\s*[-–—]\s*(\d{1,2}\.\d{1,2}\.\d{4})\s*", text)
+    if not match:
+        return None
+    try:
+        checkin, checkout = (datetime.strptime(value, "%d.%m.%Y").date() for value in match.groups())
+    except ValueError:
+        return None
+    return checkin, checkout
+
+def get_search_dates(data: dict) -> tuple[date | None, date | None]:
+    """Даты поиска из данных FSM (хранятся строками ISO)."""
+    if not data.get('checkin'):
+        return None, None
+    return date.fromisoformat(data['checkin']), date.fromisoformat(data['checkout'])
+
+async def send_property_card(message: Message, card: dict, stay_total: int | None = None, nights: int | None = None):
+    """
+    Отправляет карточку одного объекта из результатов поиска.
+    Если поиск шел по датам, в карточку добавляется стоимость всего проживания.
+    """
+    avg_rating, reviews_count = rating_summary(card['rating_sum'], card['rating_count'])
+    rating_info = ""
+    if reviews_count > 0 and avg_rating is not None:
+        rating_info = f"⭐️ **{avg_rating:.1f}/5.0** ({reviews_count} отзывов)\n"
+
+    verified_icon = "✅" if card['is_verified'] else ""
+    
+    # Формируем красивую карточку объекта
+    caption = (
+        f"{verified_icon} 🏠 **{card['title']}**\n"
+        f"{rating_info}\n"
+        f"{card['caption']}"
+    )
+    if stay_total is not None:
+        caption += f"\n💳 За {nights} ноч. на ваши даты: {stay_total} руб."
+    
+    photo_files = card['photo_files']
+
+    # Передаем актуальное количество медиа и отзывов в клавиатуру
+    keyboard = get_property_card_keyboard(card['id'], len(photo_files), bool(card['video_file']), reviews_count)
+
+    # Отправляем карточку с фото (если есть) или просто текстом
+    if photo_files:
+        await message.answer_photo(
+            photo=photo_files[0],
+            caption=caption,
+            reply_markup=keyboard
+        )
+    else:
+        await message.answer(caption, reply_markup=keyboard)
+
+
+async def show_results_page(message: Message, state: FSMContext):
+    """
+    Показывает очередную страницу результатов по фильтрам и курсору из состояния.
+    За один вызов отправляется не больше SEARCH_PAGE_SIZE карточек и одно сообщение с кнопкой.
+    """
+    data = await state.get_data()
+    checkin, checkout = get_search_dates(data)
+    cache_token = await property_cache.fill_token()
+    properties, next_after_id = await get_properties_page(
+        districts=data.get('districts'),
+        max_price=data.get('max_price'),
+        min_guests=data.get('min_guests'),
+        after_id=data.get('after_id'),
+        max_id=data.get('max_id'),
+        page_size=SEARCH_PAGE_SIZE,
+        checkin=checkin,
+        checkout=checkout
+    )
+
+    # Стоимость проживания на выбранные даты — одним расчетом на всю страницу
+    stay_totals, nights = {}, None
+    if checkin and properties:
+        stay_totals = await quote_stays([prop.id for prop in properties], checkin, checkout)
+        nights = (checkout - checkin).days
+
+    for prop in properties:
+        # Объект уже загружен вместе с медиа — заодно прогреваем кэш карточек
+        card = build_property_card(prop)
+        await property_cache.put(card, cache_token)
+        await send_property_card(message, card, stay_totals.get(prop.id), nights)
+
+    if next_after_id is None:
+        await state.clear()
+        return
+
+    shown = data.get('shown', 0) + len(properties)
+    await state.update_data(after_id=next_after_id, shown=shown)
+    await message.answer(
+        f"Показано {shown} из {data.get('total')}.",
+        reply_markup=get_search_more_keyboard()
+    )
+
+
 async def show_properties_by_filter(message: Message, state: FSMContext):
     """
-    Финальная функция: собирает данные из состояния, делает запрос в БД и показывает результаты.
+    Финальная функция: фиксирует выдачу по собранным фильтрам и показывает первую страницу.
     """
     data = await state.get_data()
+    checkin, checkout = get_search_dates(data)
     
-    # Вызываем сервис для получения объектов из БД по собранным фильтрам
-    properties = await get_all_properties(
+    # Считаем результаты и запоминаем границу выдачи, чтобы страницы не "плыли"
+    total, max_id = await get_search_snapshot(
         districts=data.get('districts'),
         max_price=data.get('max_price'),
-        min_guests=data.get('min_guests')
+        min_guests=data.get('min_guests'),
+        checkin=checkin,
+        checkout=checkout
     )
-    
-    await state.clear()
 
     # Обрабатываем случай, когда ничего не найдено
-    if not properties:
+    if not total:
+        await state.clear()
         await message.answer("К сожалению, по вашему запросу ничего не найдено. Попробуйте изменить критерии поиска.")
         return
 
-    await message.answer(f"✅ Найдено {len(properties)} вариантов:")
-    for prop in properties:
-        # Получаем рейтинг и количество отзывов для каждого объекта
-        avg_rating, reviews_count = await get_reviews_summary(prop.id)
-        
-        rating_info = ""
-        if reviews_count > 0 and avg_rating is not None:
-            rating_info = f"⭐️ **{avg_rating:.1f}/5.0** ({reviews_count} отзывов)\n"
-
-        verified_icon = "✅" if prop.is_verified else ""
-        rooms_str = f"{prop.rooms} комн." if prop.rooms > 0 else "Студия"
-        
-        # Формируем красивую карточку объекта
-        caption = (
-            f"{verified_icon} 🏠 **{prop.title}**\n"
-            f"{rating_info}\n"
-            f"📝 {prop.description}\n\n"
-            f"📍 Район: {prop.district}\n"
-            f"🗺️ Адрес: {prop.address}\n"
-            f"🛏️ Комнаты: {rooms_str}\n"
-            f"💰 Цена: {prop.price_per_night} руб/ночь\n"
-            f"👥 Гостей: до {prop.max_guests}"
-        )
-        
-        photo_files = [media.file_id for media in prop.media if media.media_type == 'photo']
-        video_note_id = next((media.file_id for media in prop.media if media.media_type == 'video_note'), None)
-
-        # Передаем актуальное количество медиа и отзывов в клавиатуру
-        keyboard = get_property_card_keyboard(prop.id, len(photo_files), bool(video_note_id), reviews_count)
+    await state.update_data(total=total, max_id=max_id, after_id=None, shown=0)
+    await state.set_state(SearchProperties.results)
 
-        # Отправляем карточку с фото (если есть) или просто текстом
-        if photo_files:
-            await message.answer_photo(
-                photo=photo_files[0],
-                caption=caption,
-                reply_markup=keyboard
-            )
-        else:
-            await message.answer(caption, reply_markup=keyboard)
+    await message.answer(f"✅ Найдено {total} вариантов:")
+    await show_results_page(message, state)
 
 
 def get_skip_keyboard(text: str = "Пропустить"):
@@ -88,6 +164,8 @@ def get_skip_keyboard(text: str = "Пропустить"):
 @router.callback_query(F.data == "main_menu:search")
 async def start_search(callback: CallbackQuery, state: FSMContext):
     """Точка входа в поиск. Запускается из главного меню."""
+    # Сбрасываем фильтры и курсор предыдущего поиска
+    await state.set_data({})
     await callback.message.edit_text("Давайте подберем вам жилье. Выберите регион:", reply_markup=get_region_keyboard())
     await state.set_state(SearchProperties.region)
     await callback.answer()
@@ -100,11 +178,8 @@ async def search_select_region(callback: CallbackQuery, state: FSMContext):
     
     if region == "Куршская коса":
         await state.update_data(districts=[region])
-        await callback.message.answer(
-            "Район выбран. Укажите максимальную цену за ночь (например, 5000) или пропустите этот шаг.",
-            reply_markup=get_skip_keyboard()
-        )
-        await state.set_state(SearchProperties.price)
+        await callback.message.answer(f"Район выбран. {DATES_PROMPT}", reply_markup=get_skip_keyboard())
+        await state.set_state(SearchProperties.dates)
     else:
         await callback.message.edit_text("Уточните локацию:", reply_markup=get_district_keyboard(region))
         await state.set_state(SearchProperties.district)
@@ -126,11 +201,8 @@ async def search_all_in_region(callback: CallbackQuery, state: FSMContext):
     await state.update_data(districts=districts_in_region)
     
     await callback.message.edit_text(f"Выбраны все варианты в '{region}'.")
-    await callback.message.answer(
-        "Теперь укажите максимальную цену за ночь (например, 5000) или пропустите этот шаг.", 
-        reply_markup=get_skip_keyboard()
-    )
-    await state.set_state(SearchProperties.price)
+    await callback.message.answer(DATES_PROMPT, reply_markup=get_skip_keyboard())
+    await state.set_state(SearchProperties.dates)
     await callback.answer()
 
 @router.callback_query(SearchProperties.district, F.data.startswith("add_prop_dist:"))
@@ -143,16 +215,39 @@ async def search_select_district(callback: CallbackQuery, state: FSMContext):
     await state.update_data(districts=[district_name])
     
     await callback.message.edit_text("Район выбран.")
-    await callback.message.answer(
-        "Укажите максимальную цену за ночь (например, 5000) или пропустите этот шаг.", 
-        reply_markup=get_skip_keyboard()
-    )
-    await state.set_state(SearchProperties.price)
+    await callback.message.answer(DATES_PROMPT, reply_markup=get_skip_keyboard())
+    await state.set_state(SearchProperties.dates)
     await callback.answer()
 
+@router.message(SearchProperties.dates)
+async def search_by_dates(message: Message, state: FSMContext):
+    """Шаг 3: Пользователь ввел даты заезда и выезда или пропустил шаг."""
+    price_prompt = "Укажите максимальную цену за ночь (например, 5000) или пропустите этот шаг."
+    text = message.text or ""
+    if text.lower() != 'пропустить':
+        stay_dates = parse_stay_dates(text)
+        if stay_dates is None:
+            await message.answer("Не удалось разобрать даты. Введите их в формате ДД.ММ.ГГГГ-ДД.ММ.ГГГГ.")
+            return
+        checkin, checkout = stay_dates
+        if checkin < date.today():
+            await message.answer("Дата заезда уже прошла. Укажите другие даты.")
+            return
+        if not 0 < (checkout - checkin).days <= SEARCH_MAX_NIGHTS:
+            await message.answer(f"Дата выезда должна быть позже даты заезда, но не больше чем на {SEARCH_MAX_NIGHTS} ночей.")
+            return
+        await state.update_data(checkin=checkin.isoformat(), checkout=checkout.isoformat())
+        price_prompt = (
+            "Укажите максимальную среднюю цену за ночь на эти даты (например, 5000) "
+            "или пропустите этот шаг."
+        )
+
+    await message.answer(price_prompt, reply_markup=get_skip_keyboard())
+    await state.set_state(SearchProperties.price)
+
 @router.message(SearchProperties.price)
 async def search_by_price(message: Message, state: FSMContext):
-    """Шаг 3: Пользователь ввел цену или пропустил шаг."""
+    """Шаг 4: Пользователь ввел цену или пропустил шаг."""
     if message.text.lower() != 'пропустить':
         if not message.text.isdigit() or int(message.text) <= 0:
             await message.answer("Пожалуйста, введите цену положительным числом.")
@@ -179,7 +274,7 @@ async def search_skip_guests(callback: CallbackQuery, state: FSMContext):
 
 @router.callback_query(SearchProperties.guests, F.data.startswith("add_property_guests:"))
 async def search_by_guests(callback: CallbackQuery, state: FSMContext):
-    """Шаг 4: Пользователь выбрал количество гостей."""
+    """Шаг 5: Пользователь выбрал количество гостей."""
     guests = callback.data.split(":")[1]
     value_to_save = int(guests.replace('+', ''))
     await state.update_data(min_guests=value_to_save)
@@ -189,6 +284,20 @@ async def search_by_guests(callback: CallbackQuery, state: FSMContext):
     await show_properties_by_filter(callback.message, state)
     await callback.answer()
 
+# --- Постраничный просмотр результатов ---
+
+@router.callback_query(SearchProperties.results, F.data == "search:more")
+async def search_show_more(callback: CallbackQuery, state: FSMContext):
+    """Кнопка 'Показать ещё': показывает следующую страницу результатов."""
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await show_results_page(callback.message, state)
+    await callback.answer()
+
+@router.callback_query(F.data == "search:more")
+async def search_show_more_expired(callback: CallbackQuery):
+    """Кнопка 'Показать ещё' после того, как поиск истек или был отменен."""
+    await callback.answer("Этот поиск устарел. Начните новый из главного меню.", show_alert=True)
+
 # --- Отмена и некорректный ввод ---
 
 @router.message(StateFilter(SearchProperties), Command("cancel"))
@@ -198,7 +307,8 @@ async def cancel_search_handler(message: Message, state: FSMContext):
     await state.clear()
     await message.answer("Поиск отменен.", reply_markup=ReplyKeyboardRemove())
 
-@router.message(StateFilter(SearchProperties))
+@router.message(StateFilter(SearchProperties.region, SearchProperties.district,
+                            SearchProperties.price, SearchProperties.guests))
 async def incorrect_search_input(message: Message):
     """Обработка некорректного ввода (не по кнопке/команде)."""
     await message.answer("Пожалуйста, следуйте инструкциям и используйте кнопки. Для отмены поиска введите /cancel")
\ No newline at end of file
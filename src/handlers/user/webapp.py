@@ -1,10 +1,12 @@
 import json
+import logging
 from datetime import datetime
 from aiogram import F, Router, Bot
 from aiogram.types import Message
 
-from src.services.property_service import get_property_with_media_and_owner
-from src.services import booking_service
+from src.core.constants import BOOKING_MAX_NIGHTS
+from src.services.property_service import get_property_card
+from src.services import booking_service, pricing_service
 from src.keyboards.inline_keyboards import get_booking_management_keyboard
 
 # Создаем отдельный роутер специально для Web App
@@ -21,32 +23,54 @@ async def process_booking_from_webapp(message: Message, bot: Bot):
         property_id = int(data['property_id'])
         checkin_date = datetime.fromisoformat(data['checkin_date'])
         checkout_date = datetime.fromisoformat(data['checkout_date'])
-        total_price = data['total_price']
 
-        prop, _, _ = await get_property_with_media_and_owner(property_id)
-        if not prop:
+        card = await get_property_card(property_id)
+        if not card:
             await message.answer("Ошибка: объект не найден.")
             return
 
-        if prop.owner.telegram_id == message.from_user.id:
+        if card['owner_id'] == message.from_user.id:
             await message.answer("Вы не можете забронировать свой собственный объект.")
             return
 
-        new_booking = await booking_service.create_booking(
-            user_id=message.from_user.id,
-            property_id=property_id,
-            start_date=checkin_date,
-            end_date=checkout_date
-        )
+        num_nights = (checkout_date.date() - checkin_date.date()).days
+        if not 0 < num_nights <= BOOKING_MAX_NIGHTS:
+            await message.answer(f"Дата выезда должна быть позже даты заезда, но не больше чем на {BOOKING_MAX_NIGHTS} ночей.")
+            return
 
-        user_info = f"@{message.from_user.username}" if message.from_user.username else message.from_user.first_name
-        num_nights = (checkout_date - checkin_date).days
+        # Сумму считаем на сервере до создания заявки: total_price из Web App только для сверки
+        quote = await pricing_service.quote_stay(property_id, checkin_date.date(), checkout_date.date())
+        if quote is None:
+            await message.answer("Ошибка: объект не найден.")
+            return
+        total_price = quote['total']
 
+        try:
+            new_booking = await booking_service.create_booking(
+                user_id=message.from_user.id,
+                property_id=property_id,
+                start_date=checkin_date,
+                end_date=checkout_date
+            )
+        except booking_service.BookingConflictError as conflict:
+            if conflict.reason == 'blocked':
+                await message.answer("К сожалению, владелец закрыл часть выбранных дат. Пожалуйста, выберите другие даты.")
+            else:
+                await message.answer("К сожалению, выбранные даты уже заняты. Пожалуйста, выберите другие даты.")
+            return
+
+        if data.get('total_price') != total_price:
+            logging.warning(
+                "Сумма из Web App (%s) не совпала с расчетом сервера (%s) для брони %s",
+                data.get('total_price'), total_price, new_booking.id
+            )
+
+        user_info = f"@{message.from_user.username}" if message.from_user.username else message.from_user.first_name
         await bot.send_message(
-            chat_id=prop.owner.telegram_id,
+            chat_id=card['owner_id'],
             text=(
                 f"🔔 Новая заявка на бронирование!\n\n"
-                f"<b>Объект:</b> «{prop.title}»\n"
+                f"<b>Объект:</b> «{card['title']}»\n"
                 f"<b>Даты:</b> с {checkin_date.strftime('%d.%m.%Y')} по {checkout_date.strftime('%d.%m.%Y')} ({num_nights} ночей)\n"
                 f"<b>Сумма:</b> {total_price} руб.\n"
                 f"<b>Гость:</b> {user_info}"
@@ -115,6 +115,28 @@ def get_property_management_keyboard(property_id: int, is_active: bool):
     builder.adjust(2, 1)
     return builder.as_markup()
 
+def get_owner_dashboard_keyboard(properties: list[dict], page: int, pages: int):
+    """
+    Возвращает клавиатуру приборной панели владельца:
+    по кнопке на каждый объект страницы и навигацию между страницами.
+    """
+    builder = InlineKeyboardBuilder()
+    for prop in properties:
+        status = "🟢" if prop['is_active'] else "🔴"
+        pending = f" · 📩 {prop['pending']}" if prop['pending'] else ""
+        builder.row(InlineKeyboardButton(
+            text=f"{status} {prop['title']}{pending}",
+            callback_data=f"manage:open:{prop['id']}"
+        ))
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"myprops:page:{page - 1}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"myprops:page:{page + 1}"))
+    if navigation:
+        builder.row(*navigation)
+    return builder.as_markup()
+
 def get_delete_confirmation_keyboard(property_id: int):
     """Возвращает клавиатуру подтверждения удаления."""
     builder = InlineKeyboardBuilder()
@@ -170,4 +192,10 @@ def get_booking_management_keyboard(booking_id: int):
     builder.button(text="✅ Принять", callback_data=f"booking:confirm:{booking_id}")
     builder.button(text="❌ Отклонить", callback_data=f"booking:reject:{booking_id}")
     builder.adjust(2)
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+def get_search_more_keyboard():
+    """Возвращает клавиатуру для подгрузки следующей страницы результатов поиска."""
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⬇️ Показать ещё", callback_data="search:more")
+    return builder.as_markup()
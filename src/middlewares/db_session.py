@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.services.db import async_session_maker
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Открывает одну сессию БД на всё обновление и передает ее в хендлер как `session`.
+    Сессия ленивая: соединение берется из пула только при первом запросе,
+    поэтому обновления, которые не ходят в БД, пул не занимают.
+    Сервисы принимают эту сессию необязательным аргументом session=.
+    Соединение занято от первого запроса до release_session() в хендлере (после чтения,
+    перед отправкой ответов) или до конца обработки обновления, если хендлер ее не вызвал.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker = async_session_maker):
+        self.session_maker = session_maker
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.session_maker() as session:
+            data["session"] = session
+            return await handler(event, data)
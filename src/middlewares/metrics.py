@@ -0,0 +1,42 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from src.core.metrics import HandlerMetrics, handler_metrics
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет время и исход каждого вызванного обработчика. Регистрируется как внутренняя
+    (inner) мидлварь, поэтому видит выбранный обработчик и не срабатывает на необработанные обновления.
+    Роутер обозначается модулем обработчика: в проекте один роутер на модуль, а имена роутеров не заданы.
+    """
+
+    def __init__(self, metrics: HandlerMetrics = handler_metrics):
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        event_update = data.get("event_update")
+        update_type = getattr(event_update, "event_type", None) or type(event).__name__
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(event, data)
+            failed = False
+            return result
+        finally:
+            self.metrics.record(
+                getattr(callback, "__module__", "unknown"),
+                getattr(callback, "__qualname__", "unknown"),
+                update_type,
+                time.perf_counter() - started,
+                failed
+            )
@@ -1,7 +1,9 @@
 from datetime import datetime
 # --- ИЗМЕНЕНИЕ ЗДЕСЬ: Полный и правильный список импортов ---
 from sqlalchemy import (BigInteger, Boolean, Column, DateTime, ForeignKey,
-                        Integer, String, Text, func, Date, UniqueConstraint)
+                        Integer, String, Text, func, Date, UniqueConstraint, Index, text, event, DDL,
+                        LargeBinary)
+from sqlalchemy.dialects.postgresql import JSONB, ExcludeConstraint
 from sqlalchemy.orm import relationship, Mapped
 from .base import Base
 
@@ -40,15 +42,24 @@ class Property(Base):
     property_type = Column(String(50), nullable=False)
     is_verified = Column(Boolean, default=False, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Денормализованная сводка отзывов: обновляется вместе с добавлением отзыва
+    rating_sum = Column(Integer, default=0, server_default='0', nullable=False)
+    rating_count = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, **now_on_update_now())
     owner = relationship('User', back_populates='properties')
-    media = relationship('PropertyMedia', back_populates='property', cascade="all, delete-orphan")
+    # Медиа всегда в порядке загрузки: от него зависят первое фото карточки и порядок альбомов
+    media = relationship('PropertyMedia', back_populates='property', cascade="all, delete-orphan", order_by='PropertyMedia.id')
     bookings = relationship('Booking', back_populates='property', cascade="all, delete-orphan")
     reviews = relationship('Review', back_populates='property', cascade="all, delete-orphan")
     unavailable_dates = relationship('UnavailableDate', back_populates='property', cascade="all, delete-orphan")
     price_rules = relationship('PriceRule', back_populates='property', cascade="all, delete-orphan")
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_properties_owner_id', 'owner_id'),
+        # Поиск видит только активные объекты, поэтому частичный индекс компактнее полного
+        Index('ix_properties_active_district_price', 'district', 'price_per_night', postgresql_where=text('is_active')),
+        {'schema': 'public'}
+    )
 
 class PropertyMedia(Base):
     __tablename__ = 'property_media'
@@ -58,7 +69,10 @@ class PropertyMedia(Base):
     media_type = Column(String(10), nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     property = relationship('Property', back_populates='media')
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_property_media_property_id', 'property_id'),
+        {'schema': 'public'}
+    )
 
 class Booking(Base):
     __tablename__ = 'bookings'
@@ -73,7 +87,28 @@ class Booking(Base):
     user = relationship('User', back_populates='bookings')
     property = relationship('Property', back_populates='bookings')
     review = relationship('Review', back_populates='booking', uselist=False, cascade="all, delete-orphan")
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        # Календарь и проверки занятости: брони объекта в статусе, пересекающиеся с периодом
+        Index('ix_bookings_property_status_dates', 'property_id', 'status', 'start_date', 'end_date'),
+        # Счетчик новых заявок для владельца
+        Index('ix_bookings_property_pending', 'property_id', postgresql_where=text("status = 'pending'")),
+        # Подтвержденные брони одного объекта не могут пересекаться по датам (день выезда свободен)
+        ExcludeConstraint(
+            (property_id, '='),
+            (func.tsrange(start_date, end_date), '&&'),
+            name='excl_bookings_confirmed_overlap',
+            using='gist',
+            where=text("status = 'confirmed'")
+        ),
+        {'schema': 'public'}
+    )
+
+# Оператор '=' по integer внутри gist-индекса требует расширения btree_gist
+event.listen(
+    Booking.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql')
+)
 
 class Review(Base):
     __tablename__ = 'reviews'
@@ -88,7 +123,10 @@ class Review(Base):
     property = relationship('Property', back_populates='reviews')
     user = relationship('User', back_populates='reviews')
     booking = relationship('Booking', back_populates='review')
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_reviews_property_created', 'property_id', 'created_at'),
+        {'schema': 'public'}
+    )
 
 class UnavailableDate(Base):
     __tablename__ = 'unavailable_dates'
@@ -113,4 +151,54 @@ class PriceRule(Base):
     price = Column(Integer, nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     property = relationship('Property', back_populates='price_rules')
-    __table_args__ = {'schema': 'public'}
\ No newline at end of file
+    __table_args__ = (
+        Index('ix_price_rules_property_start', 'property_id', 'start_date', 'end_date'),
+        {'schema': 'public'}
+    )
+
+class PropertyAvailability(Base):
+    """
+    Предрассчитанная занятость объекта: битовые карты дней начиная с origin.
+    Бит i соответствует дню origin + i. Пересобирается при каждом изменении броней и блокировок.
+    """
+    __tablename__ = 'property_availability'
+    property_id = Column(Integer, ForeignKey('public.properties.id', ondelete='CASCADE'), primary_key=True)
+    origin = Column(Date, nullable=False)
+    days = Column(Integer, nullable=False)
+    booked = Column(LargeBinary, nullable=False)
+    blocked = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, **now_on_update_now())
+    __table_args__ = (
+        {'schema': 'public'},
+    )
+
+class CalendarMonthVersion(Base):
+    """
+    Версия месяца календаря объекта (month — первое число месяца). Увеличивается при любом
+    изменении броней, блокировок или цен, затрагивающем месяц; используется в ETag календаря.
+    """
+    __tablename__ = 'calendar_month_versions'
+    property_id = Column(Integer, ForeignKey('public.properties.id', ondelete='CASCADE'), primary_key=True)
+    month = Column(Date, primary_key=True)
+    version = Column(Integer, default=1, server_default='1', nullable=False)
+    __table_args__ = (
+        {'schema': 'public'},
+    )
+
+class ScheduledJob(Base):
+    """Отложенная задача (например, запрос отзыва), которую выполняет любой из экземпляров бота."""
+    __tablename__ = 'scheduled_jobs'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), default='pending', nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    __table_args__ = (
+        # Опрос очереди выбирает только ожидающие задачи по времени запуска
+        Index('ix_scheduled_jobs_pending_run_at', 'run_at', postgresql_where=text("status = 'pending'")),
+        {'schema': 'public'}
+    )
@@ -0,0 +1,239 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable
+from sqlalchemy import select, and_, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.constants import AVAILABILITY_WINDOW_DAYS
+from src.models.models import Booking, Property, PropertyAvailability, UnavailableDate
+from .db import session_scope
+
+# Сколько строк property_availability записывать одним INSERT при полной пересборке
+REBUILD_CHUNK_SIZE = 500
+
+
+def booking_nights(start_date: datetime, end_date: datetime) -> int:
+    """
+    Количество занятых дней бронирования. День выезда не включается,
+    как и в get_booked_dates_for_property.
+    """
+    delta = end_date - start_date
+    return max(delta.days + (1 if delta.seconds or delta.microseconds else 0), 0)
+
+
+class DayBitmap:
+    """
+    Битовая карта дней полуинтервала [origin, origin + days): бит i — день origin + i.
+    Внутри это целое число Python, поэтому проверка периода — одна операция AND с маской.
+    В БД хранится как bytea в порядке little-endian, что совпадает с нумерацией get_bit() в PostgreSQL.
+    """
+    __slots__ = ('origin', 'days', 'bits')
+
+    def __init__(self, origin: date, days: int, bits: int = 0):
+        self.origin = origin
+        self.days = days
+        self.bits = bits
+
+    @classmethod
+    def from_ordinals(cls, origin: date, days: int, ordinals: Iterable[int]) -> 'DayBitmap':
+        """Строит карту из порядковых номеров дней (date.toordinal()); дни вне окна отбрасываются."""
+        base = origin.toordinal()
+        bits = 0
+        for ordinal in ordinals:
+            offset = ordinal - base
+            if 0 <= offset < days:
+                bits |= 1 << offset
+        return cls(origin, days, bits)
+
+    @classmethod
+    def from_bytes(cls, origin: date, days: int, raw: bytes) -> 'DayBitmap':
+        return cls(origin, days, int.from_bytes(raw, 'little'))
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes((self.days + 7) // 8, 'little')
+
+    def covers(self, start: date, end: date) -> bool:
+        """Попадает ли полуинтервал [start, end) целиком в окно карты."""
+        return self.origin <= start and end <= self.origin + timedelta(days=self.days)
+
+    def _window(self, start: date, end: date) -> tuple[int, int]:
+        offset = (start - self.origin).days
+        length = max((end - start).days, 0)
+        return offset, (self.bits >> offset) & ((1 << length) - 1)
+
+    def any_in(self, start: date, end: date) -> bool:
+        """Есть ли отмеченные дни в [start, end). Период должен лежать внутри окна (см. covers)."""
+        return self._window(start, end)[1] != 0
+
+    def days_in(self, start: date, end: date) -> list[int]:
+        """Порядковые номера отмеченных дней из [start, end) по возрастанию."""
+        first = start.toordinal()
+        _, window = self._window(start, end)
+        result = []
+        while window:
+            low_bit = window & -window
+            result.append(first + low_bit.bit_length() - 1)
+            window ^= low_bit
+        return result
+
+
+class PropertyAvailabilityMap:
+    """Занятость одного объекта: подтвержденные брони и ручные блокировки отдельными картами."""
+    __slots__ = ('booked', 'blocked')
+
+    def __init__(self, booked: DayBitmap, blocked: DayBitmap):
+        self.booked = booked
+        self.blocked = blocked
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.booked.covers(start, end)
+
+    def is_free(self, start: date, end: date) -> bool:
+        """Свободен ли период [start, end) и от броней, и от блокировок."""
+        offset = (start - self.booked.origin).days
+        mask = (1 << max((end - start).days, 0)) - 1
+        return not ((self.booked.bits | self.blocked.bits) >> offset) & mask
+
+
+def current_origin() -> date:
+    """Начало окна карт: первое число текущего месяца."""
+    return date.today().replace(day=1)
+
+
+async def _load_days(
+    session: AsyncSession,
+    origin: date,
+    end: date,
+    property_ids: list[int] | None = None
+) -> tuple[dict[int, list[int]], dict[int, list[int]]]:
+    """
+    Загружает занятые и заблокированные дни окна [origin, end) двумя запросами
+    (для переданных объектов или для всех сразу) и группирует их по property_id.
+    """
+    start_dt, end_dt = datetime.combine(origin, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    bookings_query = select(Booking.property_id, Booking.start_date, Booking.end_date).where(
+        and_(Booking.status == 'confirmed', Booking.start_date < end_dt, Booking.end_date > start_dt)
+    )
+    blocks_query = select(UnavailableDate.property_id, UnavailableDate.date).where(
+        and_(UnavailableDate.date >= origin, UnavailableDate.date < end)
+    )
+    if property_ids is not None:
+        bookings_query = bookings_query.where(Booking.property_id.in_(property_ids))
+        blocks_query = blocks_query.where(UnavailableDate.property_id.in_(property_ids))
+
+    booked = defaultdict(list)
+    for prop_id, booking_start, booking_end in (await session.execute(bookings_query)).all():
+        first = booking_start.date().toordinal()
+        booked[prop_id].extend(range(first, first + booking_nights(booking_start, booking_end)))
+
+    blocked = defaultdict(list)
+    for prop_id, block_date in (await session.execute(blocks_query)).all():
+        blocked[prop_id].append(block_date.toordinal())
+    return booked, blocked
+
+
+async def _save_maps(session: AsyncSession, rows: list[dict]):
+    stmt = insert(PropertyAvailability).values(rows)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['property_id'],
+            set_={
+                'origin': stmt.excluded.origin,
+                'days': stmt.excluded.days,
+                'booked': stmt.excluded.booked,
+                'blocked': stmt.excluded.blocked,
+                'updated_at': func.now()
+            }
+        )
+    )
+
+
+def _map_row(property_id: int, origin: date, booked: list[int], blocked: list[int]) -> dict:
+    return {
+        'property_id': property_id,
+        'origin': origin,
+        'days': AVAILABILITY_WINDOW_DAYS,
+        'booked': DayBitmap.from_ordinals(origin, AVAILABILITY_WINDOW_DAYS, booked).to_bytes(),
+        'blocked': DayBitmap.from_ordinals(origin, AVAILABILITY_WINDOW_DAYS, blocked).to_bytes()
+    }
+
+
+async def lock_property(session: AsyncSession, property_id: int):
+    """
+    Блокирует строку объекта до конца транзакции, чтобы изменения календаря одного объекта шли по очереди.
+    FOR NO KEY UPDATE не конфликтует с FOR KEY SHARE, которую берут проверки внешних ключей
+    при вставке броней, блокировок и версий месяцев, поэтому такие вставки не встают в очередь
+    за блокировкой, а транзакция, уже вставившая строки со ссылкой на объект, может ее получить.
+    """
+    await session.execute(select(Property.id).where(Property.id == property_id).with_for_update(key_share=True))
+
+
+async def rebuild_availability(property_id: int, session: AsyncSession):
+    """
+    Пересобирает карты объекта в транзакции вызывающего кода (коммит — за ним).
+    Строка объекта блокируется (см. lock_property), чтобы параллельные изменения одного
+    объекта пересобирали карту по очереди и последней записывалась актуальная.
+    """
+    await lock_property(session, property_id)
+    origin = current_origin()
+    booked, blocked = await _load_days(
+        session, origin, origin + timedelta(days=AVAILABILITY_WINDOW_DAYS), property_ids=[property_id]
+    )
+    await _save_maps(session, [_map_row(property_id, origin, booked[property_id], blocked[property_id])])
+
+
+async def rebuild_all_availability(stale_only: bool = False) -> int:
+    """
+    Пересобирает карты всех объектов (или только тех, у которых карты нет
+    либо окно начинается раньше текущего месяца). Возвращает число пересобранных объектов.
+    Объекты обрабатываются пачками по REBUILD_CHUNK_SIZE, каждая — в своей короткой транзакции,
+    чтобы не держать блокировки всех объектов на время полной пересборки.
+    """
+    origin = current_origin()
+    end = origin + timedelta(days=AVAILABILITY_WINDOW_DAYS)
+    rebuilt = 0
+    async with session_scope() as session:
+        ids_query = select(Property.id).order_by(Property.id)
+        if stale_only:
+            ids_query = (
+                ids_query
+                .outerjoin(PropertyAvailability, PropertyAvailability.property_id == Property.id)
+                .where((PropertyAvailability.property_id.is_(None)) | (PropertyAvailability.origin < origin))
+            )
+        property_ids = (await session.execute(ids_query)).scalars().all()
+        await session.commit()
+
+        for chunk_start in range(0, len(property_ids), REBUILD_CHUNK_SIZE):
+            chunk = property_ids[chunk_start:chunk_start + REBUILD_CHUNK_SIZE]
+            # Блокируем объекты пачки (как lock_property), чтобы одновременное подтверждение брони
+            # не перезаписалось устаревшей картой; удаленные с момента выборки объекты пропускаются
+            locked_ids = (await session.execute(
+                select(Property.id)
+                .where(Property.id.in_(chunk))
+                .order_by(Property.id)
+                .with_for_update(key_share=True)
+            )).scalars().all()
+            if locked_ids:
+                booked, blocked = await _load_days(session, origin, end, property_ids=locked_ids)
+                await _save_maps(session, [
+                    _map_row(prop_id, origin, booked.get(prop_id, []), blocked.get(prop_id, []))
+                    for prop_id in locked_ids
+                ])
+                rebuilt += len(locked_ids)
+            await session.commit()
+    return rebuilt
+
+
+async def get_availability_map(property_id: int, session: AsyncSession | None = None) -> PropertyAvailabilityMap | None:
+    """Возвращает карты занятости объекта или None, если они еще не построены."""
+    async with session_scope(session) as session:
+        row = (await session.execute(
+            select(PropertyAvailability).where(PropertyAvailability.property_id == property_id)
+        )).scalar_one_or_none()
+        if row is None:
+            return None
+        return PropertyAvailabilityMap(
+            DayBitmap.from_bytes(row.origin, row.days, row.booked),
+            DayBitmap.from_bytes(row.origin, row.days, row.blocked)
+        )
@@ -1,10 +1,14 @@
-from datetime import date
-from typing import List
-from sqlalchemy import select, delete, and_
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Iterable, List
+from sqlalchemy import select, delete, and_, func, literal, cast, Date
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.models import UnavailableDate
-from src.services.db import async_session_maker
+from src.services.availability_bitmap import lock_property, rebuild_availability
+from src.services.calendar_versions import bump_month_versions, month_starts
+from src.services.db import async_session_maker, session_scope
 
 async def get_manual_blocks(property_id: int) -> List[UnavailableDate]:
     """Возвращает список дат, заблокированных владельцем вручную."""
@@ -13,34 +17,112 @@ async def get_manual_blocks(property_id: int) -> List[UnavailableDate]:
         result = await session.execute(query)
         return result.scalars().all()
 
-async def set_availability_for_period(property_id: int, dates: List[date], is_available: bool, comment: str | None):
+async def get_manual_blocks_in_range(
+    property_id: int,
+    start: date,
+    end: date,
+    session: AsyncSession | None = None
+) -> tuple[array, dict[date, str | None]]:
     """
-    Устанавливает статус доступности для списка дат.
-    Если is_available=False, добавляет/обновляет блокировки.
-    Если is_available=True, удаляет блокировки.
+    Возвращает ручные блокировки полуинтервала [start, end): отсортированный массив
+    порядковых номеров дней (date.toordinal()) и словарь комментариев по датам.
     """
-    async with async_session_maker() as session:
-        if not is_available:
-            # Используем "ON CONFLICT DO UPDATE", чтобы обновить комментарий, если дата уже заблокирована
-            stmt = insert(UnavailableDate).values(
-                [
-                    {"property_id": property_id, "date": d, "comment": comment}
-                    for d in dates
-                ]
-            )
-            update_stmt = stmt.on_conflict_do_update(
-                index_elements=['property_id', 'date'], # Уникальный ключ
-                set_={'comment': stmt.excluded.comment}
-            )
-            await session.execute(update_stmt)
-        else:
-            # Удаляем все блокировки для указанных дат
-            stmt = delete(UnavailableDate).where(
+    async with session_scope(session) as session:
+        query = (
+            select(UnavailableDate.date, UnavailableDate.comment)
+            .where(
                 and_(
                     UnavailableDate.property_id == property_id,
-                    UnavailableDate.date.in_(dates)
+                    UnavailableDate.date >= start,
+                    UnavailableDate.date < end
                 )
             )
-            await session.execute(stmt)
-        
-        await session.commit()
\ No newline at end of file
+            .order_by(UnavailableDate.date)
+        )
+        result = await session.execute(query)
+        rows = result.all()
+    blocked_days = array('l', (block_date.toordinal() for block_date, _ in rows))
+    comments = {block_date: comment for block_date, comment in rows}
+    return blocked_days, comments
+
+class AvailabilityChange:
+    """Одна операция над календарем: закрыть или открыть дни с start по end включительно."""
+    __slots__ = ('start', 'end', 'is_available', 'comment')
+
+    def __init__(self, start: date, end: date, is_available: bool, comment: str | None = None):
+        self.start = start
+        self.end = end
+        self.is_available = is_available
+        self.comment = comment
+
+
+def compress_dates(dates: Iterable[date]) -> list[tuple[date, date]]:
+    """Сворачивает набор дат в отсортированные непрерывные диапазоны [start, end] (границы включены)."""
+    ranges = []
+    for current in sorted(set(dates)):
+        if ranges and current - ranges[-1][1] == timedelta(days=1):
+            ranges[-1][1] = current
+        else:
+            ranges.append([current, current])
+    return [(start, end) for start, end in ranges]
+
+
+async def apply_availability_changes(property_id: int, changes: List[AvailabilityChange]):
+    """
+    Применяет набор операций над календарем объекта в одной транзакции.
+    Каждая операция передается диапазоном: блокировка вставляет дни через generate_series
+    (ON CONFLICT обновляет комментарий уже закрытых дней), снятие удаляет строки по BETWEEN,
+    поэтому размер запросов не зависит от длины периода. Операции применяются по порядку,
+    карта занятости пересобирается и версии затронутых месяцев увеличиваются один раз в конце.
+    Строка объекта блокируется до первой записи, а версии месяцев — после нее, в том же
+    порядке, что и при подтверждении брони (update_booking_status), чтобы не было взаимных блокировок.
+    """
+    async with async_session_maker() as session:
+        await lock_property(session, property_id)
+        months = set()
+        for change in changes:
+            if not change.is_available:
+                days = func.generate_series(
+                    datetime.combine(change.start, datetime.min.time()),
+                    datetime.combine(change.end, datetime.min.time()),
+                    timedelta(days=1)
+                ).table_valued('day').alias('days')
+                stmt = insert(UnavailableDate).from_select(
+                    ['property_id', 'date', 'comment'],
+                    select(
+                        literal(property_id),
+                        cast(days.c.day, Date),
+                        literal(change.comment, UnavailableDate.comment.type)
+                    ).select_from(days)
+                )
+                await session.execute(stmt.on_conflict_do_update(
+                    index_elements=['property_id', 'date'],
+                    set_={'comment': stmt.excluded.comment}
+                ))
+            else:
+                await session.execute(
+                    delete(UnavailableDate).where(
+                        and_(
+                            UnavailableDate.property_id == property_id,
+                            UnavailableDate.date.between(change.start, change.end)
+                        )
+                    )
+                )
+            months.update(month_starts(change.start, change.end))
+
+        await rebuild_availability(property_id, session)
+        await bump_month_versions(session, property_id, months)
+        await session.commit()
+
+
+async def set_availability_for_period(property_id: int, dates: List[date], is_available: bool, comment: str | None):
+    """
+    Устанавливает статус доступности для списка дат.
+    Если is_available=False, добавляет/обновляет блокировки.
+    Если is_available=True, удаляет блокировки.
+    Даты сворачиваются в диапазоны и применяются через apply_availability_changes.
+    """
+    await apply_availability_changes(
+        property_id,
+        [AvailabilityChange(start, end, is_available, comment) for start, end in compress_dates(dates)]
+    )
@@ -1,31 +1,105 @@
-from datetime import datetime, timedelta
-from sqlalchemy import select, update, func, and_
+from array import array
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert, update, func, and_, exists, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.models.models import Booking, Property
-from .db import async_session_maker
+from src.models.models import Booking, Property, UnavailableDate
+from .availability_bitmap import booking_nights, rebuild_availability
+from .calendar_versions import bump_calendar_versions
+from .db import async_session_maker, session_scope
+
+# SQLSTATE нарушения ограничения-исключения (excl_bookings_confirmed_overlap)
+EXCLUSION_VIOLATION = '23P01'
+
+
+class BookingConflictError(Exception):
+    """
+    Даты брони недоступны. reason: 'booked' — пересекается с подтвержденной бронью,
+    'blocked' — попадает на дни, закрытые владельцем.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def booking_conflicts(property_id, start_date: datetime, end_date: datetime):
+    """
+    Условия EXISTS для пересечения с подтвержденными бронями и с закрытыми днями.
+    property_id — число или колонка Property.id (тогда подзапросы коррелируют с внешним запросом).
+    """
+    first_day = start_date.date()
+    booked = exists().where(
+        Booking.property_id == property_id,
+        Booking.status == 'confirmed',
+        Booking.start_date < end_date,
+        Booking.end_date > start_date
+    )
+    blocked = exists().where(
+        UnavailableDate.property_id == property_id,
+        UnavailableDate.date >= first_day,
+        UnavailableDate.date < first_day + timedelta(days=booking_nights(start_date, end_date))
+    )
+    return booked, blocked
 
 
 async def create_booking(user_id: int, property_id: int, start_date: datetime, end_date: datetime) -> Booking:
-    """Создает новую заявку на бронирование с датами и статусом 'pending'."""
-    async with async_session_maker() as session:
-        new_booking = Booking(
-            user_id=user_id,
-            property_id=property_id,
-            start_date=start_date,
-            end_date=end_date
+    """
+    Создает новую заявку на бронирование с датами и статусом 'pending'.
+    Проверка занятости и вставка выполняются одним запросом (INSERT ... SELECT ... WHERE NOT EXISTS),
+    поэтому между ними нет окна для гонки. Если даты заняты, бросает BookingConflictError.
+    """
+    booked, blocked = booking_conflicts(property_id, start_date, end_date)
+    query = (
+        insert(Booking)
+        .from_select(
+            ['user_id', 'property_id', 'start_date', 'end_date', 'status'],
+            select(
+                literal(user_id, Booking.user_id.type),
+                literal(property_id),
+                literal(start_date, Booking.start_date.type),
+                literal(end_date, Booking.end_date.type),
+                literal('pending')
+            ).where(~booked, ~blocked)
         )
-        session.add(new_booking)
+        .returning(Booking)
+    )
+    async with async_session_maker() as session:
+        result = await session.execute(query)
+        new_booking = result.scalar_one_or_none()
+        if new_booking is None:
+            # Заявка не вставлена — узнаем причину (только на редком пути конфликта)
+            is_booked = await session.scalar(select(booked))
+            raise BookingConflictError('booked' if is_booked else 'blocked')
         await session.commit()
         return new_booking
 
 async def update_booking_status(booking_id: int, status: str) -> Booking | None:
-    """Обновляет статус бронирования (pending, confirmed, rejected)."""
+    """
+    Обновляет статус бронирования (pending, confirmed, rejected).
+    Подтверждение брони, пересекающейся с уже подтвержденной, отклоняется
+    ограничением в БД и превращается в BookingConflictError.
+    Если меняется набор подтвержденных броней, карта занятости объекта
+    пересобирается, а версии затронутых месяцев календаря увеличиваются в той же транзакции.
+    """
     async with async_session_maker() as session:
         booking = await session.get(Booking, booking_id)
         if booking:
+            affects_availability = 'confirmed' in (booking.status, status)
             booking.status = status
-            await session.commit()
+            try:
+                if affects_availability:
+                    await rebuild_availability(booking.property_id, session)
+                    await bump_calendar_versions(
+                        session, booking.property_id, booking.start_date.date(), booking.end_date.date()
+                    )
+                await session.commit()
+            except IntegrityError as e:
+                if getattr(e.orig, 'sqlstate', None) == EXCLUSION_VIOLATION:
+                    raise BookingConflictError('booked') from e
+                raise
         return booking
 
 async def get_booking_with_details(booking_id: int):
@@ -40,9 +114,9 @@ async def get_booking_with_details(booking_id: int):
         return result.unique().scalar_one_or_none()
 
 
-async def count_pending_bookings_for_owner(owner_id: int) -> int:
+async def count_pending_bookings_for_owner(owner_id: int, session: AsyncSession | None = None) -> int:
     """Подсчитывает количество необработанных заявок ('pending') для владельца."""
-    async with async_session_maker() as session:
+    async with session_scope(session) as session:
         query = (
             select(func.count(Booking.id))
             .join(Property, Booking.property_id == Property.id)
@@ -76,3 +150,38 @@ async def get_booked_dates_for_property(property_id: int) -> list[datetime.date]
                 booked_dates.append(current_date.date())
                 current_date += timedelta(days=1)
         return booked_dates
+
+
+async def get_booked_days_in_range(
+    property_id: int,
+    start: date,
+    end: date,
+    session: AsyncSession | None = None
+) -> array:
+    """
+    Возвращает занятые подтвержденными бронированиями дни полуинтервала [start, end)
+    в виде отсортированного массива порядковых номеров дней (date.toordinal()).
+    Условие пересечения с периодом выполняется в SQL, поэтому старые брони не загружаются.
+    """
+    start_ordinal, end_ordinal = start.toordinal(), end.toordinal()
+    async with session_scope(session) as session:
+        query = select(Booking.start_date, Booking.end_date).where(
+            and_(
+                Booking.property_id == property_id,
+                Booking.status == 'confirmed',
+                Booking.start_date < datetime.combine(end, datetime.min.time()),
+                Booking.end_date > datetime.combine(start, datetime.min.time())
+            )
+        )
+        result = await session.execute(query)
+        intervals = sorted(
+            (booking_start.date().toordinal(), booking_start.date().toordinal() + booking_nights(booking_start, booking_end))
+            for booking_start, booking_end in result.all()
+        )
+
+    booked_days = array('l')
+    for interval_start, interval_end in intervals:
+        # Пересекающиеся брони не должны давать повторов в массиве
+        first = max(interval_start, start_ordinal, booked_days[-1] + 1 if booked_days else start_ordinal)
+        booked_days.extend(range(first, min(interval_end, end_ordinal)))
+    return booked_days
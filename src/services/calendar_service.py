@@ -0,0 +1,138 @@
+import calendar
+from collections import OrderedDict
+from datetime import date, timedelta
+from sqlalchemy import select, and_
+
+from src.core.settings import settings
+from src.models.models import CalendarMonthVersion, Property
+from src.services.availability_bitmap import get_availability_map
+from src.services.availability_service import get_manual_blocks_in_range
+from src.services.booking_service import get_booked_days_in_range
+from src.services.pricing_service import get_price_rules_in_range, resolve_daily_prices
+from .db import async_session_maker
+
+
+class MonthCalendarCache:
+    """
+    LRU рассчитанных месяцев календаря в памяти процесса. Ключ — ETag месяца
+    (см. get_month_etag), поэтому после любого изменения данных старая запись
+    просто перестает запрашиваться и вытесняется; явная инвалидация не нужна.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: OrderedDict[str, list[dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> list[dict] | None:
+        days = self._items.get(etag)
+        if days is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(etag)
+        self.hits += 1
+        return days
+
+    def put(self, etag: str, days: list[dict]):
+        self._items[etag] = days
+        self._items.move_to_end(etag)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        return {'size': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+month_cache = MonthCalendarCache(settings.CALENDAR_CACHE_SIZE)
+
+
+async def get_month_etag(property_id: int, year: int, month: int) -> str | None:
+    """
+    Версия месяца календаря одним запросом по первичным ключам. Складывается из версии
+    месяца (брони, блокировки, цены), времени изменения объекта (базовая цена)
+    и текущей даты (статус 'past'). Возвращает None, если объект не найден.
+    """
+    query = (
+        select(Property.updated_at, CalendarMonthVersion.version)
+        .outerjoin(
+            CalendarMonthVersion,
+            and_(
+                CalendarMonthVersion.property_id == Property.id,
+                CalendarMonthVersion.month == date(year, month, 1)
+            )
+        )
+        .where(Property.id == property_id)
+    )
+    async with async_session_maker() as session:
+        row = (await session.execute(query)).one_or_none()
+    if row is None:
+        return None
+    updated_at, version = row
+    return f"{property_id}-{year}-{month:02d}-v{version or 0}-{updated_at:%Y%m%d%H%M%S%f}-{date.today():%Y%m%d}"
+
+
+async def get_month_calendar_cached(property_id: int, year: int, month: int, etag: str) -> list[dict] | None:
+    """Месяц календаря из month_cache по ETag; при промахе рассчитывается через get_month_calendar."""
+    days_data = month_cache.get(etag)
+    if days_data is None:
+        days_data = await get_month_calendar(property_id, year, month)
+        if days_data is not None:
+            month_cache.put(etag, days_data)
+    return days_data
+
+
+async def get_month_calendar(property_id: int, year: int, month: int) -> list[dict] | None:
+    """
+    Собирает данные календаря объекта на месяц для /api/calendar_data.
+    Цены, ручные блокировки и бронирования, пересекающиеся с месяцем,
+    загружаются по одному запросу на каждый вид данных, а дальше месяц
+    собирается в памяти. Если месяц покрыт картой занятости объекта,
+    брони берутся из нее, а строки блокировок читаются только ради комментариев.
+    Возвращает None, если объект не найден.
+    """
+    first_day = date(year, month, 1)
+    days_in_month = calendar.monthrange(year, month)[1]
+    next_month_day = first_day + timedelta(days=days_in_month)
+
+    async with async_session_maker() as session:
+        base_price = (await session.execute(
+            select(Property.price_per_night).where(Property.id == property_id)
+        )).scalar_one_or_none()
+        if base_price is None:
+            return None
+
+        rules = await get_price_rules_in_range(property_id, first_day, next_month_day, session=session)
+        availability = await get_availability_map(property_id, session=session)
+        if availability is not None and availability.covers(first_day, next_month_day):
+            booked_days = set(availability.booked.days_in(first_day, next_month_day))
+            # Комментарии блокировок хранятся только в строках, читаем их, если в месяце есть блокировки
+            manual_block_map = {}
+            if availability.blocked.any_in(first_day, next_month_day):
+                _, manual_block_map = await get_manual_blocks_in_range(property_id, first_day, next_month_day, session=session)
+        else:
+            _, manual_block_map = await get_manual_blocks_in_range(property_id, first_day, next_month_day, session=session)
+            booked_days = set(await get_booked_days_in_range(property_id, first_day, next_month_day, session=session))
+
+    prices = resolve_daily_prices(rules, base_price, first_day, next_month_day)
+
+    today = date.today()
+    days_data = []
+    for day_index in range(days_in_month):
+        current_date = first_day + timedelta(days=day_index)
+        status = 'available'
+        comment = None
+        if current_date < today:
+            status = 'past'
+        elif current_date.toordinal() in booked_days:
+            status = 'booked'
+        elif current_date in manual_block_map:
+            status = 'manual_block'
+            comment = manual_block_map[current_date]
+        days_data.append({
+            'date': current_date.strftime('%Y-%m-%d'),
+            'status': status,
+            'price': prices[day_index] if status == 'available' else None,
+            'comment': comment
+        })
+    return days_data
@@ -0,0 +1,44 @@
+from datetime import date
+from typing import Iterable
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import CalendarMonthVersion
+
+
+def month_starts(start: date, end: date) -> list[date]:
+    """Первые числа месяцев, которые пересекает период с start по end включительно."""
+    months = []
+    current = start.replace(day=1)
+    while current <= end:
+        months.append(current)
+        current = date(current.year + 1, 1, 1) if current.month == 12 else date(current.year, current.month + 1, 1)
+    return months
+
+
+async def bump_calendar_versions(session: AsyncSession, property_id: int, start: date, end: date):
+    """
+    Увеличивает версии месяцев объекта, пересекающих период с start по end включительно.
+    Выполняется в транзакции вызывающего кода, поэтому версия меняется ровно вместе с данными.
+    """
+    await bump_month_versions(session, property_id, month_starts(start, end))
+
+
+async def bump_month_versions(session: AsyncSession, property_id: int, months: Iterable[date]):
+    """
+    Увеличивает версии переданных месяцев объекта одним запросом. Строки версий блокируются
+    в порядке возрастания месяца, поэтому параллельные транзакции не ждут друг друга по кругу.
+    Писатели, которые блокируют и строку объекта, увеличивают версии после этой блокировки.
+    """
+    months = sorted(set(months))
+    if not months:
+        return
+    stmt = insert(CalendarMonthVersion).values(
+        [{'property_id': property_id, 'month': month, 'version': 1} for month in months]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['property_id', 'month'],
+            set_={'version': CalendarMonthVersion.version + 1}
+        )
+    )
@@ -1,6 +1,141 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.core.settings import settings
 
-# echo=False, чтобы не засорять логи SQL-запросами в продакшене
-engine = create_async_engine(settings.DATABASE_URL_asyncpg, echo=False) 
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
\ No newline at end of file
+
+class PoolMetrics:
+    """Счетчики пула соединений: сколько ждали соединение, сколько раз пул выходил за pool_size."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, elapsed: float):
+        self.checkouts += 1
+        self.checkout_time_total += elapsed
+        self.checkout_time_max = max(self.checkout_time_max, elapsed)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул asyncpg, который замеряет время получения соединения."""
+
+    def _do_get(self):
+        started = time.monotonic()
+        overflow_before = self._overflow
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.record_checkout(time.monotonic() - started)
+        if self._overflow > overflow_before and self._overflow > 0:
+            # Соединение открыто сверх pool_size
+            pool_metrics.overflow_events += 1
+        return connection
+
+
+_engine: AsyncEngine | None = None
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Возвращает общий движок, создавая его при первом обращении: импорт модуля
+    (в том числе при сборе тестов) не создает пул и не читает настройки БД.
+    """
+    global _engine
+    if _engine is None:
+        # echo=False, чтобы не засорять логи SQL-запросами в продакшене
+        _engine = create_async_engine(
+            settings.DATABASE_URL_asyncpg,
+            echo=False,
+            poolclass=InstrumentedPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+        )
+    return _engine
+
+
+async def dispose_engine():
+    """Закрывает соединения пула общего движка."""
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+def __getattr__(name: str):
+    # Совместимость со старым `from src.services.db import engine`
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySessionMaker(async_sessionmaker):
+    """
+    Фабрика сессий, которая берет общий движок при создании каждой сессии, если bind не задан явно.
+    Движок не запоминается, поэтому после dispose_engine() новые сессии используют тот же
+    движок, что и get_engine() с pool_snapshot().
+    """
+
+    def __call__(self, **local_kw) -> AsyncSession:
+        if self.kw.get('bind') is None and 'bind' not in local_kw:
+            local_kw['bind'] = get_engine()
+        return super().__call__(**local_kw)
+
+
+async_session_maker = LazySessionMaker(expire_on_commit=False)
+
+
+def pool_snapshot() -> dict:
+    """Текущее состояние пула и накопленные метрики."""
+    pool = get_engine().pool
+    checkouts = pool_metrics.checkouts
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": checkouts,
+        "checkout_time_avg": pool_metrics.checkout_time_total / checkouts if checkouts else 0.0,
+        "checkout_time_max": pool_metrics.checkout_time_max,
+        "overflow_events": pool_metrics.overflow_events,
+        "timeouts": pool_metrics.timeouts,
+    }
+
+
+@asynccontextmanager
+async def session_scope(session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+    """
+    Отдает переданную сессию, а если ее нет — открывает новую на время блока.
+    Позволяет нескольким запросам одного сценария работать в общей сессии.
+    """
+    if session is not None:
+        yield session
+        return
+    async with async_session_maker() as new_session:
+        yield new_session
+
+
+async def release_session(session: AsyncSession | None):
+    """
+    Завершает транзакцию общей сессии обновления и возвращает ее соединение в пул.
+    Хендлеры вызывают ее после чтения из БД и до обращений к Bot API: отправка может ждать
+    лимитов Telegram секундами, и соединение не должно все это время висеть idle in transaction.
+    Сессией можно пользоваться и дальше — следующий запрос откроет новую транзакцию.
+    """
+    if session is not None and session.in_transaction():
+        await session.commit()
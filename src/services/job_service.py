@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.settings import settings
+from src.models.models import ScheduledJob
+from .db import session_scope
+
+
+async def schedule_job(kind: str, run_at: datetime, payload: dict, session: AsyncSession | None = None) -> int:
+    """Ставит задачу в очередь scheduled_jobs и возвращает ее id."""
+    async with session_scope(session) as session:
+        job = ScheduledJob(kind=kind, run_at=run_at, payload=payload)
+        session.add(job)
+        await session.commit()
+        return job.id
+
+
+async def claim_due_jobs(
+    limit: int,
+    lease: timedelta,
+    max_attempts: int = settings.JOBS_MAX_ATTEMPTS
+) -> list[ScheduledJob]:
+    """
+    Забирает пачку задач, срок которых наступил, и помечает их как выполняющиеся.
+    FOR UPDATE SKIP LOCKED позволяет нескольким экземплярам бота опрашивать
+    одну очередь: каждая задача достается только одному из них.
+    Задачи, "зависшие" в статусе running дольше lease (экземпляр упал), забираются повторно,
+    пока не исчерпано max_attempts попыток; после этого они помечаются failed, чтобы задача,
+    которая роняет экземпляр, не перезапускалась бесконечно.
+    """
+    async with session_scope() as session:
+        await session.execute(
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.status == 'running',
+                ScheduledJob.locked_until < func.now(),
+                ScheduledJob.attempts >= max_attempts
+            )
+            .values(status='failed', locked_until=None, last_error='Истек срок аренды после последней попытки')
+            .execution_options(synchronize_session=False)
+        )
+        due_ids = (
+            select(ScheduledJob.id)
+            .where(
+                or_(
+                    and_(ScheduledJob.status == 'pending', ScheduledJob.run_at <= func.now()),
+                    and_(
+                        ScheduledJob.status == 'running',
+                        ScheduledJob.locked_until < func.now(),
+                        ScheduledJob.attempts < max_attempts
+                    )
+                )
+            )
+            .order_by(ScheduledJob.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        query = (
+            update(ScheduledJob)
+            .where(ScheduledJob.id.in_(due_ids))
+            .values(
+                status='running',
+                attempts=ScheduledJob.attempts + 1,
+                locked_until=func.now() + lease
+            )
+            .returning(ScheduledJob)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query)
+        jobs = result.scalars().all()
+        await session.commit()
+        return jobs
+
+
+async def complete_jobs(job_ids: list[int]):
+    """Помечает задачи выполненными."""
+    if not job_ids:
+        return
+    async with session_scope() as session:
+        await session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.id.in_(job_ids))
+            .values(status='done', locked_until=None)
+        )
+        await session.commit()
+
+
+async def fail_job(job_id: int, error: str, retry_at: datetime | None):
+    """
+    Фиксирует ошибку задачи. Если передан retry_at, задача вернется в очередь
+    к этому времени, иначе останется в статусе failed.
+    """
+    async with session_scope() as session:
+        values = {'last_error': error[:1000], 'locked_until': None}
+        if retry_at is not None:
+            values.update(status='pending', run_at=retry_at)
+        else:
+            values.update(status='failed')
+        await session.execute(update(ScheduledJob).where(ScheduledJob.id == job_id).values(values))
+        await session.commit()
@@ -1,20 +1,49 @@
-from sqlalchemy import delete
+from sqlalchemy import delete, insert, select, func
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from src.models.models import PropertyMedia
+from src.models.models import Property, PropertyMedia
 from .db import async_session_maker
+from .property_cache import property_cache
 
-async def add_photos_to_property(property_id: int, photo_file_ids: list[str]):
+async def add_photos_to_property(property_id: int, photo_file_ids: list[str], max_photos: int | None = None) -> tuple[int, int]:
+    """
+    Добавляет фото объекту одним INSERT. Если задан max_photos, сохраняется только столько фото,
+    чтобы их общее число у объекта не превысило лимит; строка объекта блокируется на время проверки,
+    поэтому параллельные альбомы не обходят лимит. Возвращает (сколько добавлено, сколько фото теперь всего).
+    """
     async with async_session_maker() as session:
-        for file_id in photo_file_ids:
-            new_photo = PropertyMedia(
-                property_id=property_id,
-                file_id=file_id,
-                media_type='photo'
+        await session.execute(select(Property.id).where(Property.id == property_id).with_for_update())
+        photos_count = await session.scalar(
+            select(func.count(PropertyMedia.id)).where(
+                PropertyMedia.property_id == property_id,
+                PropertyMedia.media_type == 'photo'
+            )
+        )
+        if max_photos is not None:
+            photo_file_ids = photo_file_ids[:max(max_photos - photos_count, 0)]
+        if photo_file_ids:
+            await session.execute(
+                insert(PropertyMedia),
+                [
+                    {'property_id': property_id, 'file_id': file_id, 'media_type': 'photo'}
+                    for file_id in photo_file_ids
+                ]
             )
-            session.add(new_photo)
         await session.commit()
-        
+    if photo_file_ids:
+        await property_cache.invalidate(property_id)
+    return len(photo_file_ids), photos_count + len(photo_file_ids)
+
+async def count_property_photos(property_id: int) -> int:
+    """Количество фото объекта."""
+    async with async_session_maker() as session:
+        return await session.scalar(
+            select(func.count(PropertyMedia.id)).where(
+                PropertyMedia.property_id == property_id,
+                PropertyMedia.media_type == 'photo'
+            )
+        )
+
 async def add_video_note_to_property(property_id: int, file_id: str):
     async with async_session_maker() as session:
         new_video_note = PropertyMedia(
@@ -24,13 +53,20 @@ async def add_video_note_to_property(property_id: int, file_id: str):
         )
         session.add(new_video_note)
         await session.commit()
+    await property_cache.invalidate(property_id)
 
 async def delete_all_media_for_property(property_id: int):
     async with async_session_maker() as session:
         await session.execute(delete(PropertyMedia).where(PropertyMedia.property_id == property_id))
         await session.commit()
+    await property_cache.invalidate(property_id)
 
 async def delete_one_media_item(media_id: int):
     async with async_session_maker() as session:
-        await session.execute(delete(PropertyMedia).where(PropertyMedia.id == media_id))
-        await session.commit()
\ No newline at end of file
+        result = await session.execute(
+            delete(PropertyMedia).where(PropertyMedia.id == media_id).returning(PropertyMedia.property_id)
+        )
+        property_id = result.scalar_one_or_none()
+        await session.commit()
+    if property_id is not None:
+        await property_cache.invalidate(property_id)
\ No newline at end of file
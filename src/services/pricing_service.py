@@ -1,9 +1,12 @@
-from datetime import date
+import heapq
+from datetime import date, timedelta
 from sqlalchemy import select, and_, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.models.models import Property, PriceRule
-from .db import async_session_maker
+from .calendar_versions import bump_calendar_versions
+from .db import async_session_maker, session_scope
 
 async def get_price_for_date(session, property_id: int, target_date: date, base_price: int) -> int:
     """
@@ -27,6 +30,123 @@ async def get_price_for_date(session, property_id: int, target_date: date, base_
 
     return rule_price if rule_price is not None else base_price
 
+async def get_price_rules_in_range(
+    property_id: int,
+    start: date,
+    end: date,
+    session: AsyncSession | None = None
+) -> list[PriceRule]:
+    """Возвращает ценовые правила объекта, пересекающиеся с полуинтервалом [start, end)."""
+    async with session_scope(session) as session:
+        query = select(PriceRule).where(
+            and_(
+                PriceRule.property_id == property_id,
+                PriceRule.start_date < end,
+                PriceRule.end_date >= start
+            )
+        )
+        result = await session.execute(query)
+        return result.scalars().all()
+
+def resolve_daily_prices(rules, base_price: int, start: date, end: date) -> list[int]:
+    """
+    Рассчитывает цену для каждого дня полуинтервала [start, end) по списку правил.
+    Правила — объекты с полями start_date, end_date (включительно) и price.
+    Приоритет как в get_price_for_date: правило, которое начинается позже, побеждает.
+
+    Правила просматриваются одним проходом по дням с кучей "активных" правил,
+    упорядоченной по дате начала: O((days + rules) * log(rules)) вместо запроса на каждый день.
+    """
+    ordered_rules = sorted(
+        (rule for rule in rules if rule.start_date < end and rule.end_date >= start),
+        key=lambda rule: rule.start_date
+    )
+    prices = []
+    active = []  # Куча (-start_ordinal, порядковый номер, end_date, price)
+    next_rule = 0
+    current = start
+    while current < end:
+        # Добавляем все правила, которые уже начались к текущему дню
+        while next_rule < len(ordered_rules) and ordered_rules[next_rule].start_date <= current:
+            rule = ordered_rules[next_rule]
+            heapq.heappush(active, (-rule.start_date.toordinal(), next_rule, rule.end_date, rule.price))
+            next_rule += 1
+        # Убираем закончившиеся правила с вершины: дни только растут, они больше не понадобятся
+        while active and active[0][2] < current:
+            heapq.heappop(active)
+        prices.append(active[0][3] if active else base_price)
+        current += timedelta(days=1)
+    return prices
+
+async def _load_pricing(property_ids: list[int], start: date, end: date, session: AsyncSession):
+    """
+    Загружает базовые цены объектов и все их правила, пересекающиеся с [start, end):
+    два запроса на любое количество объектов. Возвращает ({id: base_price}, {id: [правила]}).
+    """
+    result = await session.execute(
+        select(Property.id, Property.price_per_night).where(Property.id.in_(property_ids))
+    )
+    base_prices = dict(result.all())
+    rules_by_property = {property_id: [] for property_id in base_prices}
+    if base_prices:
+        result = await session.execute(
+            select(PriceRule).where(
+                and_(
+                    PriceRule.property_id.in_(base_prices.keys()),
+                    PriceRule.start_date < end,
+                    PriceRule.end_date >= start
+                )
+            )
+        )
+        for rule in result.scalars().all():
+            rules_by_property[rule.property_id].append(rule)
+    return base_prices, rules_by_property
+
+async def quote_stay(property_id: int, checkin: date, checkout: date, session: AsyncSession | None = None) -> dict | None:
+    """
+    Рассчитывает стоимость проживания: цену каждой ночи по правилам и итог.
+    Ночь — день из [checkin, checkout), день выезда не оплачивается.
+    Возвращает None, если объект не найден.
+    """
+    if checkout <= checkin:
+        raise ValueError("Дата выезда должна быть позже даты заезда")
+    async with session_scope(session) as session:
+        base_prices, rules_by_property = await _load_pricing([property_id], checkin, checkout, session)
+    if property_id not in base_prices:
+        return None
+    prices = resolve_daily_prices(rules_by_property[property_id], base_prices[property_id], checkin, checkout)
+    return {
+        'property_id': property_id,
+        'checkin': checkin.isoformat(),
+        'checkout': checkout.isoformat(),
+        'nights': [
+            {'date': (checkin + timedelta(days=offset)).isoformat(), 'price': price}
+            for offset, price in enumerate(prices)
+        ],
+        'total': sum(prices),
+    }
+
+async def quote_stays(
+    property_ids: list[int],
+    checkin: date,
+    checkout: date,
+    session: AsyncSession | None = None
+) -> dict[int, int]:
+    """
+    Итоговая стоимость проживания [checkin, checkout) сразу для нескольких объектов,
+    например для результатов поиска: {property_id: total}. Ненайденные объекты пропускаются.
+    """
+    if checkout <= checkin:
+        raise ValueError("Дата выезда должна быть позже даты заезда")
+    if not property_ids:
+        return {}
+    async with session_scope(session) as session:
+        base_prices, rules_by_property = await _load_pricing(property_ids, checkin, checkout, session)
+    return {
+        property_id: sum(resolve_daily_prices(rules_by_property[property_id], base_price, checkin, checkout))
+        for property_id, base_price in base_prices.items()
+    }
+
 async def get_property_with_price_rules(session, property_id: int):
     """Загружает объект со всеми его ценовыми правилами."""
     query = (
@@ -38,7 +158,7 @@ async def get_property_with_price_rules(session, property_id: int):
     return result.scalar_one_or_none()
 
 async def add_price_rule(property_id: int, start_date: date, end_date: date, price: int) -> PriceRule:
-    """Создает новое ценовое правило."""
+    """Создает новое ценовое правило и увеличивает версии затронутых месяцев календаря."""
     async with async_session_maker() as session:
         new_rule = PriceRule(
             property_id=property_id,
@@ -47,6 +167,7 @@ async def add_price_rule(property_id: int, start_date: date, end_date: date, pri
             price=price
         )
         session.add(new_rule)
+        await bump_calendar_versions(session, property_id, start_date, end_date)
         await session.commit()
         await session.refresh(new_rule)
         return new_rule
@@ -59,8 +180,15 @@ async def get_price_rules_for_property(property_id: int) -> list[PriceRule]:
         return result.scalars().all()
 
 async def delete_price_rule(rule_id: int) -> bool:
-    """Удаляет ценовое правило по его ID."""
+    """Удаляет ценовое правило по его ID и увеличивает версии затронутых месяцев календаря."""
     async with async_session_maker() as session:
-        result = await session.execute(delete(PriceRule).where(PriceRule.id == rule_id))
+        result = await session.execute(
+            delete(PriceRule)
+            .where(PriceRule.id == rule_id)
+            .returning(PriceRule.property_id, PriceRule.start_date, PriceRule.end_date)
+        )
+        deleted = result.one_or_none()
+        if deleted is not None:
+            await bump_calendar_versions(session, *deleted)
         await session.commit()
-        return result.rowcount > 0
+        return deleted is not None
@@ -0,0 +1,162 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+from src.core.redis_client import get_redis
+from src.core.settings import settings
+
+# Запись карточки в Redis, только если объект не сбрасывали после отметки, с которой начиналась загрузка.
+# KEYS: ключ отметки сброса объекта, ключ карточки; ARGV: отметка загрузки, карточка, TTL
+PUT_IF_NOT_INVALIDATED = """
+local invalidated = tonumber(redis.call('GET', KEYS[1]) or '0')
+if invalidated > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class PropertyCardCache:
+    """
+    Кэш карточек объектов: LRU в памяти процесса и, при необходимости, общий уровень в Redis.
+    Карточка — словарь с подписью, file_id медиа и владельцем объекта (см. property_service.build_property_card).
+    Писатели объектов и медиа обязаны вызывать invalidate() после изменения.
+
+    Чтобы читатель, загрузивший карточку до изменения, не записал ее в кэш после invalidate(),
+    каждый сброс получает номер из растущей последовательности (в процессе и, для Redis, общей),
+    а загрузка начинается с fill_token(): put() пропускает карточку, сброшенную позже этой отметки.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, use_redis: bool, redis_ttl: int, prefix: str = "pcard"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self._items: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        # Номер последнего сброса и номер сброса каждого объекта
+        self._invalidation_seq = 0
+        self._invalidated_at: dict[int, int] = {}
+
+        # Метрики кэша
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _redis_key(self, property_id: int) -> str:
+        return f"{self.prefix}:{property_id}"
+
+    def _invalidated_key(self, property_id: int) -> str:
+        return f"{self.prefix}:invalidated:{property_id}"
+
+    @property
+    def _seq_key(self) -> str:
+        return f"{self.prefix}:invalidation_seq"
+
+    def _get_local(self, property_id: int) -> dict | None:
+        item = self._items.get(property_id)
+        if item is None:
+            return None
+        expires_at, card = item
+        if expires_at < time.monotonic():
+            del self._items[property_id]
+            return None
+        self._items.move_to_end(property_id)
+        return card
+
+    def _put_local(self, card: dict):
+        self._items[card['id']] = (time.monotonic() + self.ttl, card)
+        self._items.move_to_end(card['id'])
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    async def get(self, property_id: int) -> dict | None:
+        card = self._get_local(property_id)
+        if card is not None:
+            self.hits += 1
+            return card
+        if self.use_redis:
+            try:
+                raw = await get_redis().get(self._redis_key(property_id))
+            except RedisError as e:
+                logging.warning("Кэш карточек в Redis недоступен: %s", e)
+                raw = None
+            if raw is not None:
+                card = json.loads(raw)
+                self._put_local(card)
+                self.redis_hits += 1
+                return card
+        self.misses += 1
+        return None
+
+    async def fill_token(self) -> tuple[int, int | None]:
+        """Отметка, которую берут перед загрузкой карточек из БД и передают в put()."""
+        remote_seq = None
+        if self.use_redis:
+            try:
+                remote_seq = int(await get_redis().get(self._seq_key) or 0)
+            except RedisError as e:
+                logging.warning("Кэш карточек в Redis недоступен: %s", e)
+        return self._invalidation_seq, remote_seq
+
+    async def put(self, card: dict, token: tuple[int, int | None]):
+        """Кладет карточку в кэш, если объект не сбрасывали после отметки token (см. fill_token)."""
+        local_seq, remote_seq = token
+        if self._invalidated_at.get(card['id'], 0) > local_seq:
+            return
+        if self.use_redis and remote_seq is not None:
+            try:
+                stored = await get_redis().eval(
+                    PUT_IF_NOT_INVALIDATED, 2,
+                    self._invalidated_key(card['id']), self._redis_key(card['id']),
+                    remote_seq, json.dumps(card), self.redis_ttl
+                )
+            except RedisError as e:
+                logging.warning("Кэш карточек в Redis недоступен: %s", e)
+            else:
+                if not stored:
+                    # Объект изменили в другом экземпляре: эта карточка уже устарела
+                    return
+        self._put_local(card)
+
+    async def invalidate(self, *property_ids: int):
+        self.invalidations += len(property_ids)
+        self._invalidation_seq += 1
+        for property_id in property_ids:
+            self._items.pop(property_id, None)
+            self._invalidated_at[property_id] = self._invalidation_seq
+        if self.use_redis and property_ids:
+            try:
+                redis = get_redis()
+                seq = await redis.incr(self._seq_key)
+                async with redis.pipeline(transaction=True) as pipe:
+                    for property_id in property_ids:
+                        # Отметка хранится дольше, чем длится любая загрузка карточки
+                        pipe.set(self._invalidated_key(property_id), seq, ex=self.redis_ttl)
+                    pipe.delete(*(self._redis_key(property_id) for property_id in property_ids))
+                    await pipe.execute()
+            except RedisError as e:
+                logging.warning("Не удалось сбросить карточки в Redis: %s", e)
+
+    def snapshot(self) -> dict:
+        """Текущие метрики кэша."""
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+property_cache = PropertyCardCache(
+    maxsize=settings.PROPERTY_CACHE_SIZE,
+    ttl=settings.PROPERTY_CACHE_TTL,
+    use_redis=settings.PROPERTY_CACHE_REDIS,
+    redis_ttl=settings.PROPERTY_CACHE_REDIS_TTL,
+)
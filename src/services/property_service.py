@@ -1,9 +1,13 @@
-from sqlalchemy import select, update, delete, func, and_
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, update, delete, func, and_, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import selectinload
 
-from src.models.models import Property, PropertyMedia
-from .db import async_session_maker
+from src.models.models import Booking, PriceRule, Property, PropertyMedia
+from .db import async_session_maker, session_scope
+from .property_cache import property_cache
+from .review_service import rating_summary
+from .booking_service import booking_conflicts
 
 
 async def add_property(data: dict, owner_id: int) -> int:
@@ -29,34 +33,146 @@ async def add_property(data: dict, owner_id: int) -> int:
         await session.commit()
         return property_id
 
+def _stay_total(checkin: date, checkout: date):
+    """
+    Коррелированный подзапрос: стоимость проживания [checkin, checkout) в объекте
+    по ценовым правилам (приоритет у правила, которое начинается позже) и базовой цене.
+    """
+    nights = func.generate_series(
+        datetime.combine(checkin, datetime.min.time()),
+        datetime.combine(checkout - timedelta(days=1), datetime.min.time()),
+        literal_column("interval '1 day'")
+    ).table_valued('night').alias('nights')
+    rule_price = (
+        select(PriceRule.price)
+        .where(
+            PriceRule.property_id == Property.id,
+            PriceRule.start_date <= nights.c.night,
+            PriceRule.end_date >= nights.c.night
+        )
+        .order_by(PriceRule.start_date.desc())
+        .limit(1)
+        .correlate_except(PriceRule)
+        .scalar_subquery()
+    )
+    return (
+        select(func.sum(func.coalesce(rule_price, Property.price_per_night)))
+        .select_from(nights)
+        .correlate(Property)
+        .scalar_subquery()
+    )
+
+def _apply_search_filters(
+    query,
+    districts: list[str] | None,
+    max_price: int | None,
+    min_guests: int | None,
+    checkin: date | None = None,
+    checkout: date | None = None
+):
+    """
+    Добавляет к запросу фильтры поиска по активным объектам.
+    Если заданы даты, отсекает объекты с подтвержденными бронями и закрытыми днями
+    в этом периоде (NOT EXISTS по индексам броней и блокировок), а max_price
+    сравнивается со средней ценой ночи с учетом ценовых правил.
+    """
+    query = query.where(Property.is_active == True)
+    if districts:
+        query = query.where(Property.district.in_(districts)) # Используем .in_ для списка
+    if min_guests:
+        query = query.where(Property.max_guests >= min_guests)
+    if checkin and checkout:
+        booked, blocked = booking_conflicts(
+            Property.id,
+            datetime.combine(checkin, datetime.min.time()),
+            datetime.combine(checkout, datetime.min.time())
+        )
+        query = query.where(~booked, ~blocked)
+        if max_price:
+            nights = (checkout - checkin).days
+            query = query.where(_stay_total(checkin, checkout) <= max_price * nights)
+    elif max_price:
+        query = query.where(Property.price_per_night <= max_price)
+    return query
+
 async def get_all_properties(
     districts: list[str] | None = None, 
     max_price: int | None = None, 
-    min_guests: int | None = None
+    min_guests: int | None = None,
+    after_id: int | None = None,
+    max_id: int | None = None,
+    limit: int | None = None,
+    checkin: date | None = None,
+    checkout: date | None = None
 ):
     """
-    Возвращает список всех активных объектов с учетом фильтров.
+    Возвращает список всех активных объектов с учетом фильтров, упорядоченный по id.
+    after_id/max_id/limit задают страницу для постраничного вывода (keyset-пагинация),
+    checkin/checkout — период, в который объект должен быть свободен.
     """
     async with async_session_maker() as session:
-        query = (
-            select(Property)
-            .where(Property.is_active == True)
-            .options(selectinload(Property.media))
-        )
-        
-        if districts:
-            query = query.where(Property.district.in_(districts)) # Используем .in_ для списка
-        if max_price:
-            query = query.where(Property.price_per_night <= max_price)
-        if min_guests:
-            query = query.where(Property.max_guests >= min_guests)
+        query = _apply_search_filters(
+            select(Property).options(selectinload(Property.media)),
+            districts, max_price, min_guests, checkin, checkout
+        ).order_by(Property.id)
+
+        if after_id is not None:
+            query = query.where(Property.id > after_id)
+        if max_id is not None:
+            query = query.where(Property.id <= max_id)
+        if limit is not None:
+            query = query.limit(limit)
             
         result = await session.execute(query)
         return result.unique().scalars().all()
-# --- КОНЕЦ ИСПРАВЛЕНИЯ ---
 
-async def get_property_with_media_and_owner(property_id: int):
+async def get_search_snapshot(
+    districts: list[str] | None = None,
+    max_price: int | None = None,
+    min_guests: int | None = None,
+    checkin: date | None = None,
+    checkout: date | None = None
+) -> tuple[int, int | None]:
+    """
+    Возвращает количество найденных объектов и максимальный id среди них.
+    Максимальный id фиксирует выдачу: объекты, добавленные во время
+    листания страниц, не сдвинут и не задублируют результаты.
+    """
     async with async_session_maker() as session:
+        query = _apply_search_filters(
+            select(func.count(Property.id), func.max(Property.id)),
+            districts, max_price, min_guests, checkin, checkout
+        )
+        result = await session.execute(query)
+        return tuple(result.one())
+
+async def get_properties_page(
+    districts: list[str] | None = None,
+    max_price: int | None = None,
+    min_guests: int | None = None,
+    after_id: int | None = None,
+    max_id: int | None = None,
+    page_size: int = 5,
+    checkin: date | None = None,
+    checkout: date | None = None
+):
+    """
+    Возвращает страницу результатов поиска и курсор следующей страницы
+    (id последнего показанного объекта) или None, если страница последняя.
+    """
+    properties = await get_all_properties(
+        districts, max_price, min_guests,
+        after_id=after_id, max_id=max_id, limit=page_size + 1,
+        checkin=checkin, checkout=checkout
+    )
+    if len(properties) > page_size:
+        properties = properties[:page_size]
+        return properties, properties[-1].id
+    return properties, None
+# --- КОНЕЦ ИСПРАВЛЕНИЯ ---
+
+async def get_property_with_media_and_owner(property_id: int, session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         query = (
             select(Property)
             .where(Property.id == property_id)
@@ -70,14 +186,63 @@ async def get_property_with_media_and_owner(property_id: int):
             return prop, photo_files, video_file
         return None, [], None
 
+def build_property_card(prop: Property) -> dict:
+    """
+    Собирает карточку объекта для кэша: подпись, сводку отзывов, file_id медиа (по порядку загрузки),
+    версию медиа и владельца. Объект должен быть загружен вместе с media.
+    """
+    # Медиа в порядке загрузки: по нему строятся галерея и альбомы
+    media = sorted(prop.media, key=lambda item: item.id)
+    rooms_str = f"{prop.rooms} комн." if prop.rooms > 0 else "Студия"
+    caption = (
+        f"📝 {prop.description}\n\n"
+        f"📍 Район: {prop.district}\n"
+        f"🗺️ Адрес: {prop.address}\n"
+        f"🛏️ Комнаты: {rooms_str}\n"
+        f"💰 Цена: {prop.price_per_night} руб/ночь\n"
+        f"👥 Гостей: до {prop.max_guests}"
+    )
+    return {
+        'id': prop.id,
+        'owner_id': prop.owner_id,
+        'title': prop.title,
+        'is_active': prop.is_active,
+        'is_verified': prop.is_verified,
+        'caption': caption,
+        'rating_sum': prop.rating_sum,
+        'rating_count': prop.rating_count,
+        'photo_files': [item.file_id for item in media if item.media_type == 'photo'],
+        'video_file': next((item.file_id for item in media if item.media_type == 'video_note'), None),
+        # Меняется при любом добавлении или удалении медиа: ключ кэша альбомов
+        'media_version': f"{len(media)}:{media[-1].id if media else 0}",
+    }
+
+async def get_property_card(property_id: int, session: AsyncSession | None = None) -> dict | None:
+    """Возвращает карточку объекта из кэша, а при промахе загружает ее из БД и кладет в кэш."""
+    card = await property_cache.get(property_id)
+    if card is not None:
+        return card
+    # Отметка до чтения: если объект изменят, пока карточка загружается, она не попадет в кэш
+    token = await property_cache.fill_token()
+    async with session_scope(session) as session:
+        query = select(Property).where(Property.id == property_id).options(selectinload(Property.media))
+        result = await session.execute(query)
+        prop = result.unique().scalar_one_or_none()
+    if prop is None:
+        return None
+    card = build_property_card(prop)
+    await property_cache.put(card, token)
+    return card
+
 async def set_property_verified(property_id: int, status: bool = True):
     async with async_session_maker() as session:
         query = update(Property).where(Property.id == property_id).values(is_verified=status)
         await session.execute(query)
         await session.commit()
+    await property_cache.invalidate(property_id)
 
-async def get_properties_by_owner(owner_id: int):
-    async with async_session_maker() as session:
+async def get_properties_by_owner(owner_id: int, session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         query = select(Property).where(Property.owner_id == owner_id).order_by(Property.id)
         result = await session.execute(query)
         return result.scalars().all()
@@ -88,6 +253,7 @@ async def toggle_property_activity(property_id: int) -> bool:
         if prop:
             prop.is_active = not prop.is_active
             await session.commit()
+            await property_cache.invalidate(property_id)
             return prop.is_active
     return False
 
@@ -95,20 +261,22 @@ async def delete_property(property_id: int):
     async with async_session_maker() as session:
         await session.execute(delete(Property).where(Property.id == property_id))
         await session.commit()
+    await property_cache.invalidate(property_id)
 
 async def update_property_field(property_id: int, field: str, value):
     async with async_session_maker() as session:
         query = update(Property).where(Property.id == property_id).values({field: value})
         await session.execute(query)
         await session.commit()
+    await property_cache.invalidate(property_id)
 
 # --- НОВАЯ ФУНКЦИЯ ---
-async def get_owner_properties_summary(owner_id: int) -> tuple[int, int]:
+async def get_owner_properties_summary(owner_id: int, session: AsyncSession | None = None) -> tuple[int, int]:
     """
     Подсчитывает общее и активное количество объектов владельца.
     Возвращает кортеж (total_count, active_count).
     """
-    async with async_session_maker() as session:
+    async with session_scope(session) as session:
         # Считаем общее количество
         total_query = select(func.count(Property.id)).where(Property.owner_id == owner_id)
         total_result = await session.execute(total_query)
@@ -121,4 +289,47 @@ async def get_owner_properties_summary(owner_id: int) -> tuple[int, int]:
         active_result = await session.execute(active_query)
         active_count = active_result.scalar_one()
         
-        return total_count, active_count
\ No newline at end of file
+        return total_count, active_count
+
+async def owner_dashboard(owner_id: int, upcoming_days: int = 7, session: AsyncSession | None = None) -> dict:
+    """
+    Собирает приборную панель владельца одним запросом.
+    По каждому объекту: число новых заявок, число заездов в ближайшие upcoming_days дней,
+    дата ближайшего заезда и сводка отзывов. Итоги считаются по этим же строкам.
+    """
+    today = datetime.combine(date.today(), datetime.min.time())
+    upcoming = and_(
+        Booking.status == 'confirmed',
+        Booking.start_date >= today,
+        Booking.start_date < today + timedelta(days=upcoming_days)
+    )
+    query = (
+        select(
+            Property.id,
+            Property.title,
+            Property.is_active,
+            Property.is_verified,
+            func.count(Booking.id).filter(Booking.status == 'pending').label('pending'),
+            func.count(Booking.id).filter(upcoming).label('upcoming'),
+            func.min(Booking.start_date).filter(upcoming).label('next_checkin'),
+            Property.rating_sum,
+            Property.rating_count
+        )
+        .outerjoin(Booking, Booking.property_id == Property.id)
+        .where(Property.owner_id == owner_id)
+        .group_by(Property.id)
+        .order_by(Property.id)
+    )
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        properties = [row._asdict() for row in result.all()]
+    for prop in properties:
+        prop['avg_rating'], prop['reviews_count'] = rating_summary(prop.pop('rating_sum'), prop.pop('rating_count'))
+
+    return {
+        'total': len(properties),
+        'active': sum(1 for prop in properties if prop['is_active']),
+        'pending': sum(prop['pending'] for prop in properties),
+        'upcoming': sum(prop['upcoming'] for prop in properties),
+        'properties': properties,
+    }
@@ -1,8 +1,15 @@
-from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.models.models import Booking, Review
-from .db import async_session_maker
+from src.models.models import Booking, Property, Review
+from .db import async_session_maker, session_scope
+from .property_cache import property_cache
+
+def rating_summary(rating_sum: int, rating_count: int) -> tuple[float | None, int]:
+    """Переводит денормализованную сводку объекта в пару (средний рейтинг, количество отзывов)."""
+    if not rating_count:
+        return None, 0
+    return rating_sum / rating_count, rating_count
 
 async def add_review(booking_id: int, rating: int, text: str | None):
     async with async_session_maker() as session:
@@ -18,32 +25,89 @@ async def add_review(booking_id: int, rating: int, text: str | None):
             text=text
         )
         session.add(new_review)
+        # Сводку объекта обновляем в той же транзакции, что и сам отзыв
+        await session.execute(
+            update(Property)
+            .where(Property.id == booking.property_id)
+            .values(
+                rating_sum=Property.rating_sum + rating,
+                rating_count=Property.rating_count + 1
+            )
+        )
         await session.commit()
+    await property_cache.invalidate(booking.property_id)
 
 # --- НОВЫЕ ФУНКЦИИ ---
 
-async def get_reviews_summary(property_id: int) -> tuple[float | None, int]:
+async def get_reviews_summary(property_id: int, session: AsyncSession | None = None) -> tuple[float | None, int]:
     """
     Возвращает средний рейтинг и количество отзывов для объекта.
     """
-    async with async_session_maker() as session:
+    summaries = await get_reviews_summaries([property_id], session=session)
+    return summaries[property_id]
+
+async def get_reviews_summaries(
+    property_ids: list[int],
+    session: AsyncSession | None = None
+) -> dict[int, tuple[float | None, int]]:
+    """
+    Возвращает средний рейтинг и количество отзывов сразу для нескольких объектов
+    по денормализованной сводке в properties: {property_id: (avg_rating, count)}.
+    Объекты без отзывов тоже попадают в словарь со значением (None, 0).
+    """
+    summaries = {property_id: (None, 0) for property_id in property_ids}
+    if not summaries:
+        return summaries
+
+    async with session_scope(session) as session:
         query = (
-            select(
-                func.avg(Review.rating),
-                func.count(Review.id)
-            )
-            .where(Review.property_id == property_id)
+            select(Property.id, Property.rating_sum, Property.rating_count)
+            .where(Property.id.in_(summaries.keys()))
         )
         result = await session.execute(query)
-        # one_or_none() вернет (None, 0), если отзывов нет
-        avg_rating, count = result.one_or_none() or (None, 0)
-        return avg_rating, count
+        for property_id, rating_sum, rating_count in result.all():
+            summaries[property_id] = rating_summary(rating_sum, rating_count)
+        return summaries
 
-async def get_latest_reviews(property_id: int, limit: int = 5):
+async def reconcile_rating_stats() -> list[int]:
     """
-    Возвращает последние N отзывов для объекта.
+    Пересчитывает rating_sum/rating_count по таблице reviews и исправляет расхождения.
+    Возвращает id объектов, у которых сводка разошлась с отзывами.
     """
+    actual = (
+        select(
+            Property.id.label('property_id'),
+            func.coalesce(func.sum(Review.rating), 0).label('rating_sum'),
+            func.count(Review.id).label('rating_count')
+        )
+        .outerjoin(Review, Review.property_id == Property.id)
+        .group_by(Property.id)
+        .subquery()
+    )
+    query = (
+        update(Property)
+        .where(Property.id == actual.c.property_id)
+        .where(or_(
+            Property.rating_sum != actual.c.rating_sum,
+            Property.rating_count != actual.c.rating_count
+        ))
+        .values(rating_sum=actual.c.rating_sum, rating_count=actual.c.rating_count)
+        .returning(Property.id)
+        .execution_options(synchronize_session=False)
+    )
     async with async_session_maker() as session:
+        result = await session.execute(query)
+        fixed_ids = result.scalars().all()
+        await session.commit()
+    if fixed_ids:
+        await property_cache.invalidate(*fixed_ids)
+    return fixed_ids
+
+async def get_latest_reviews(property_id: int, limit: int = 5, session: AsyncSession | None = None):
+    """
+    Возвращает последние N отзывов для объекта.
+    """
+    async with session_scope(session) as session:
         query = (
             select(Review)
             .where(Review.property_id == property_id)
@@ -1,8 +1,8 @@
 from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.models.models import User
-from .db import async_session_maker
+from .db import async_session_maker, session_scope
 
 async def add_user(telegram_id: int, username: str | None, first_name: str) -> User:
     async with async_session_maker() as session:
@@ -15,8 +15,8 @@ async def add_user(telegram_id: int, username: str | None, first_name: str) -> U
             return new_user
         return user
 
-async def get_user(user_id: int) -> User | None:
-    async with async_session_maker() as session:
+async def get_user(user_id: int, session: AsyncSession | None = None) -> User | None:
+    async with session_scope(session) as session:
         return await session.get(User, user_id)
 
 async def set_user_role(user_id: int, role: str):
@@ -143,33 +143,46 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     async function setPeriodAvailability(isAvailable, comment) {
-        const dates = [];
-        const endDate = selection.end || selection.start;
-        for (let d = new Date(selection.start); d <= endDate; d.setUTCDate(d.getUTCDate() + 1)) {
-            dates.push(d.toISOString().split('T')[0]);
-        }
-        
+        // Период уходит на сервер одним диапазоном, а не списком всех дат
+        const operations = [{
+            start: selection.start.toISOString().split('T')[0],
+            end: (selection.end || selection.start).toISOString().split('T')[0],
+            is_available: isAvailable,
+            comment
+        }];
+
         setLoaderVisible(true);
         try {
             const response = await fetch(`/api/owner/set_availability`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ 
-                    property_id: propertyId, 
-                    dates, 
-                    is_available: isAvailable,
-                    comment
-                })
+                body: JSON.stringify({ property_id: propertyId, operations })
             });
             if (!response.ok) throw new Error('Ошибка сервера.');
+            const result = await response.json();
+            // Сервер возвращает пересчитанные месяцы, повторно календарь не загружаем
+            applyUpdatedMonths(result.months);
+            resetSelection();
             tg.showPopup({ title: 'Успех', message: `Статус для выбранного периода успешно изменен.` });
         } catch (error) {
             tg.showAlert(`Ошибка: ${error.message}`);
-        } finally {
             await reloadCalendar();
+        } finally {
+            setLoaderVisible(false);
         }
     }
 
+    function applyUpdatedMonths(months) {
+        months.forEach(({ year, month, days }) => {
+            days.forEach(dayInfo => { calendarData[dayInfo.date] = dayInfo; });
+            const monthContainer = document.getElementById(`month-${year}-${month - 1}`);
+            if (monthContainer) {
+                monthContainer.replaceWith(buildMonth(year, month - 1));
+            }
+        });
+        updateSelectionHighlight();
+    }
+
     async function handleSetPrice(price) {
         const startDate = selection.start.toISOString().split('T')[0];
         const endDate = (selection.end || selection.start).toISOString().split('T')[0];
@@ -222,8 +235,13 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     
     function renderMonth(year, month) {
+        if (document.getElementById(`month-${year}-${month}`)) return;
+        calendarContainer.appendChild(buildMonth(year, month));
+        updateSelectionHighlight();
+    }
+
+    function buildMonth(year, month) {
         const monthContainerId = `month-${year}-${month}`;
-        if (document.getElementById(monthContainerId)) return;
         const monthContainer = document.createElement('div');
         monthContainer.className = 'calendar-month-container';
         monthContainer.id = monthContainerId;
@@ -276,8 +294,7 @@ document.addEventListener('DOMContentLoaded', () => {
             calendarGrid.appendChild(dayEl);
         }
         monthContainer.appendChild(calendarGrid);
-        calendarContainer.appendChild(monthContainer);
-        updateSelectionHighlight();
+        return monthContainer;
     }
 
     async function main() {
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from aiogram.types import Message
+
+# Сколько секунд ждать следующего фото альбома, прежде чем считать альбом полученным
+ALBUM_COLLECT_DELAY = 0.6
+
+AlbumHandler = Callable[[list[Message]], Awaitable[None]]
+
+
+class PendingAlbum:
+    """Недособранная пачка фото: сообщения, обработчик пачки и таймер ее отправки."""
+    __slots__ = ('messages', 'on_album', 'timer')
+
+    def __init__(self):
+        self.messages: list[Message] = []
+        self.on_album: AlbumHandler | None = None
+        self.timer: asyncio.Task | None = None
+
+
+class AlbumCollector:
+    """
+    Собирает фото, которые пользователь отправил одним альбомом (media_group_id) или быстрой
+    серией, в одну пачку. Telegram присылает каждое фото альбома отдельным обновлением;
+    обработчик вызывает collect() и сразу возвращается, не занимая воркер очереди обновлений.
+    Пачка передается в on_album фоновым таймером, который перезапускается с каждым новым фото,
+    поэтому сохранение и ответ пользователю выполняются один раз на альбом.
+    """
+
+    def __init__(self, delay: float = ALBUM_COLLECT_DELAY):
+        self.delay = delay
+        self._pending: dict[tuple[int, int], PendingAlbum] = {}
+        # Таймеры, которые уже передали пачку в on_album и ждут его завершения
+        self._saving: dict[tuple[int, int], asyncio.Task] = {}
+
+    def collect(self, message: Message, on_album: AlbumHandler):
+        """Добавляет фото в пачку чата; on_album последнего фото получит всю пачку после паузы."""
+        # Пачка общая для чата: фото разных альбомов и одиночные фото одной серии сохраняются вместе
+        key = (message.chat.id, message.from_user.id)
+        album = self._pending.get(key)
+        if album is None:
+            album = self._pending[key] = PendingAlbum()
+        else:
+            album.timer.cancel()
+        album.messages.append(message)
+        album.on_album = on_album
+        album.timer = asyncio.create_task(self._flush_later(key, album))
+
+    async def flush(self, chat_id: int, user_id: int):
+        """
+        Дожидается сохранения фото чата, не дожидаясь паузы: например, перед подсчетом фото
+        по кнопке 'Завершить загрузку', которая может прийти раньше срабатывания таймера.
+        """
+        key = (chat_id, user_id)
+        saving = self._saving.get(key)
+        if saving is not None:
+            await asyncio.shield(saving)
+        album = self._pending.get(key)
+        if album is not None:
+            album.timer.cancel()
+            await self._flush(key, album)
+
+    async def _flush_later(self, key: tuple[int, int], album: PendingAlbum):
+        await asyncio.sleep(self.delay)
+        # С этого момента collect() не отменяет таймер: новые фото попадут в следующую пачку
+        task = asyncio.current_task()
+        self._saving[key] = task
+        try:
+            await self._flush(key, album)
+        finally:
+            if self._saving.get(key) is task:
+                del self._saving[key]
+
+    async def _flush(self, key: tuple[int, int], album: PendingAlbum):
+        if self._pending.get(key) is album:
+            del self._pending[key]
+        # Обновления альбома могут обрабатываться не по порядку: восстанавливаем порядок отправки
+        messages = sorted(album.messages, key=lambda item: item.message_id)
+        try:
+            await album.on_album(messages)
+        except Exception:
+            # Таймер никто не ожидает: без логирования ошибка пропала бы
+            logging.exception("Ошибка обработки альбома из %s фото", len(messages))
+
+
+album_collector = AlbumCollector()
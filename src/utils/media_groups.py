@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.types import InputMediaPhoto
+
+from src.core.settings import settings
+
+# Telegram принимает в одном альбоме от 2 до 10 элементов
+MEDIA_GROUP_MAX_SIZE = 10
+
+
+def chunk_media(file_ids: list[str], size: int = MEDIA_GROUP_MAX_SIZE) -> list[list[str]]:
+    """
+    Делит file_id на группы не больше size. Если в последней группе остался один
+    элемент, к ней переносится элемент из предыдущей: одиночное фото пришлось бы
+    отправлять отдельным запросом и без альбома.
+    """
+    chunks = [file_ids[i:i + size] for i in range(0, len(file_ids), size)]
+    if len(chunks) > 1 and len(chunks[-1]) == 1:
+        chunks[-1].insert(0, chunks[-2].pop())
+    return chunks
+
+
+class MediaGroupCache:
+    """
+    Готовые альбомы галереи объекта. Ключ — (id объекта, версия медиа из карточки, пропуск первого фото),
+    поэтому после изменения медиа старые альбомы просто перестают запрашиваться и вытесняются LRU.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: OrderedDict[tuple, tuple[list[InputMediaPhoto], ...]] = OrderedDict()
+
+    def get_groups(self, card: dict, skip_first: bool = False) -> tuple[list[InputMediaPhoto], ...]:
+        """Альбомы фото объекта по карточке (см. property_service.build_property_card)."""
+        key = (card['id'], card.get('media_version'), skip_first)
+        groups = self._items.get(key)
+        if groups is not None:
+            self._items.move_to_end(key)
+            return groups
+        photo_files = card['photo_files'][1:] if skip_first else card['photo_files']
+        groups = tuple(
+            [InputMediaPhoto(media=file_id) for file_id in chunk]
+            for chunk in chunk_media(photo_files)
+        )
+        if key[1] is not None:
+            self._items[key] = groups
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return groups
+
+
+media_group_cache = MediaGroupCache(settings.PROPERTY_CACHE_SIZE)
+
+
+async def send_media_groups(bot: Bot, chat_id: int, groups: tuple[list[InputMediaPhoto], ...]):
+    """Отправляет альбомы по одному запросу на группу; одиночное фото уходит через send_photo."""
+    for group in groups:
+        if len(group) == 1:
+            await bot.send_photo(chat_id=chat_id, photo=group[0].media)
+        else:
+            await bot.send_media_group(chat_id=chat_id, media=group)
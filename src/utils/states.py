@@ -16,8 +16,10 @@ class AddProperty(StatesGroup):
 class SearchProperties(StatesGroup):
     region = State()
     district = State()
+    dates = State() # Даты заезда и выезда (необязательный шаг)
     price = State()
     guests = State()
+    results = State() # Просмотр результатов: фильтры и курсор следующей страницы
 
 class EditProperty(StatesGroup):
     choosing_field = State()
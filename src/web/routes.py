@@ -1,10 +1,15 @@
-import calendar
+import hmac
 from datetime import date, datetime
 from aiohttp import web
 from aiogram.types import Update
 
-from src.services import availability_service, booking_service, pricing_service
-from src.services.db import async_session_maker
+from src.core.constants import AVAILABILITY_MAX_OPERATIONS, AVAILABILITY_WINDOW_DAYS, BOOKING_MAX_NIGHTS
+from src.core.metrics import handler_metrics, render_prometheus
+from src.core.settings import settings
+from src.services import availability_service, calendar_service, pricing_service
+from src.services.calendar_versions import month_starts
+from src.services.db import pool_snapshot
+from src.services.property_cache import property_cache
 
 # ... (webhook_handler без изменений) ...
 async def webhook_handler(request: web.Request) -> web.Response:
@@ -15,16 +20,49 @@ async def webhook_handler(request: web.Request) -> web.Response:
     bot = request.app["bot"]
     
     update = Update.model_validate(await request.json(), context={"bot": bot})
-    await dp.feed_update(bot, update)
+
+    update_queue = request.app.get("update_queue")
+    if update_queue is None:
+        await dp.feed_update(bot, update)
+    elif not await update_queue.put(update):
+        # Очередь переполнена: Telegram повторит доставку позже
+        return web.json_response({"error": "Too many pending updates"}, status=503)
     
     return web.Response()
 
+async def metrics_handler(request: web.Request) -> web.Response:
+    """
+    Метрики обработчиков и снимки пула БД, очереди обновлений, исходящих вызовов и кэшей для Prometheus.
+    Маршрут живет на том же публичном сервере, что и вебхук, поэтому отвечает только с токеном METRICS_TOKEN.
+    """
+    if settings.METRICS_TOKEN is None:
+        raise web.HTTPNotFound()
+    expected = f"Bearer {settings.METRICS_TOKEN.get_secret_value()}"
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+        return web.json_response({"error": "Unauthorized"}, status=401)
+
+    snapshots = {"db_pool": pool_snapshot()}
+    update_queue = request.app.get("update_queue")
+    if update_queue is not None:
+        snapshots["update_queue"] = update_queue.snapshot()
+    stats = getattr(request.app["bot"].session, "stats", None)
+    if stats is not None:
+        snapshots["outbound"] = stats.snapshot()
+    snapshots["property_cache"] = property_cache.snapshot()
+    snapshots["calendar_cache"] = calendar_service.month_cache.snapshot()
+
+    return web.Response(
+        text=render_prometheus(handler_metrics, snapshots),
+        content_type="text/plain",
+        headers={"Cache-Control": "no-store"}
+    )
+
+# Страницы WebApp браузер может хранить, но обязан перепроверять при каждом открытии:
+# FileResponse отвечает 304 по ETag/Last-Modified, если файл не менялся
+WEBAPP_HTML_HEADERS = {'Cache-Control': 'no-cache'}
+
 async def client_webapp_handler(request: web.Request) -> web.Response:
-    headers = {
-        'Cache-Control': 'no-cache, no-store, must-revalidate',
-        'Pragma': 'no-cache',
-        'Expires': '0'
-    }
+    headers = WEBAPP_HTML_HEADERS
     # ---> НАЧАЛО КЛЮЧЕВОГО ИЗМЕНЕНИЯ <---
     # Строим путь от абсолютного корня, который мы сохранили в app
     root_dir = request.app['root_dir']
@@ -33,11 +71,7 @@ async def client_webapp_handler(request: web.Request) -> web.Response:
     # ---> КОНЕЦ КЛЮЧЕВОГО ИЗМЕНЕНИЯ <---
 
 async def owner_webapp_handler(request: web.Request) -> web.Response:
-    headers = {
-        'Cache-Control': 'no-cache, no-store, must-revalidate',
-        'Pragma': 'no-cache',
-        'Expires': '0'
-    }
+    headers = WEBAPP_HTML_HEADERS
     # ---> НАЧАЛО КЛЮЧЕВОГО ИЗМЕНЕНИЯ <---
     root_dir = request.app['root_dir']
     path_to_file = root_dir / 'src' / 'static' / 'owner.html'
@@ -45,6 +79,15 @@ async def owner_webapp_handler(request: web.Request) -> web.Response:
     # ---> КОНЕЦ КЛЮЧЕВОГО ИЗМЕНЕНИЯ <---
 
 # ... (остальной код файла без изменений) ...
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Есть ли etag среди значений заголовка If-None-Match (слабые W/-теги тоже подходят)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return f'"{etag}"' in candidates
+
 async def get_calendar_data(request: web.Request) -> web.Response:
     try:
         property_id = int(request.match_info['property_id'])
@@ -53,51 +96,94 @@ async def get_calendar_data(request: web.Request) -> web.Response:
     except (ValueError, KeyError):
         return web.json_response({'error': 'Invalid or missing parameters'}, status=400)
 
-    async with async_session_maker() as session:
-        prop = await pricing_service.get_property_with_price_rules(session, property_id)
-        if not prop:
-            return web.json_response({'error': 'Property not found'}, status=404)
-        base_price = prop.price_per_night
-        manual_blocks = await availability_service.get_manual_blocks(property_id)
-        manual_block_map = {block.date: block.comment for block in manual_blocks}
-        booked_dates = await booking_service.get_booked_dates_for_property(property_id)
-        days_data = []
-        days_in_month = calendar.monthrange(year, month)[1]
-        for day_num in range(1, days_in_month + 1):
-            current_date = date(year, month, day_num)
-            status = 'available'
-            comment = None
-            if current_date < date.today():
-                status = 'past'
-            elif current_date in booked_dates:
-                status = 'booked'
-            elif current_date in manual_block_map:
-                status = 'manual_block'
-                comment = manual_block_map[current_date]
-            price = None
-            if status == 'available':
-                price = await pricing_service.get_price_for_date(session, property_id, current_date, base_price)
-            days_data.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'status': status,
-                'price': price,
-                'comment': comment
-            })
-    return web.json_response(days_data)
+    if not (1 <= month <= 12 and date.min.year <= year < date.max.year):
+        return web.json_response({'error': 'Invalid or missing parameters'}, status=400)
+
+    etag = await calendar_service.get_month_etag(property_id, year, month)
+    if etag is None:
+        return web.json_response({'error': 'Property not found'}, status=404)
+    # Браузер хранит месяц и перепроверяет его по ETag: неизменный месяц стоит одного запроса версии
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return web.Response(status=304, headers=headers)
+
+    days_data = await calendar_service.get_month_calendar_cached(property_id, year, month, etag)
+    if days_data is None:
+        return web.json_response({'error': 'Property not found'}, status=404)
+    return web.json_response(days_data, headers=headers)
+
+async def get_quote(request: web.Request) -> web.Response:
+    """Стоимость проживания по датам: /api/quote/{property_id}?checkin=YYYY-MM-DD&checkout=YYYY-MM-DD"""
+    try:
+        property_id = int(request.match_info['property_id'])
+        checkin = date.fromisoformat(request.query['checkin'])
+        checkout = date.fromisoformat(request.query['checkout'])
+    except (ValueError, KeyError):
+        return web.json_response({'error': 'Invalid or missing parameters'}, status=400)
+
+    if checkout <= checkin:
+        return web.json_response({'error': 'Checkout must be after checkin'}, status=400)
+    # Цена считается по каждой ночи: без ограничения один запрос мог бы запросить миллионы ночей
+    if (checkout - checkin).days > BOOKING_MAX_NIGHTS:
+        return web.json_response({'error': f'Stay must not exceed {BOOKING_MAX_NIGHTS} nights'}, status=400)
+
+    quote = await pricing_service.quote_stay(property_id, checkin, checkout)
+    if quote is None:
+        return web.json_response({'error': 'Property not found'}, status=404)
+    return web.json_response(quote)
+
+def parse_availability_changes(data: dict) -> list[availability_service.AvailabilityChange]:
+    """
+    Разбирает тело /api/owner/set_availability. Основной формат — список операций с диапазонами:
+    {"operations": [{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "is_available": false, "comment": "..."}]}
+    (границы включены). Старый формат {"dates": [...], "is_available": ..., "comment": ...}
+    сворачивается в диапазоны. Бросает ValueError/KeyError/TypeError на некорректных данных.
+    """
+    if 'operations' in data:
+        changes = [
+            availability_service.AvailabilityChange(
+                date.fromisoformat(operation['start']),
+                date.fromisoformat(operation['end']),
+                bool(operation['is_available']),
+                operation.get('comment')
+            )
+            for operation in data['operations']
+        ]
+    else:
+        dates = [datetime.strptime(d, '%Y-%m-%d').date() for d in data['dates']]
+        changes = [
+            availability_service.AvailabilityChange(start, end, bool(data['is_available']), data.get('comment'))
+            for start, end in availability_service.compress_dates(dates)
+        ]
+
+    if not changes or len(changes) > AVAILABILITY_MAX_OPERATIONS:
+        raise ValueError('Invalid number of operations')
+    for change in changes:
+        if change.end < change.start or (change.end - change.start).days >= AVAILABILITY_WINDOW_DAYS:
+            raise ValueError('Invalid range')
+    return changes
 
 async def set_availability(request: web.Request) -> web.Response:
+    """
+    Применяет операции над календарем объекта одной транзакцией и возвращает
+    пересчитанные месяцы, которых коснулись изменения, чтобы владельцу не нужен был повторный запрос.
+    """
     try:
         data = await request.json()
         property_id = int(data['property_id'])
-        dates_str = data['dates']
-        dates = [datetime.strptime(d, '%Y-%m-%d').date() for d in dates_str]
-        is_available = bool(data['is_available'])
-        comment = data.get('comment')
+        changes = parse_availability_changes(data)
     except Exception:
         return web.json_response({'error': 'Invalid request body'}, status=400)
-    
-    await availability_service.set_availability_for_period(property_id, dates, is_available, comment)
-    return web.json_response({'status': 'ok'})
+
+    await availability_service.apply_availability_changes(property_id, changes)
+
+    months = sorted({month for change in changes for month in month_starts(change.start, change.end)})
+    updated = []
+    for month in months:
+        days_data = await calendar_service.get_month_calendar(property_id, month.year, month.month)
+        if days_data is not None:
+            updated.append({'year': month.year, 'month': month.month, 'days': days_data})
+    return web.json_response({'status': 'ok', 'months': updated})
 
 async def add_price_rule(request: web.Request) -> web.Response:
     try:
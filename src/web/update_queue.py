@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь входящих обновлений Telegram с пулом обработчиков.
+
+    Вебхук только кладет обновление в очередь и сразу отвечает Telegram,
+    а обработка идет в фоне. Очередь разбита на шарды по chat_id: все обновления
+    одного чата попадают к одному обработчику и выполняются строго по порядку.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int, maxsize: int, put_timeout: float):
+        self.dp = dp
+        self.bot = bot
+        self.put_timeout = put_timeout
+        shard_size = max(1, maxsize // workers)
+        self._shards = [asyncio.Queue(maxsize=shard_size) for _ in range(workers)]
+        self._workers: list[asyncio.Task] = []
+
+        # Метрики очереди
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(shard.qsize() for shard in self._shards)
+
+    def start(self):
+        for index, shard in enumerate(self._shards):
+            self._workers.append(asyncio.create_task(self._worker(shard), name=f"update-worker-{index}"))
+        logging.info("Update queue started with %d workers.", len(self._shards))
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Дожидается обработки уже принятых обновлений и останавливает обработчиков."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(shard.join() for shard in self._shards)),
+                timeout=drain_timeout
+            )
+        except asyncio.TimeoutError:
+            logging.warning("Update queue was not drained in %.1fs, %d updates dropped.", drain_timeout, self.depth)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def _shard_for(self, update: Update) -> asyncio.Queue:
+        context = UserContextMiddleware.resolve_event_context(update)
+        key = context.chat_id or context.user_id or update.update_id
+        return self._shards[key % len(self._shards)]
+
+    async def put(self, update: Update) -> bool:
+        """
+        Ставит обновление в очередь. Если шард переполнен дольше put_timeout,
+        возвращает False, чтобы вебхук ответил ошибкой и Telegram повторил доставку позже.
+        """
+        shard = self._shard_for(update)
+        try:
+            await asyncio.wait_for(shard.put((update, time.monotonic())), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        return True
+
+    async def _worker(self, shard: asyncio.Queue):
+        while True:
+            update, enqueued_at = await shard.get()
+            waited = time.monotonic() - enqueued_at
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logging.exception("Ошибка при обработке обновления %s: %s", update.update_id, e)
+            finally:
+                shard.task_done()
+
+    def snapshot(self) -> dict:
+        """Текущие метрики очереди."""
+        started = self.processed + self.failed
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "workers": len(self._shards),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_time_avg": self.wait_time_total / started if started else 0.0,
+            "wait_time_max": self.wait_time_max,
+        }
@@ -0,0 +1,79 @@
+import pytest
+from types import SimpleNamespace
+
+from src.core.metrics import HandlerMetrics, render_prometheus
+from src.middlewares.metrics import HandlerMetricsMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+
+def metric_lines(text: str) -> dict[str, str]:
+    """Строки с значениями метрик: {имя с метками: значение}."""
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if line and not line.startswith('#'))
+
+
+async def test_histogram_buckets_are_cumulative():
+    """Тест: значение попадает в свою корзину и во все более широкие, +Inf равен числу вызовов."""
+    metrics = HandlerMetrics()
+    metrics.record('src.handlers.user.search', 'show_results', 'message', 0.003)
+    metrics.record('src.handlers.user.search', 'show_results', 'message', 0.2)
+    metrics.record('src.handlers.user.search', 'show_results', 'message', 30.0)
+
+    values = metric_lines(render_prometheus(metrics, {}))
+    labels = 'router="src.handlers.user.search",handler="show_results",update_type="message"'
+    assert values[f'bot_handler_duration_seconds_bucket{{{labels},le="0.005"}}'] == '1'
+    assert values[f'bot_handler_duration_seconds_bucket{{{labels},le="0.1"}}'] == '1'
+    assert values[f'bot_handler_duration_seconds_bucket{{{labels},le="0.25"}}'] == '2'
+    assert values[f'bot_handler_duration_seconds_bucket{{{labels},le="10.0"}}'] == '2'
+    assert values[f'bot_handler_duration_seconds_bucket{{{labels},le="+Inf"}}'] == '3'
+    assert values[f'bot_handler_duration_seconds_count{{{labels}}}'] == '3'
+    assert float(values[f'bot_handler_duration_seconds_sum{{{labels}}}']) == pytest.approx(30.203)
+    assert values[f'bot_handler_errors_total{{{labels}}}'] == '0'
+
+
+async def test_output_format_and_label_escaping():
+    """Тест: метки экранируются, у каждой метрики есть TYPE, счетчики снимков получают суффикс _total."""
+    metrics = HandlerMetrics()
+    metrics.record('mod', 'handler "quoted"\\path\nnext', 'callback_query', 0.01, failed=True)
+
+    text = render_prometheus(metrics, {
+        'outbound': {'queued': 2, 'sent': 10},
+        'custom': {'size': 1.5, 'enabled': True, 'name': 'skip'},
+    })
+    assert text.endswith('\n')
+    assert '# TYPE bot_handler_duration_seconds histogram' in text
+    assert '# TYPE bot_handler_errors_total counter' in text
+    assert (
+        'bot_handler_errors_total{router="mod",handler="handler \\"quoted\\"\\\\path\\nnext",'
+        'update_type="callback_query"} 1'
+    ) in text.splitlines()
+
+    values = metric_lines(text)
+    assert '# TYPE bot_outbound_queued gauge' in text
+    assert values['bot_outbound_queued'] == '2'
+    assert '# TYPE bot_outbound_sent_total counter' in text
+    assert values['bot_outbound_sent_total'] == '10'
+    assert values['bot_custom_size'] == '1.5'
+    # Логические и строковые поля снимка не выводятся
+    assert 'bot_custom_enabled' not in values
+    assert 'bot_custom_name' not in values
+
+
+async def test_middleware_records_calls_and_errors():
+    """Тест: мидлварь подписывает замер модулем и именем обработчика и типом обновления, ошибки пробрасывает."""
+    metrics = HandlerMetrics()
+    middleware = HandlerMetricsMiddleware(metrics)
+
+    async def show_card(event, data):
+        if event == 'boom':
+            raise ValueError(event)
+        return 'ok'
+
+    data = {'handler': SimpleNamespace(callback=show_card), 'event_update': SimpleNamespace(event_type='message')}
+    assert await middleware(show_card, 'hi', data) == 'ok'
+    with pytest.raises(ValueError):
+        await middleware(show_card, 'boom', data)
+
+    [(key, stats)] = metrics.items()
+    assert key == (__name__, show_card.__qualname__, 'message')
+    assert (stats.count, stats.errors) == (2, 1)
@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMediaGroup, SendMessage
+from aiogram.types import InputMediaPhoto
+
+from src.core import outbound
+from src.core.outbound import OutboundSession, TokenBucket
+from src.core.settings import settings
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Ручные часы для TokenBucket: подменяем только модуль time внутри outbound, не цикл событий."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(outbound, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def fast_limits(monkeypatch):
+    """Лимиты, при которых ожидание токенов почти нулевое: тесты проверяют порядок и повторы."""
+    monkeypatch.setattr(settings, "OUTBOUND_GLOBAL_RATE", 1000.0)
+    monkeypatch.setattr(settings, "OUTBOUND_CHAT_RATE", 1000.0)
+    monkeypatch.setattr(settings, "OUTBOUND_CHAT_BURST", 3.0)
+    monkeypatch.setattr(settings, "OUTBOUND_GROUP_RATE", 1000.0)
+    monkeypatch.setattr(settings, "OUTBOUND_GROUP_BURST", 3.0)
+    monkeypatch.setattr(settings, "OUTBOUND_MAX_RETRIES", 3)
+    monkeypatch.setattr(settings, "OUTBOUND_MAX_RETRY_AFTER", 5)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    Заглушка HTTP-вызова Bot API: отвечает по очереди из api.responses (число — пауза перед
+    успешным ответом, исключение — ошибка) и записывает отправленные методы в api.calls.
+    """
+    state = SimpleNamespace(calls=[], responses=[])
+
+    async def make_request(self, bot, method, timeout=None):
+        state.calls.append(method)
+        response = state.responses.pop(0) if state.responses else 0
+        if isinstance(response, Exception):
+            raise response
+        await asyncio.sleep(response)
+        return True
+
+    monkeypatch.setattr(AiohttpSession, "make_request", make_request)
+    return state
+
+
+@pytest.fixture
+async def session():
+    session = OutboundSession()
+    yield session
+    await session.close()
+
+
+def retry_after(method, seconds: int) -> TelegramRetryAfter:
+    return TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=seconds)
+
+
+async def test_token_bucket_reserve(clock):
+    """Тест: ведро выдает burst токенов без ожидания, дальше — по одному в 1/rate секунд, с учетом веса."""
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.value += 10
+    assert bucket.is_idle()
+    # Альбом из 5 фото: 2 токена есть, остальные 3 набираются за 1.5 с
+    assert bucket.reserve(5) == pytest.approx(1.5)
+
+
+async def test_token_bucket_pause(clock):
+    """Тест: после pause(seconds) следующий токен выдается ровно через seconds, а не позже."""
+    bucket = TokenBucket(rate=1.0, capacity=3.0)
+    bucket.pause(5)
+    assert bucket.reserve() == pytest.approx(5.0)
+
+    clock.value += 10
+    assert bucket.is_idle()
+
+
+async def test_sends_to_one_chat_keep_order(fast_limits, api, session):
+    """Тест: отправки в один чат выполняются по одной в порядке вызова, даже если первая отвечает дольше."""
+    bot = Bot("123:abc", session=session)
+    api.responses = [0.05, 0, 0]
+
+    await asyncio.gather(*(
+        session.make_request(bot, SendMessage(chat_id=1, text=str(number)))
+        for number in range(3)
+    ))
+
+    assert [call.text for call in api.calls] == ["0", "1", "2"]
+    assert session.stats.snapshot() == {'queued': 0, 'sent': 3, 'throttled': 0, 'retried': 0, 'dropped': 0}
+
+
+async def test_retry_after_is_retried(fast_limits, api, session):
+    """Тест: на TelegramRetryAfter вызов повторяется после паузы и в итоге отправляется."""
+    bot = Bot("123:abc", session=session)
+    method = SendMessage(chat_id=1, text="повтор")
+    api.responses = [retry_after(method, 1)]
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await session.make_request(bot, method) is True
+
+    assert loop.time() - started >= 0.9
+    assert len(api.calls) == 2
+    stats = session.stats.snapshot()
+    assert (stats['sent'], stats['retried'], stats['dropped'], stats['queued']) == (1, 1, 0, 0)
+
+
+async def test_retry_after_drops_when_retries_run_out(fast_limits, api, session, monkeypatch):
+    """Тест: после OUTBOUND_MAX_RETRIES повторов ошибка пробрасывается, а вызов считается потерянным."""
+    monkeypatch.setattr(settings, "OUTBOUND_MAX_RETRIES", 1)
+    bot = Bot("123:abc", session=session)
+    method = SendMessage(chat_id=1, text="потеряно")
+    api.responses = [retry_after(method, 1), retry_after(method, 1)]
+
+    with pytest.raises(TelegramRetryAfter):
+        await session.make_request(bot, method)
+
+    assert len(api.calls) == 2
+    stats = session.stats.snapshot()
+    assert (stats['sent'], stats['retried'], stats['dropped'], stats['queued']) == (0, 1, 1, 0)
+
+
+async def test_long_retry_after_is_dropped_without_waiting(fast_limits, api, session):
+    """Тест: пауза длиннее OUTBOUND_MAX_RETRY_AFTER не выдерживается — ошибка сразу уходит вызывающему."""
+    bot = Bot("123:abc", session=session)
+    method = SendMessage(chat_id=1, text="долго")
+    api.responses = [retry_after(method, 60)]
+
+    with pytest.raises(TelegramRetryAfter):
+        await session.make_request(bot, method)
+
+    assert len(api.calls) == 1
+    assert session.stats.snapshot()['dropped'] == 1
+
+
+async def test_media_group_takes_token_per_item(fast_limits, api, session):
+    """Тест: альбом списывает из ведра чата по токену на каждое фото, а не один на весь запрос."""
+    bot = Bot("123:abc", session=session)
+    media = [InputMediaPhoto(media=f"photo-{number}") for number in range(10)]
+
+    await session.make_request(bot, SendMediaGroup(chat_id=-100, media=media))
+
+    # Ведро группы вмещает 3 токена: после альбома из 10 фото баланс ушел на 7 в минус
+    assert session.chat_buckets[-100].tokens == pytest.approx(-7.0, abs=0.5)
@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.user_service import add_user
@@ -8,8 +9,11 @@ from src.services.booking_service import (
     create_booking, 
     update_booking_status, 
     get_booked_dates_for_property,
-    count_pending_bookings_for_owner
+    get_booked_days_in_range,
+    count_pending_bookings_for_owner,
+    BookingConflictError
 )
+from src.services.availability_service import set_availability_for_period
 
 pytestmark = pytest.mark.asyncio
 
@@ -75,4 +79,67 @@ async def test_update_booking_status_and_dates(db_session: AsyncSession):
     assert len(booked_dates_after) == 2
     assert start_date.date() in booked_dates_after
     assert (start_date.date() + timedelta(days=1)) in booked_dates_after
-    assert end_date.date() not in booked_dates_after
\ No newline at end of file
+    assert end_date.date() not in booked_dates_after
+
+
+async def test_get_booked_days_in_range(db_session: AsyncSession):
+    """
+    Тест: занятые дни возвращаются только в пределах запрошенного периода и без повторов.
+    """
+    owner = await add_user(telegram_id=5105, username="booking_owner_3", first_name="Owner")
+    client = await add_user(telegram_id=5106, username="booking_client_3", first_name="Client")
+    property_data = {"title": "Объект 3", "district": "Бронь", "address": "c", "rooms": "1", "price_per_night": "1500", "max_guests": "2", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    for start_date, end_date in (
+        (datetime(2025, 12, 1), datetime(2025, 12, 5)),    # целиком до периода
+        (datetime(2025, 12, 28), datetime(2026, 1, 3)),    # начинается до периода
+        (datetime(2026, 1, 3), datetime(2026, 1, 4)),      # заезд в день выезда предыдущей
+    ):
+        booking = await create_booking(client.telegram_id, property_id, start_date, end_date)
+        await update_booking_status(booking.id, "confirmed")
+
+    booked_days = await get_booked_days_in_range(property_id, date(2026, 1, 1), date(2026, 2, 1))
+
+    assert [date.fromordinal(day) for day in booked_days] == [date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 3)]
+
+
+async def test_concurrent_bookings_do_not_overlap(db_session: AsyncSession):
+    """
+    Тест: из одновременных подтверждений пересекающихся броней проходит ровно одно,
+    а новые заявки на занятые или закрытые владельцем даты отклоняются.
+    """
+    owner = await add_user(telegram_id=9014, username="booking_owner_4", first_name="Owner")
+    clients = [
+        await add_user(telegram_id=9100 + n, username=f"booking_race_{n}", first_name="Client")
+        for n in range(10)
+    ]
+    property_data = {"title": "Объект 4", "district": "Бронь", "address": "d", "rooms": "1", "price_per_night": "1500", "max_guests": "2", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    # Пока ничего не подтверждено, пересекающиеся заявки допустимы
+    bookings = await asyncio.gather(*(
+        create_booking(client.telegram_id, property_id, datetime(2031, 3, 1 + n % 3), datetime(2031, 3, 5 + n % 3))
+        for n, client in enumerate(clients)
+    ))
+
+    results = await asyncio.gather(
+        *(update_booking_status(booking.id, "confirmed") for booking in bookings),
+        return_exceptions=True
+    )
+    conflicts = [result for result in results if isinstance(result, BookingConflictError)]
+    assert len(conflicts) == len(bookings) - 1
+    assert all(conflict.reason == 'booked' for conflict in conflicts)
+
+    results = await asyncio.gather(
+        *(create_booking(client.telegram_id, property_id, datetime(2031, 3, 4), datetime(2031, 3, 6)) for client in clients),
+        return_exceptions=True
+    )
+    assert all(isinstance(result, BookingConflictError) and result.reason == 'booked' for result in results)
+
+    await set_availability_for_period(property_id, [date(2031, 4, 2)], is_available=False, comment=None)
+    with pytest.raises(BookingConflictError) as error:
+        await create_booking(clients[0].telegram_id, property_id, datetime(2031, 4, 1), datetime(2031, 4, 3))
+    assert error.value.reason == 'blocked'
+    # День выезда может совпадать с закрытым днем
+    assert await create_booking(clients[0].telegram_id, property_id, datetime(2031, 4, 1), datetime(2031, 4, 2))
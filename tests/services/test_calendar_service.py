@@ -0,0 +1,139 @@
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.user_service import add_user
+from src.services.property_service import add_property
+from src.services.booking_service import create_booking, update_booking_status
+from src.services.availability_service import set_availability_for_period, apply_availability_changes, AvailabilityChange, compress_dates
+from src.services.pricing_service import add_price_rule
+from src.services.calendar_service import get_month_calendar, get_month_calendar_cached, get_month_etag
+from src.services.availability_bitmap import current_origin, get_availability_map
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_month_calendar_statuses_and_prices(db_session: AsyncSession):
+    """
+    Тест: календарь месяца учитывает брони, ручные блокировки и приоритет ценовых правил.
+    """
+    owner = await add_user(telegram_id=7007, username="calendar_owner_1", first_name="Owner")
+    client = await add_user(telegram_id=8008, username="calendar_client_1", first_name="Client")
+    property_data = {"title": "Календарь", "district": "Календарь", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    # Бронь с заездом в прошлом месяце и выездом 3 числа: заняты 1 и 2 число
+    booking = await create_booking(client.telegram_id, property_id, datetime(2030, 5, 28), datetime(2030, 6, 3))
+    await update_booking_status(booking.id, "confirmed")
+    await set_availability_for_period(property_id, [date(2030, 6, 10)], is_available=False, comment="Ремонт")
+    # Более позднее правило перекрывает более раннее
+    await add_price_rule(property_id, date(2030, 6, 1), date(2030, 6, 30), 2000)
+    await add_price_rule(property_id, date(2030, 6, 20), date(2030, 7, 5), 3000)
+
+    days = await get_month_calendar(property_id, 2030, 6)
+    by_date = {day['date']: day for day in days}
+
+    assert len(days) == 30
+    assert by_date['2030-06-01']['status'] == 'booked'
+    assert by_date['2030-06-02']['status'] == 'booked'
+    assert by_date['2030-06-03'] == {'date': '2030-06-03', 'status': 'available', 'price': 2000, 'comment': None}
+    assert by_date['2030-06-10']['status'] == 'manual_block'
+    assert by_date['2030-06-10']['comment'] == "Ремонт"
+    assert by_date['2030-06-19']['price'] == 2000
+    assert by_date['2030-06-20']['price'] == 3000
+
+    assert await get_month_calendar(-1, 2030, 6) is None
+
+
+async def test_month_calendar_from_availability_bitmap(db_session: AsyncSession):
+    """
+    Тест: подтверждение брони и блокировки пересобирают карту занятости,
+    и календарь по карте совпадает с расчетом по строкам.
+    """
+    owner = await add_user(telegram_id=9018, username="calendar_owner_2", first_name="Owner")
+    client = await add_user(telegram_id=9019, username="calendar_client_2", first_name="Client")
+    property_data = {"title": "Карта", "district": "Карта", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    # Следующий месяц всегда попадает в окно карты
+    month_start = (current_origin() + timedelta(days=32)).replace(day=1)
+    checkin = datetime.combine(month_start + timedelta(days=4), datetime.min.time())
+    booking = await create_booking(client.telegram_id, property_id, checkin, checkin + timedelta(days=2))
+    await update_booking_status(booking.id, "confirmed")
+    blocked_day = month_start + timedelta(days=9)
+    await set_availability_for_period(property_id, [blocked_day], is_available=False, comment="Ремонт")
+
+    availability = await get_availability_map(property_id)
+    assert availability.covers(month_start, month_start + timedelta(days=28))
+    assert availability.booked.days_in(month_start, month_start + timedelta(days=28)) == [
+        (month_start + timedelta(days=4)).toordinal(), (month_start + timedelta(days=5)).toordinal()
+    ]
+    assert not availability.is_free(month_start + timedelta(days=5), month_start + timedelta(days=7))
+    assert not availability.is_free(blocked_day, blocked_day + timedelta(days=1))
+    assert availability.is_free(month_start + timedelta(days=6), blocked_day)
+
+    days = await get_month_calendar(property_id, month_start.year, month_start.month)
+    by_date = {day['date']: day for day in days}
+    assert by_date[str(month_start + timedelta(days=4))]['status'] == 'booked'
+    assert by_date[str(month_start + timedelta(days=6))]['status'] == 'available'
+    assert by_date[str(blocked_day)] == {'date': str(blocked_day), 'status': 'manual_block', 'price': None, 'comment': "Ремонт"}
+
+    # Отклонение брони освобождает дни в карте
+    await update_booking_status(booking.id, "rejected")
+    availability = await get_availability_map(property_id)
+    assert availability.is_free(month_start, blocked_day)
+
+
+async def test_apply_availability_changes_by_ranges(db_session: AsyncSession):
+    """
+    Тест: операции с диапазонами применяются по порядку в одной транзакции.
+    """
+    owner = await add_user(telegram_id=9020, username="calendar_owner_3", first_name="Owner")
+    property_data = {"title": "Диапазоны", "district": "Диапазоны", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    await apply_availability_changes(property_id, [
+        AvailabilityChange(date(2030, 8, 1), date(2030, 8, 20), is_available=False, comment="Сезон"),
+        AvailabilityChange(date(2030, 8, 5), date(2030, 8, 6), is_available=True),
+        AvailabilityChange(date(2030, 8, 20), date(2030, 8, 20), is_available=False, comment="Уборка")
+    ])
+
+    by_date = {day['date']: day for day in await get_month_calendar(property_id, 2030, 8)}
+    assert by_date['2030-08-01'] == {'date': '2030-08-01', 'status': 'manual_block', 'price': None, 'comment': "Сезон"}
+    assert by_date['2030-08-05']['status'] == 'available'
+    assert by_date['2030-08-06']['status'] == 'available'
+    assert by_date['2030-08-07']['status'] == 'manual_block'
+    assert by_date['2030-08-20']['comment'] == "Уборка"
+    assert by_date['2030-08-21']['status'] == 'available'
+    assert compress_dates([date(2030, 8, 3), date(2030, 8, 1), date(2030, 8, 2), date(2030, 8, 9)]) == [
+        (date(2030, 8, 1), date(2030, 8, 3)), (date(2030, 8, 9), date(2030, 8, 9))
+    ]
+
+
+async def test_month_etag_changes_on_writes(db_session: AsyncSession):
+    """
+    Тест: версия месяца меняется при блокировках, ценах и подтверждении брони, а соседний месяц не затрагивается.
+    """
+    owner = await add_user(telegram_id=9021, username="calendar_owner_4", first_name="Owner")
+    client = await add_user(telegram_id=9022, username="calendar_client_4", first_name="Client")
+    property_data = {"title": "Версии", "district": "Версии", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    assert await get_month_etag(-1, 2030, 9) is None
+    etags = [await get_month_etag(property_id, 2030, 9)]
+    october = await get_month_etag(property_id, 2030, 10)
+
+    await set_availability_for_period(property_id, [date(2030, 9, 3)], is_available=False, comment=None)
+    etags.append(await get_month_etag(property_id, 2030, 9))
+    await add_price_rule(property_id, date(2030, 9, 10), date(2030, 9, 12), 1500)
+    etags.append(await get_month_etag(property_id, 2030, 9))
+    booking = await create_booking(client.telegram_id, property_id, datetime(2030, 9, 20), datetime(2030, 9, 22))
+    await update_booking_status(booking.id, "confirmed")
+    etags.append(await get_month_etag(property_id, 2030, 9))
+
+    assert len(set(etags)) == len(etags)
+    assert await get_month_etag(property_id, 2030, 10) == october
+
+    days = await get_month_calendar_cached(property_id, 2030, 9, etags[-1])
+    assert days == await get_month_calendar_cached(property_id, 2030, 9, etags[-1])
+    assert {day['date']: day['status'] for day in days}['2030-09-20'] == 'booked'
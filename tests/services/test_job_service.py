@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import ScheduledJob
+from src.services.job_service import schedule_job, claim_due_jobs, complete_jobs, fail_job
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_claim_due_jobs_once(db_session: AsyncSession):
+    """
+    Тест: наступившие задачи забираются ровно одним из конкурирующих опросов, будущие — не забираются.
+    """
+    now = datetime.now(timezone.utc)
+    due_ids = {await schedule_job('test_job', now - timedelta(minutes=1), {"n": n}) for n in range(10)}
+    future_id = await schedule_job('test_job', now + timedelta(hours=1), {"n": -1})
+
+    # Несколько "экземпляров бота" опрашивают очередь одновременно
+    batches = await asyncio.gather(*(claim_due_jobs(limit=4, lease=timedelta(minutes=5)) for _ in range(5)))
+    claimed_ids = [job.id for batch in batches for job in batch if job.kind == 'test_job']
+
+    assert len(claimed_ids) == len(set(claimed_ids))
+    assert set(claimed_ids) == due_ids
+    assert future_id not in claimed_ids
+
+    await complete_jobs(claimed_ids)
+    assert not [job for job in await claim_due_jobs(limit=50, lease=timedelta(minutes=5)) if job.kind == 'test_job']
+
+
+async def test_failed_job_is_retried(db_session: AsyncSession):
+    """
+    Тест: задача с ошибкой возвращается в очередь к времени повтора.
+    """
+    job_id = await schedule_job('retry_job', datetime.now(timezone.utc) - timedelta(seconds=1), {})
+    [job] = [job for job in await claim_due_jobs(limit=50, lease=timedelta(minutes=5)) if job.id == job_id]
+    assert job.attempts == 1
+
+    await fail_job(job_id, "boom", retry_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    [job] = [job for job in await claim_due_jobs(limit=50, lease=timedelta(minutes=5)) if job.id == job_id]
+    assert job.attempts == 2
+    assert job.last_error == "boom"
+
+
+async def test_expired_lease_respects_max_attempts(db_session: AsyncSession):
+    """
+    Тест: задача, зависшая в running после последней попытки, не забирается снова, а помечается failed.
+    """
+    job_id = await schedule_job('crash_job', datetime.now(timezone.utc) - timedelta(seconds=1), {})
+    # Аренда уже истекла: экземпляр "упал", не завершив задачу
+    [job] = [job for job in await claim_due_jobs(limit=50, lease=timedelta(seconds=-1), max_attempts=2) if job.id == job_id]
+    assert job.attempts == 1
+
+    [job] = [job for job in await claim_due_jobs(limit=50, lease=timedelta(seconds=-1), max_attempts=2) if job.id == job_id]
+    assert job.attempts == 2
+
+    assert not [job for job in await claim_due_jobs(limit=50, lease=timedelta(seconds=-1), max_attempts=2) if job.id == job_id]
+    job = await db_session.get(ScheduledJob, job_id)
+    assert job.status == 'failed'
+    assert job.attempts == 2
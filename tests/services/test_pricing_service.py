@@ -0,0 +1,39 @@
+import pytest
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.user_service import add_user
+from src.services.property_service import add_property
+from src.services.pricing_service import add_price_rule, quote_stay, quote_stays
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_quote_stay_and_bulk_quotes(db_session: AsyncSession):
+    """
+    Тест: расчет стоимости проживания учитывает приоритет правил и совпадает в пакетном режиме.
+    """
+    owner = await add_user(telegram_id=9015, username="pricing_owner_1", first_name="Owner")
+    property_data = {"title": "Цены", "district": "Цены", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    priced_id = await add_property(property_data, owner_id=owner.telegram_id)
+    plain_id = await add_property({**property_data, "title": "Без правил"}, owner_id=owner.telegram_id)
+
+    await add_price_rule(priced_id, date(2032, 8, 1), date(2032, 8, 31), 2000)
+    # Более позднее правило перекрывает более раннее
+    await add_price_rule(priced_id, date(2032, 8, 3), date(2032, 8, 3), 5000)
+
+    quote = await quote_stay(priced_id, date(2032, 7, 31), date(2032, 8, 4))
+    assert quote['nights'] == [
+        {'date': '2032-07-31', 'price': 1000},
+        {'date': '2032-08-01', 'price': 2000},
+        {'date': '2032-08-02', 'price': 2000},
+        {'date': '2032-08-03', 'price': 5000},
+    ]
+    assert quote['total'] == 10000
+
+    totals = await quote_stays([priced_id, plain_id, -1], date(2032, 7, 31), date(2032, 8, 4))
+    assert totals == {priced_id: 10000, plain_id: 4000}
+
+    assert await quote_stay(-1, date(2032, 7, 31), date(2032, 8, 4)) is None
+    with pytest.raises(ValueError):
+        await quote_stay(priced_id, date(2032, 8, 4), date(2032, 8, 4))
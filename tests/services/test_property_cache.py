@@ -0,0 +1,40 @@
+import pytest
+
+from src.services.property_cache import PropertyCardCache
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_cache() -> PropertyCardCache:
+    return PropertyCardCache(maxsize=10, ttl=60, use_redis=False, redis_ttl=60)
+
+
+async def test_stale_fill_is_not_cached_after_invalidation():
+    """
+    Тест: карточка, загруженная до изменения объекта, не попадает в кэш,
+    если invalidate() успел выполниться раньше put().
+    """
+    cache = make_cache()
+
+    token = await cache.fill_token()
+    stale_card = {'id': 1, 'title': 'Старое название'}
+    # Пока читатель загружал карточку, писатель изменил объект и сбросил кэш
+    await cache.invalidate(1)
+    await cache.put(stale_card, token)
+    assert await cache.get(1) is None
+
+    # Новая загрузка начинается после сброса и кэшируется как обычно
+    fresh_card = {'id': 1, 'title': 'Новое название'}
+    await cache.put(fresh_card, await cache.fill_token())
+    assert await cache.get(1) == fresh_card
+
+
+async def test_invalidation_of_other_property_does_not_block_fill():
+    """Тест: сброс другого объекта не мешает закэшировать карточку, загруженную по той же отметке."""
+    cache = make_cache()
+
+    token = await cache.fill_token()
+    await cache.invalidate(2)
+    card = {'id': 1, 'title': 'Объект'}
+    await cache.put(card, token)
+    assert await cache.get(1) == card
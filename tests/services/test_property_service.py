@@ -1,4 +1,5 @@
 import pytest
+from datetime import date, datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импортируем сервисы, которые будем тестировать и которые нужны для подготовки данных
@@ -6,10 +7,21 @@ from src.services.user_service import add_user
 from src.services.property_service import (
     add_property, 
     get_all_properties, 
+    get_properties_page,
+    get_search_snapshot,
     get_properties_by_owner,
     toggle_property_activity,
-    delete_property
+    delete_property,
+    owner_dashboard,
+    get_property_card,
+    update_property_field
 )
+from src.services.media_service import add_photos_to_property, count_property_photos
+from src.services.property_cache import property_cache
+from src.services.booking_service import create_booking, update_booking_status
+from src.services.availability_service import set_availability_for_period
+from src.services.pricing_service import add_price_rule
+from src.services.review_service import add_review
 
 pytestmark = pytest.mark.asyncio
 
@@ -93,4 +105,145 @@ async def test_delete_property(db_session: AsyncSession):
 
     # 4. Проверка после удаления
     props_after = await get_properties_by_owner(owner.telegram_id)
-    assert len(props_after) == 0
\ No newline at end of file
+    assert len(props_after) == 0
+
+
+async def test_properties_page_keyset_pagination(db_session: AsyncSession):
+    """
+    Тест: постраничная выдача без повторов и пропусков, новые объекты не попадают в зафиксированную выдачу.
+    """
+    owner = await add_user(telegram_id=444, username="owner4", first_name="Owner")
+    property_data = {"title": "Страница", "district": "Пагинация", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "2", "property_type": "Квартира"}
+    created_ids = [await add_property(property_data, owner_id=owner.telegram_id) for _ in range(5)]
+
+    total, max_id = await get_search_snapshot(districts=["Пагинация"])
+    assert total == 5
+    assert max_id == created_ids[-1]
+
+    # Объект, добавленный после начала просмотра, не должен появиться на страницах
+    await add_property(property_data, owner_id=owner.telegram_id)
+
+    first_page, cursor = await get_properties_page(districts=["Пагинация"], max_id=max_id, page_size=2)
+    second_page, cursor = await get_properties_page(districts=["Пагинация"], after_id=cursor, max_id=max_id, page_size=2)
+    last_page, cursor = await get_properties_page(districts=["Пагинация"], after_id=cursor, max_id=max_id, page_size=2)
+
+    assert [prop.id for prop in first_page + second_page + last_page] == created_ids
+    assert len(last_page) == 1
+    assert cursor is None
+
+
+async def test_owner_dashboard(db_session: AsyncSession):
+    """
+    Тест: приборная панель владельца считает заявки, ближайшие заезды и рейтинг по каждому объекту.
+    """
+    owner = await add_user(telegram_id=9009, username="dashboard_owner", first_name="Owner")
+    client = await add_user(telegram_id=9010, username="dashboard_client", first_name="Client")
+    base = {"description": "d", "district": "Панель", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "2", "property_type": "Квартира"}
+    first_id = await add_property({**base, "title": "Первый"}, owner_id=owner.telegram_id)
+    second_id = await add_property({**base, "title": "Второй"}, owner_id=owner.telegram_id)
+    await toggle_property_activity(second_id)
+
+    today = datetime.combine(date.today(), datetime.min.time())
+    # Две новые заявки и один подтвержденный заезд через 3 дня у первого объекта
+    await create_booking(client.telegram_id, first_id, today + timedelta(days=20), today + timedelta(days=22))
+    await create_booking(client.telegram_id, first_id, today + timedelta(days=30), today + timedelta(days=32))
+    confirmed = await create_booking(client.telegram_id, first_id, today + timedelta(days=3), today + timedelta(days=5))
+    await update_booking_status(confirmed.id, 'confirmed')
+    await add_review(confirmed.id, rating=4, text=None)
+
+    dashboard = await owner_dashboard(owner.telegram_id, upcoming_days=7)
+
+    assert dashboard['total'] == 2
+    assert dashboard['active'] == 1
+    assert dashboard['pending'] == 2
+    assert dashboard['upcoming'] == 1
+
+    first, second = dashboard['properties']
+    assert first['id'] == first_id
+    assert first['pending'] == 2
+    assert first['next_checkin'] == today + timedelta(days=3)
+    assert float(first['avg_rating']) == 4.0
+    assert first['reviews_count'] == 1
+    assert second['id'] == second_id
+    assert second['pending'] == 0
+    assert second['avg_rating'] is None
+    assert second['reviews_count'] == 0
+
+
+async def test_property_card_cache_invalidation(db_session: AsyncSession):
+    """
+    Тест: карточка объекта берется из кэша, а изменения объекта и медиа сбрасывают ее.
+    """
+    owner = await add_user(telegram_id=9011, username="cache_owner", first_name="Owner")
+    property_data = {"title": "Кэш", "description": "d", "district": "Кэш", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "2", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    card = await get_property_card(property_id)
+    assert card['title'] == "Кэш"
+    assert card['owner_id'] == owner.telegram_id
+    assert card['photo_files'] == []
+
+    hits_before = property_cache.hits
+    assert await get_property_card(property_id) == card
+    assert property_cache.hits == hits_before + 1
+
+    await update_property_field(property_id, 'title', "Кэш 2")
+    await add_photos_to_property(property_id, ["photo_1", "photo_2"])
+    card = await get_property_card(property_id)
+    assert card['title'] == "Кэш 2"
+    assert card['photo_files'] == ["photo_1", "photo_2"]
+    media_version = card['media_version']
+
+    # Новое медиа меняет версию, по которой кэшируются альбомы галереи
+    await add_photos_to_property(property_id, ["photo_3"])
+    card = await get_property_card(property_id)
+    assert card['photo_files'] == ["photo_1", "photo_2", "photo_3"]
+    assert card['media_version'] != media_version
+
+    await delete_property(property_id)
+    assert await get_property_card(property_id) is None
+
+
+async def test_add_photos_respects_limit(db_session: AsyncSession):
+    """
+    Тест: альбом сохраняется одним запросом, а фото сверх лимита отбрасываются.
+    """
+    owner = await add_user(telegram_id=9023, username="album_owner", first_name="Owner")
+    property_data = {"title": "Альбом", "description": "d", "district": "Альбом", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "2", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+
+    assert await add_photos_to_property(property_id, [f"album_{i}" for i in range(8)], max_photos=10) == (8, 8)
+    assert await add_photos_to_property(property_id, [f"extra_{i}" for i in range(5)], max_photos=10) == (2, 10)
+    assert await count_property_photos(property_id) == 10
+    card = await get_property_card(property_id)
+    assert card['photo_files'][-2:] == ["extra_0", "extra_1"]
+
+
+async def test_search_by_dates(db_session: AsyncSession):
+    """
+    Тест: поиск по датам исключает занятые и закрытые объекты и учитывает ценовые правила.
+    """
+    owner = await add_user(telegram_id=9016, username="dates_owner", first_name="Owner")
+    client = await add_user(telegram_id=9017, username="dates_client", first_name="Client")
+    base = {"description": "d", "district": "Даты", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "2", "property_type": "Квартира"}
+    free_id = await add_property({**base, "title": "Свободен"}, owner_id=owner.telegram_id)
+    booked_id = await add_property({**base, "title": "Занят"}, owner_id=owner.telegram_id)
+    blocked_id = await add_property({**base, "title": "Закрыт"}, owner_id=owner.telegram_id)
+    expensive_id = await add_property({**base, "title": "Дорогой на даты"}, owner_id=owner.telegram_id)
+
+    booking = await create_booking(client.telegram_id, booked_id, datetime(2033, 5, 8), datetime(2033, 5, 11))
+    await update_booking_status(booking.id, "confirmed")
+    await set_availability_for_period(blocked_id, [date(2033, 5, 12)], is_available=False, comment=None)
+    await add_price_rule(expensive_id, date(2033, 5, 10), date(2033, 5, 20), 4000)
+
+    checkin, checkout = date(2033, 5, 10), date(2033, 5, 13)
+    found = await get_all_properties(districts=["Даты"], checkin=checkin, checkout=checkout)
+    assert [prop.id for prop in found] == [free_id, expensive_id]
+
+    # Средняя цена ночи на эти даты: 1000 у свободного, 4000 у "дорогого"
+    found = await get_all_properties(districts=["Даты"], max_price=1500, checkin=checkin, checkout=checkout)
+    assert [prop.id for prop in found] == [free_id]
+
+    # Выезд в день заезда чужой брони не конфликтует с ней
+    total, _ = await get_search_snapshot(districts=["Даты"], checkin=date(2033, 5, 6), checkout=date(2033, 5, 8))
+    assert total == 4
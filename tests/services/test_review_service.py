@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Property
+from src.services.user_service import add_user
+from src.services.property_service import add_property
+from src.services.booking_service import create_booking
+from src.services.review_service import add_review, get_reviews_summaries, reconcile_rating_stats
+from src.services.db import async_session_maker
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_get_reviews_summaries(db_session: AsyncSession):
+    """
+    Тест: проверяем пакетное получение рейтингов для нескольких объектов.
+    """
+    owner = await add_user(telegram_id=5005, username="review_owner_1", first_name="Owner")
+    client = await add_user(telegram_id=6006, username="review_client_1", first_name="Client")
+    property_data = {"title": "С отзывами", "district": "Отзывы", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    reviewed_id = await add_property(property_data, owner_id=owner.telegram_id)
+    empty_id = await add_property({**property_data, "title": "Без отзывов"}, owner_id=owner.telegram_id)
+
+    for rating, day in ((5, 1), (4, 10)):
+        booking = await create_booking(client.telegram_id, reviewed_id, datetime(2025, 6, day), datetime(2025, 6, day + 2))
+        await add_review(booking.id, rating, None)
+
+    summaries = await get_reviews_summaries([reviewed_id, empty_id])
+
+    avg_rating, count = summaries[reviewed_id]
+    assert count == 2
+    assert float(avg_rating) == 4.5
+    assert summaries[empty_id] == (None, 0)
+
+
+async def test_reconcile_rating_stats(db_session: AsyncSession):
+    """
+    Тест: сводка рейтинга обновляется вместе с отзывом, а пересчет исправляет расхождения.
+    """
+    owner = await add_user(telegram_id=9012, username="review_owner_2", first_name="Owner")
+    client = await add_user(telegram_id=9013, username="review_client_2", first_name="Client")
+    property_data = {"title": "Сводка", "district": "Сводка", "address": "a", "rooms": "1", "price_per_night": "1000", "max_guests": "1", "property_type": "Квартира"}
+    property_id = await add_property(property_data, owner_id=owner.telegram_id)
+    booking = await create_booking(client.telegram_id, property_id, datetime(2025, 7, 1), datetime(2025, 7, 3))
+    await add_review(booking.id, 3, "Нормально")
+
+    summaries = await get_reviews_summaries([property_id])
+    assert summaries[property_id] == (3.0, 1)
+
+    # Портим сводку, как если бы отзыв был добавлен в обход сервиса
+    async with async_session_maker() as session:
+        await session.execute(update(Property).where(Property.id == property_id).values(rating_sum=0, rating_count=0))
+        await session.commit()
+
+    fixed_ids = await reconcile_rating_stats()
+    assert property_id in fixed_ids
+    summaries = await get_reviews_summaries([property_id])
+    assert summaries[property_id] == (3.0, 1)
+    assert property_id not in await reconcile_rating_stats()
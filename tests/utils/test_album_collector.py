@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from src.utils.album_collector import AlbumCollector
+
+pytestmark = pytest.mark.asyncio
+
+DELAY = 0.05
+
+
+def make_photo(message_id: int, chat_id: int = 1, user_id: int = 1):
+    """Сообщение с фото: коллектору нужны только чат, отправитель и message_id."""
+    return SimpleNamespace(message_id=message_id, chat=SimpleNamespace(id=chat_id), from_user=SimpleNamespace(id=user_id))
+
+
+async def test_concurrent_photos_are_saved_as_one_album():
+    """
+    Тест: фото альбома, пришедшие почти одновременно (и не по порядку), передаются в обработчик
+    одной пачкой, а collect() не ждет паузу.
+    """
+    collector = AlbumCollector(delay=DELAY)
+    albums = []
+
+    async def on_album(album):
+        albums.append([item.message_id for item in album])
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    collector.collect(make_photo(2), on_album)
+    collector.collect(make_photo(1), on_album)
+    assert loop.time() - started < DELAY
+    assert albums == []
+
+    await asyncio.sleep(DELAY * 3)
+    assert albums == [[1, 2]]
+
+
+async def test_sequential_photos_are_saved_separately():
+    """Тест: фото, между которыми прошла пауза, сохраняются разными пачками, по одному вызову на пачку."""
+    collector = AlbumCollector(delay=DELAY)
+    albums = []
+
+    async def on_album(album):
+        albums.append([item.message_id for item in album])
+
+    collector.collect(make_photo(1), on_album)
+    await asyncio.sleep(DELAY * 3)
+    collector.collect(make_photo(2), on_album)
+    await asyncio.sleep(DELAY * 3)
+
+    assert albums == [[1], [2]]
+
+
+async def test_flush_saves_pending_album_immediately():
+    """Тест: flush() сохраняет недособранную пачку сразу, и таймер не сохраняет ее второй раз."""
+    collector = AlbumCollector(delay=DELAY)
+    albums = []
+
+    async def on_album(album):
+        albums.append([item.message_id for item in album])
+
+    collector.collect(make_photo(1), on_album)
+    collector.collect(make_photo(2, chat_id=2, user_id=2), on_album)
+    await collector.flush(1, 1)
+    assert albums == [[1]]
+
+    await asyncio.sleep(DELAY * 3)
+    assert albums == [[1], [2]]